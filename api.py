@@ -2,13 +2,15 @@ from datetime import datetime, timedelta
 import re
 import json
 import os
+import asyncio
 import logging
 from typing import Optional, Dict, Any
-from copy import deepcopy
 
-from fastapi import FastAPI, Request, HTTPException, File, UploadFile, BackgroundTasks, Query
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, Request, HTTPException, BackgroundTasks, Query
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import ClientDisconnect
+from starlette.concurrency import run_in_threadpool
 from pathlib import Path
 import uuid
 import numpy as np
@@ -26,13 +28,25 @@ log = logging.getLogger("smoke-api")
 # --- modelos / utilidades ---
 # from src.camera import CameraInference      # ← original
 from src.camera_inference import CameraInference  # ← SOLO CLASIFICACIÓN
-from src.utils import read_sensor_data_to_df, sensor_at
+from src.inference_pool import InferencePool
+from src.batcher import MicroBatcher
+from src.prediction_cache import PredictionCache
+from src.utils import read_sensor_data_to_df, file_sha256, SensorTrack, frame_times
+from src.video_reader import iter_sampled_frames, iter_frames_at, FFmpegFrameReader, FramePrefetcher
+from src.adaptive_sampling import AdaptiveSampler
+from src.motion_gate import ChangeGate
+from src.result_cache import FrameResultCache
+from src.result_store import TaskResult, ResultBuilder
+from src.partial_results import PartialResultWriter, partial_path, read_new_lines
+from src.events import summarize
+from src.job_queue import JobQueue, StatusMap, ProgressMap
+from src.progress import TaskProgress
+from src.ingest import MultipartIngest, HashingFileWriter, stream_to_writer
+from src.upload_sessions import UploadSessions
+from src.task_store import DiskResultMap, BoundedResultMap, BoundedStatusMap
 
 app = FastAPI()
 
-processing_status: Dict[str, str] = {}
-video_info: Dict[str, dict] = {}
-
 ROOT = Path(__file__).resolve().parent
 
 # Usar rutas relativas para compatibilidad con Render y otros servicios
@@ -48,6 +62,62 @@ if json_dir_env := os.getenv("JSON_OUTPUT_DIR"):
 for p in (VIDEO_DIR, SENSOR_DIR, JSON_OUTPUT_DIR):
     p.mkdir(parents=True, exist_ok=True)
 
+# inline = BackgroundTasks en este proceso; sqlite = cola persistente + worker.py
+JOB_BACKEND = os.getenv("JOB_BACKEND", "inline").lower()
+JOB_DB_PATH = Path(os.getenv("JOB_DB_PATH", str(BASE_DIR / "jobs.sqlite3")))
+
+# resultados en memoria con presupuesto (LRU + TTL); lo desalojado se relee de JSON_OUTPUT_DIR
+TASK_CACHE_MAX_MB = float(os.getenv("TASK_CACHE_MAX_MB", "512"))
+TASK_CACHE_TTL = float(os.getenv("TASK_CACHE_TTL", "3600"))
+TASK_STATUS_MAX = int(os.getenv("TASK_STATUS_MAX", "10000"))
+
+job_queue: Optional[JobQueue] = None
+if JOB_BACKEND == "sqlite":
+    job_queue = JobQueue(JOB_DB_PATH)
+    processing_status = StatusMap(job_queue)
+    processing_progress = ProgressMap(job_queue)
+    # los workers solo escriben (a disco); la API cachea lo que lee
+    video_info = BoundedResultMap(DiskResultMap(JSON_OUTPUT_DIR), max_bytes=TASK_CACHE_MAX_MB * 2**20,
+                                  ttl=TASK_CACHE_TTL, cache_writes=False)
+else:
+    video_info = BoundedResultMap(DiskResultMap(JSON_OUTPUT_DIR), max_bytes=TASK_CACHE_MAX_MB * 2**20,
+                                  ttl=TASK_CACHE_TTL)
+    # una tarea descartada del estado sigue "completed" mientras su resultado esté en disco
+    processing_status = BoundedStatusMap(TASK_STATUS_MAX, pinned=lambda status: status == "processing",
+                                         fallback=lambda task_id: "completed" if task_id in video_info else None)
+    processing_progress = BoundedStatusMap(TASK_STATUS_MAX)
+
+# en modo sqlite cada lectura / escritura del estado es una consulta: desde los
+# handlers async se hace en el threadpool para no frenar el event loop
+async def get_task_status(task_id: str, default: Optional[str] = None) -> Optional[str]:
+    return await run_in_threadpool(processing_status.get, task_id, default)
+
+async def set_task_status(task_id: str, status: str):
+    await run_in_threadpool(processing_status.__setitem__, task_id, status)
+
+# caché de clasificaciones por frame según el contenido del video (RESULT_CACHE=0 la desactiva)
+RESULT_CACHE_DIR = Path(os.getenv("RESULT_CACHE_DIR", str(BASE_DIR / "result_cache")))
+result_cache: Optional[FrameResultCache] = (
+    FrameResultCache(RESULT_CACHE_DIR) if os.getenv("RESULT_CACHE", "1") == "1" else None
+)
+
+# logs de sensores ya parseados (.npz por sha256 del archivo); SENSOR_CACHE=0 la desactiva
+SENSOR_CACHE_DIR = Path(os.getenv("SENSOR_CACHE_DIR", str(BASE_DIR / "sensor_cache")))
+if os.getenv("SENSOR_CACHE", "1") != "1":
+    SENSOR_CACHE_DIR = None
+
+# eventos de humo para /video-summary: histéresis sobre P(humo), duración mínima y unión de huecos (segundos)
+SMOKE_EVENT_PARAMS = {
+    "label": os.getenv("SMOKE_LABEL", "smoke"),
+    "enter_conf": float(os.getenv("SMOKE_ENTER_CONF", "0.6")),
+    "exit_conf": float(os.getenv("SMOKE_EXIT_CONF", "0.4")),
+    "min_duration": float(os.getenv("SMOKE_MIN_DURATION", "1.0")),
+    "max_gap": float(os.getenv("SMOKE_MAX_GAP", "0")),
+}
+
+def summary_path(task_id: str) -> Path:
+    return JSON_OUTPUT_DIR / f"{Path(task_id).name}.summary.json"
+
 CLS_MODEL_WEIGHTS = str(ROOT / "models/swinv2_day_night_full.pt")
 # DET_MODEL_WEIGHTS = str(ROOT / "models/best11_3.pt")  # ← ya no se usa
 
@@ -87,12 +157,24 @@ def _strip_sensors(payload: dict) -> dict:
     return out
 """
 
-@app.on_event("startup")
-async def load_model():
+# CameraInference local, o InferencePool si INFER_POOL_WORKERS > 0 (solo CPU),
+# detrás de un MicroBatcher que junta frames de todas las tareas (MICROBATCH_MAX > 0)
+predictor = None
+
+def get_predictor():
+    return predictor if predictor is not None else CameraInference.get_instance()
+
+def model_tag() -> str:
+    """Identifica el modelo cargado para la caché de resultados: pesos, precisión, preprocesado y backend."""
+    base = CameraInference.get_instance()
+    return f"{base.weights_hash}:{base.precision}:{base.preprocess}:{base.backend}"
+
+def init_classifier():
+    global predictor
     import torch
     device = "cuda:0" if torch.cuda.is_available() else "cpu"
     log.info("Inicializando modelo de CLASIFICACIÓN | device=%s", device)
-    CameraInference.get_instance(
+    infer = CameraInference.get_instance(
         model_name="swinv2",
         model_weights=CLS_MODEL_WEIGHTS,
         num_classes=2,
@@ -100,9 +182,56 @@ async def load_model():
         device=device,
         labels=["no_smoke", "smoke"],
         half=False,
+        preprocess=os.getenv("PREPROCESS", "tensor"),
+        backend=os.getenv("INFER_BACKEND", "eager"),
+        int8=(device == "cpu" and os.getenv("INFER_INT8", "0") == "1"),  # INT8 solo en CPU
     )
+    predictor = infer
+
+    pool_workers = int(os.getenv("INFER_POOL_WORKERS", "0"))
+    if pool_workers > 0:
+        if infer.device.type == "cpu":
+            predictor = InferencePool.get_instance(
+                infer,
+                workers=pool_workers,
+                threads=int(os.getenv("INFER_POOL_THREADS", "0")),
+            )
+        else:
+            log.warning("INFER_POOL_WORKERS ignorado: el pool es solo para CPU (device=%s)", device)
+
+    microbatch_max = int(os.getenv("MICROBATCH_MAX", "32"))
+    if microbatch_max > 0:
+        predictor = MicroBatcher.get_instance(
+            predictor,
+            max_batch=microbatch_max,
+            max_wait_ms=float(os.getenv("MICROBATCH_WAIT_MS", "10")),
+        )
+
+    phash_cache_size = int(os.getenv("PHASH_CACHE_SIZE", "0"))
+    if phash_cache_size > 0:
+        predictor = PredictionCache.get_instance(
+            predictor,
+            size=phash_cache_size,
+            max_distance=int(os.getenv("PHASH_MAX_DISTANCE", "2")),
+        )
     log.info("Modelo de clasificación listo")
 
+@app.on_event("startup")
+async def load_model():
+    if job_queue is not None:
+        log.info("JOB_BACKEND=sqlite: el modelo lo cargan los workers (worker.py)")
+        return
+    init_classifier()
+
+@app.on_event("shutdown")
+async def close_predictor():
+    batcher = MicroBatcher._instance
+    if batcher is not None:
+        batcher.close()
+    pool = InferencePool._instance
+    if pool is not None:
+        pool.close()
+
 # VERSION SOLO CLASIFICADOR
 """
 def process_video_and_sensor(
@@ -219,9 +348,11 @@ def process_video_and_sensor(
     video_path: Path,
     sensor_path: Optional[Path],
     task_id: str,
-    include_sensors: bool = True
+    include_sensors: bool = True,
+    video_hash: Optional[str] = None
 ):
     import os
+    partial: Optional[PartialResultWriter] = None
     try:
         m = re.search(r"(\d{4})(\d{2})(\d{2})(\d{2})(\d{2})(\d{2})", video_path.stem)
         if not m:
@@ -231,181 +362,693 @@ def process_video_and_sensor(
         video_start = datetime(*map(int, m.groups()))
         nice_ts = video_start.strftime("%Y%m%d_%H%M%S")
 
-        infer = CameraInference.get_instance()
+        infer = get_predictor()
 
-        sensor_data = None
-        sensor_times = None
+        sensor_track = None
         if include_sensors and sensor_path is not None and sensor_path.exists():
             try:
-                sensor_data = read_sensor_data_to_df(sensor_path)
+                sensor_data = read_sensor_data_to_df(sensor_path, cache_dir=SENSOR_CACHE_DIR)
                 if "Datetime" in sensor_data.columns and not sensor_data.empty:
-                    sensor_times = sensor_data["Datetime"].values.astype("datetime64[ns]")
-                log.info("[TASK %s] sensores cargados: %d filas", task_id, 0 if sensor_data is None else len(sensor_data))
+                    # latest | nearest | linear; SENSOR_MAX_STALENESS en segundos (vacío = sin límite)
+                    max_staleness = os.getenv("SENSOR_MAX_STALENESS", "")
+                    sensor_track = SensorTrack(
+                        sensor_data,
+                        mode=os.getenv("SENSOR_ALIGN", "latest").lower(),
+                        max_staleness=float(max_staleness) if max_staleness else None,
+                    )
+                log.info("[TASK %s] sensores cargados: %d filas", task_id, len(sensor_data))
             except Exception as e:
                 log.warning("[TASK %s] error leyendo sensores: %s", task_id, e)
-                sensor_data = None
-                sensor_times = None
-
-        cap = cv2.VideoCapture(str(video_path))
-        if not cap.isOpened():
-            processing_status[task_id] = "error: cannot open video"
-            log.error("[TASK %s] No pude abrir video %s", task_id, video_path)
-            return
-
-        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
-        n_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) if cap.get(cv2.CAP_PROP_FRAME_COUNT) > 0 else None
-        log.info("[TASK %s] procesando video | fps=%.2f | frames=%s", task_id, fps, n_frames)
+                sensor_track = None
 
         SAMPLE_EVERY = int(os.getenv("SAMPLE_EVERY", "10"))
-
-        frame_idx = 0
-        response: Dict[str, Any] = {"filename": video_path.name, "length": n_frames, "data": {}}
-
-        while True:
-            ok, frame = cap.read()
-            if not ok:
-                break
-
-            if frame_idx % SAMPLE_EVERY != 0:
-                frame_idx += 1
-                continue
-
-            # timestamp formateado como HH:MM:SS
-            now = video_start + timedelta(seconds=frame_idx / fps)
-            timestamp_str = now.strftime("%H:%M:%S")
-
-            cam_label, cam_conf = infer.predict(frame)
-
-            entry = {
-                "timestamp": timestamp_str,
-                "cls": {"class": cam_label, "conf": float(cam_conf)}
-            }
-
-            s_row = None
-            if include_sensors and (sensor_times is not None):
-                s_idx = sensor_at(now, sensor_times)
-                if s_idx is not None:
-                    s_row = sensor_data.iloc[s_idx]
-
-            if include_sensors:
-                if s_row is not None:
-                    readings = {
-                        "Temp": float(s_row.get("Temp", np.nan)),
-                        "Humidity": float(s_row.get("Humidity", np.nan)),
-                        "CO2": float(s_row.get("CO2", np.nan)),
-                        "PM1": float(s_row.get("PM1", np.nan)),
-                        "PM2.5": float(s_row.get("PM2.5", np.nan)),
-                        "PM10": float(s_row.get("PM10", np.nan)),
-                    }
+        BATCH_SIZE = max(1, int(os.getenv("BATCH_SIZE", "16")))
+        DECODE_QUEUE_DEPTH = int(os.getenv("DECODE_QUEUE_DEPTH", "8"))
+        FRAME_SKIP_MODE = os.getenv("FRAME_SKIP_MODE", "grab").lower()
+        SEEK_MIN_STRIDE = int(os.getenv("SEEK_MIN_STRIDE", "60"))
+        VIDEO_READER = os.getenv("VIDEO_READER", "opencv").lower()
+        FFMPEG_THREADS = int(os.getenv("FFMPEG_THREADS", "0"))
+        SAMPLING_MODE = os.getenv("SAMPLING_MODE", "fixed").lower()
+        ADAPTIVE_COARSE_STRIDE = int(os.getenv("ADAPTIVE_COARSE_STRIDE", str(SAMPLE_EVERY * 8)))
+        ADAPTIVE_MIN_STRIDE = int(os.getenv("ADAPTIVE_MIN_STRIDE", str(SAMPLE_EVERY)))
+        ADAPTIVE_UNCERTAIN_CONF = float(os.getenv("ADAPTIVE_UNCERTAIN_CONF", "0.8"))
+        MOTION_GATE = os.getenv("MOTION_GATE", "0") == "1"
+        MOTION_GATE_THRESHOLD = float(os.getenv("MOTION_GATE_THRESHOLD", "0.02"))
+        MOTION_GATE_MAX_CARRY = int(os.getenv("MOTION_GATE_MAX_CARRY", "30"))
+
+        # caché por contenido: mismos bytes + mismo modelo + mismo muestreo = misma inferencia
+        cache_key = None
+        if result_cache is not None:
+            if video_hash is None:
+                video_hash = file_sha256(video_path)
+            cache_key = result_cache.key(video_hash, model_tag(), {
+                "sample_every": SAMPLE_EVERY,
+                "reader": VIDEO_READER,
+                # seek puede devolver otros frames que read/grab (VFR, GOP roto)
+                "skip_mode": FRAME_SKIP_MODE,
+                "seek_min_stride": SEEK_MIN_STRIDE if FRAME_SKIP_MODE == "seek" else None,
+                "sampling": SAMPLING_MODE,
+                "adaptive": [ADAPTIVE_COARSE_STRIDE, ADAPTIVE_MIN_STRIDE, ADAPTIVE_UNCERTAIN_CONF]
+                            if SAMPLING_MODE == "adaptive" else None,
+                "motion_gate": [MOTION_GATE_THRESHOLD, MOTION_GATE_MAX_CARRY] if MOTION_GATE else None,
+                "phash_distance": infer.max_distance if isinstance(infer, PredictionCache) else None,
+            })
+        cached = result_cache.get(cache_key) if cache_key else None
+
+        # entradas ya clasificadas para /video-stream, lote a lote
+        partial = PartialResultWriter(partial_path(JSON_OUTPUT_DIR, task_id))
+
+        def publish_progress(snapshot: dict):
+            processing_progress[task_id] = snapshot
+
+        progress = TaskProgress(publish_progress,
+                                publish_every=float(os.getenv("PROGRESS_PUBLISH_SECONDS", "1.0")))
+
+        # columnas del resultado (frame, tiempo, clase, conf, sensores), lote a lote
+        builder = ResultBuilder(getattr(infer, "labels", ()), include_sensors=include_sensors)
+
+        def add_entries(idxs: list, results: list, carried: list):
+            # timestamps y unión con sensores de todo el lote de una vez
+            times = frame_times(video_start, idxs, fps)
+            if include_sensors and sensor_track is not None:
+                readings, has_reading = sensor_track.align(times)
+            else:
+                readings, has_reading = None, None
+            part = builder.add(video_path.name, idxs, times, results, carried, readings, has_reading)
+
+            # forma JSON solo para /video-stream y el log
+            entries = list(part.iter_entries())
+            partial.write(entries)
+            if LOG_EVERY_N:
+                for idx, entry in entries:
+                    if idx % LOG_EVERY_N == 0:
+                        log.info("[frame %d] %s | cls=%s(%.3f)",
+                                 idx, entry["timestamp"], entry["cls"]["class"], entry["cls"]["conf"])
+            if idxs:
+                progress.on_emitted(max(idxs))
+
+        if cached is not None:
+            fps, n_frames = cached["fps"], cached["length"]
+            progress.set_total(n_frames, len(cached["frame_idx"]))
+            progress.on_sampled(len(cached["frame_idx"]))  # nada pasa por el modelo
+            log.info("[TASK %s] resultado en caché (%s): %d frames, solo se unen sensores",
+                     task_id, cache_key[:12], len(cached["frame_idx"]))
+            add_entries(cached["frame_idx"].tolist(),
+                        list(zip(cached["label"].tolist(), cached["conf"].tolist())),
+                        cached["carried"].tolist())
+        else:
+            cap = cv2.VideoCapture(str(video_path))
+            if not cap.isOpened():
+                processing_status[task_id] = "error: cannot open video"
+                log.error("[TASK %s] No pude abrir video %s", task_id, video_path)
+                return
+
+            fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+            n_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) if cap.get(cv2.CAP_PROP_FRAME_COUNT) > 0 else None
+            log.info("[TASK %s] procesando video | fps=%.2f | frames=%s", task_id, fps, n_frames)
+
+            sampling_mode = SAMPLING_MODE
+            if sampling_mode == "adaptive" and not n_frames:
+                log.warning("[TASK %s] SAMPLING_MODE=adaptive requiere frame count; uso muestreo fijo", task_id)
+                sampling_mode = "fixed"
+            # el refinamiento adaptativo necesita acceso aleatorio (OpenCV)
+            video_reader = "opencv" if sampling_mode == "adaptive" else VIDEO_READER
+            # con ffmpeg los frames llegan RGB y ya escalados a infer.input_size
+            frames_rgb = video_reader == "ffmpeg"
+            # el adaptativo no sabe de antemano cuántos frames va a clasificar
+            progress.set_total(n_frames, -(-n_frames // SAMPLE_EVERY)
+                               if n_frames and sampling_mode != "adaptive" else None)
+
+            # (frame_idx, frame) a la espera de inferencia; frame=None = reutiliza
+            # la clasificación del último frame inferido (compuerta de cambio)
+            pending: list = []
+            last_cls: list = [None]
+
+            gate = None
+            if MOTION_GATE and sampling_mode != "adaptive":
+                gate = ChangeGate(threshold=MOTION_GATE_THRESHOLD, max_carry=MOTION_GATE_MAX_CARRY)
+
+            def flush_batch():
+                to_infer = [frame for _, frame in pending if frame is not None]
+                inferred = iter(infer.predict_batch(to_infer, rgb=frames_rgb))
+                progress.on_inferred(len(to_infer))
+                results, carried = [], []
+                for _, frame in pending:
+                    carried.append(frame is None)
+                    if frame is not None:
+                        last_cls[0] = next(inferred)
+                    results.append(last_cls[0])
+                add_entries([idx for idx, _ in pending], results, carried)
+                pending.clear()
+
+            # el decodificador llena la cola mientras aquí corre la inferencia
+            try:
+                if sampling_mode == "adaptive":
+                    sampler = AdaptiveSampler(
+                        n_frames,
+                        coarse_stride=ADAPTIVE_COARSE_STRIDE,
+                        min_stride=ADAPTIVE_MIN_STRIDE,
+                        uncertain_conf=ADAPTIVE_UNCERTAIN_CONF,
+                    )
+                    indices = sampler.start()
+                    level = 0
+                    while indices:
+                        for frame_idx, frame in iter_frames_at(cap, indices, seek_min_stride=SEEK_MIN_STRIDE):
+                            progress.on_sampled()
+                            pending.append((frame_idx, frame))
+                            if len(pending) >= BATCH_SIZE:
+                                flush_batch()
+                        if pending:
+                            flush_batch()
+                        log.info("[TASK %s] adaptive nivel %d: %d frames", task_id, level, len(indices))
+                        indices = sampler.refine(builder.cls_map())
+                        level += 1
                 else:
-                    readings = {"Temp": -1.0, "Humidity": -1.0, "CO2": -1.0,
-                                "PM1": -1.0, "PM2.5": -1.0, "PM10": -1.0}
-                entry["sensors"] = readings
-
-            response["data"][frame_idx] = entry
-
-            if LOG_EVERY_N and (frame_idx % LOG_EVERY_N == 0):
-                log.info("[frame %d] %s | cls=%s(%.3f)",
-                         frame_idx, timestamp_str, cam_label, float(cam_conf))
-            frame_idx += 1
-
-        cap.release()
-        video_info[task_id] = response
-
-        out_by_id = (JSON_OUTPUT_DIR / f"{task_id}.json")
+                    if video_reader == "ffmpeg":
+                        cap.release()  # solo se usó para fps / frame count
+                        sampled = FFmpegFrameReader(video_path, SAMPLE_EVERY, size=infer.input_size,
+                                                    threads=FFMPEG_THREADS)
+                    else:
+                        sampled = iter_sampled_frames(cap, SAMPLE_EVERY, mode=FRAME_SKIP_MODE,
+                                                      seek_min_stride=SEEK_MIN_STRIDE)
+                    n_to_infer = 0
+                    with FramePrefetcher(sampled, depth=DECODE_QUEUE_DEPTH) as frames:
+                        for frame_idx, frame in frames:
+                            progress.on_sampled()
+                            if gate is not None and not gate.should_infer(frame, rgb=frames_rgb):
+                                frame = None
+                            else:
+                                n_to_infer += 1
+                            pending.append((frame_idx, frame))
+                            if n_to_infer >= BATCH_SIZE:
+                                flush_batch()
+                                n_to_infer = 0
+
+                    if pending:
+                        flush_batch()
+                    if gate is not None:
+                        log.info("[TASK %s] compuerta de cambio: %d inferidos | %d reutilizados",
+                                 task_id, gate.inferred, gate.skipped)
+            finally:
+                cap.release()
+
+        result = builder.build(video_path.name, n_frames)
+        if cached is None and cache_key:
+            result_cache.put(cache_key, fps, result)
+
+        # un solo .npz por tarea; el nombre legible es un hard link al mismo archivo
+        out_by_id = (JSON_OUTPUT_DIR / f"{task_id}.npz")
         safe_stem = re.sub(r"[^A-Za-z0-9_.-]+", "_", video_path.stem)
-        out_friendly = (JSON_OUTPUT_DIR / f"{nice_ts}_{safe_stem}.json")
-        with out_by_id.open("w", encoding="utf-8") as f:
-            json.dump(response, f, ensure_ascii=False, indent=2)
-        with out_friendly.open("w", encoding="utf-8") as f:
-            json.dump(response, f, ensure_ascii=False, indent=2)
-        log.info("[TASK %s] JSONs guardados -> %s | %s",
-                 task_id, out_by_id, out_friendly)
+        out_friendly = (JSON_OUTPUT_DIR / f"{nice_ts}_{safe_stem}.npz")
+        result.save(out_by_id)
+        try:
+            out_friendly.unlink(missing_ok=True)
+            os.link(out_by_id, out_friendly)
+        except OSError:
+            result.save(out_friendly)
+        log.info("[TASK %s] resultado guardado -> %s | %s (%d frames)",
+                 task_id, out_by_id, out_friendly, len(result))
+        # ya en disco: si la memoria lo desaloja, se relee de ahí
+        video_info[task_id] = result
+
+        # resumen por eventos (pocos KB) para que alertas / UI no relean todo el resultado
+        try:
+            summary = summarize(result, **SMOKE_EVENT_PARAMS)
+            with summary_path(task_id).open("w", encoding="utf-8") as f:
+                json.dump(summary, f, ensure_ascii=False)
+            log.info("[TASK %s] %d eventos de %s", task_id, len(summary["events"]), summary["label"])
+        except Exception as e:
+            log.warning("[TASK %s] no pude generar el resumen de eventos: %s", task_id, e)
 
+        progress.finish()
         processing_status[task_id] = "completed"
         log.info("[TASK %s] COMPLETADO", task_id)
 
     except Exception as e:
         processing_status[task_id] = f"error: {str(e)}"
         log.exception("[TASK %s] ERROR no controlado: %s", task_id, e)
-
-@app.post("/upload-data/")
-async def upload_video_and_sensor(
-    request: Request,
-    background_tasks: BackgroundTasks,
-    video: UploadFile = File(..., description="Video file"),
-    sensor: UploadFile | None = File(None, description="sensor.txt (plain-text)"),
-):
-    try:
-        if video.content_type not in {"video/mp4", "video/avi", "video/mov", "application/octet-stream"}:
-            raise HTTPException(status_code=400, detail="Unsupported video MIME type.")
-        if sensor and sensor.content_type not in {"text/plain"}:
-            raise HTTPException(status_code=400, detail="sensor file must be text/plain")
-
-        task_id = str(uuid.uuid4())
-        processing_status[task_id] = "processing"
-
-        video_path = VIDEO_DIR / Path(video.filename).name
-        with video_path.open("wb") as buffer:
-            while True:
-                if await request.is_disconnected():
-                    buffer.close()
-                    video_path.unlink(missing_ok=True)
-                    processing_status[task_id] = "aborted"
-                    return {"error": "Client disconnected during upload", "status": "failure"}
-                chunk = await video.read(1024 * 1024)
-                if not chunk:
-                    break
-                buffer.write(chunk)
-
-        sensor_path: Optional[Path] = None
-        if sensor:
-            sensor_path = SENSOR_DIR / (Path(sensor.filename).name if sensor.filename else f"{task_id}_sensor.txt")
-            with sensor_path.open("wb") as s_buf:
-                s_buf.write(await sensor.read())
-
+    finally:
+        # terminado (o fallido) el estado ya está publicado; /video-stream sigue desde el JSON final
+        if partial is not None:
+            partial.close()
+
+def start_task(background_tasks: BackgroundTasks, task_id: str, video_path: Path,
+               sensor_path: Optional[Path], video_hash: Optional[str]):
+    """Encola (JOB_BACKEND=sqlite) o agenda en este proceso el procesamiento de un video ya recibido."""
+    if job_queue is not None:
+        job_queue.enqueue(task_id, {
+            "video_path": str(video_path),
+            "sensor_path": str(sensor_path) if sensor_path else None,
+            "include_sensors": sensor_path is not None,
+            "video_hash": video_hash,
+        })
+    else:
         background_tasks.add_task(
             process_video_and_sensor,
             video_path,
             sensor_path,
             task_id,
-            include_sensors=(sensor is not None)
+            include_sensors=(sensor_path is not None),
+            video_hash=video_hash
         )
 
+VIDEO_MIME_TYPES = {"video/mp4", "video/avi", "video/mov", "application/octet-stream"}
+# bytes por escritura a disco al recibir archivos (se juntan los trozos del socket hasta esto)
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+
+# los campos se documentan a mano: el cuerpo se lee en streaming, no con UploadFile
+UPLOAD_OPENAPI = {"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+    "type": "object",
+    "required": ["video"],
+    "properties": {
+        "video": {"type": "string", "format": "binary", "description": "Video file"},
+        "sensor": {"type": "string", "format": "binary", "description": "sensor.txt (plain-text)"},
+    },
+}}}}}
+
+def _safe_name(filename: str) -> str:
+    name = Path(filename or "").name
+    return "" if name in {".", ".."} else name
+
+def sensor_destination(task_id: str, filename: str, content_type: str) -> Path:
+    """Destino del campo `sensor`; sin filename (campo de texto, sin content-type) usa {task_id}_sensor.txt."""
+    if content_type not in {"text/plain"} and (filename or content_type):
+        raise HTTPException(status_code=400, detail="sensor file must be text/plain")
+    return SENSOR_DIR / (_safe_name(filename) or f"{task_id}_sensor.txt")
+
+@app.post("/upload-data/", openapi_extra=UPLOAD_OPENAPI)
+async def upload_video_and_sensor(
+    request: Request,
+    background_tasks: BackgroundTasks,
+):
+    """
+    multipart/form-data con `video` y opcionalmente `sensor`. El cuerpo va directo
+    del socket a VIDEO_DIR / SENSOR_DIR: escrituras en hilos, sha256 y tamaño en la
+    misma pasada (ver src/ingest.py).
+    """
+    task_id = str(uuid.uuid4())
+    try:
+        def destination(field: str, filename: str, content_type: str) -> Optional[Path]:
+            if field == "video":
+                if content_type not in VIDEO_MIME_TYPES:
+                    raise HTTPException(status_code=400, detail="Unsupported video MIME type.")
+                if not _safe_name(filename):
+                    raise HTTPException(status_code=400, detail="video filename is required")
+                return VIDEO_DIR / _safe_name(filename)
+            if field == "sensor":
+                return sensor_destination(task_id, filename, content_type)
+            return None
+
+        await set_task_status(task_id, "processing")
+        try:
+            ingest = MultipartIngest(request.headers.get("content-type", ""), destination,
+                                     chunk_bytes=UPLOAD_CHUNK_BYTES)
+            files = await ingest.ingest(request.stream())
+        except ClientDisconnect:
+            await set_task_status(task_id, "aborted")
+            return {"error": "Client disconnected during upload", "status": "failure"}
+        except BaseException:
+            await set_task_status(task_id, "aborted")
+            raise
+
+        video = files.get("video")
+        if video is None:
+            await set_task_status(task_id, "aborted")
+            raise HTTPException(status_code=400, detail="video file is required")
+        sensor = files.get("sensor")
+        video_path = video["path"]
+        sensor_path: Optional[Path] = sensor["path"] if sensor else None
+        log.info("[TASK %s] recibido %s (%d bytes)%s", task_id, video_path.name, video["size"],
+                 f" + {sensor_path.name}" if sensor_path else "")
+
+        await run_in_threadpool(start_task, background_tasks, task_id, video_path, sensor_path, video["sha256"])
         return {"task_id": task_id, "status": "files uploaded, processing started."}
 
     except Exception as e:
         log.exception("Upload ERROR: %s", e)
         return {"error": str(e), "status": "failure"}
 
+# --- subidas reanudables: crear sesión, PUT de trozos por offset, consultar, finalizar ---
+UPLOAD_SESSION_DIR = Path(os.getenv("UPLOAD_SESSION_DIR", str(BASE_DIR / "uploads")))
+UPLOAD_SESSION_TTL = float(os.getenv("UPLOAD_SESSION_TTL", str(7 * 24 * 3600)))
+upload_sessions = UploadSessions(UPLOAD_SESSION_DIR)
+
+_CONTENT_RANGE_RE = re.compile(r"bytes (\d+)-(\d+)/(\d+|\*)")
+
+async def _session_call(method, session_id: str, *args):
+    """Llama a upload_sessions fuera del event loop; 404 si la sesión no existe."""
+    try:
+        return await run_in_threadpool(method, session_id, *args)
+    except (KeyError, FileNotFoundError):
+        raise HTTPException(status_code=404, detail="unknown upload session")
+
+def _record_and_status(session_id: str, start: int, end: int) -> dict:
+    if end > start:
+        upload_sessions.record(session_id, start, end)
+    return upload_sessions.status(session_id)
+
+@app.post("/uploads")
+async def create_upload_session(
+    filename: str = Query(..., description="Nombre del video (con YYYYMMDDhhmmss)"),
+    size: int = Query(..., ge=0, description="Tamaño total en bytes"),
+    sha256: Optional[str] = Query(None, description="sha256 del archivo completo, se verifica al finalizar"),
+):
+    """Crea una sesión de subida reanudable; los trozos se envían con PUT /uploads/{session_id}."""
+    await asyncio.to_thread(upload_sessions.purge_stale, UPLOAD_SESSION_TTL)
+    try:
+        meta = await asyncio.to_thread(upload_sessions.create, filename, size, sha256)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {**meta, "chunk_bytes": UPLOAD_CHUNK_BYTES}
+
+@app.put("/uploads/{session_id}")
+async def put_upload_chunk(
+    request: Request,
+    session_id: str,
+    offset: Optional[int] = Query(None, ge=0, description="Offset del trozo (o cabecera Content-Range)"),
+):
+    """
+    Cuerpo crudo = bytes del archivo desde `offset` (o `Content-Range: bytes a-b/total`).
+    Se pueden enviar varios trozos en paralelo y reenviar los que fallaron.
+    X-Chunk-Sha256 opcional: si no coincide, el trozo no se marca como recibido.
+    """
+    meta = await _session_call(upload_sessions.meta, session_id)
+    expected_len = None
+    content_range = request.headers.get("content-range")
+    if content_range:
+        m = _CONTENT_RANGE_RE.fullmatch(content_range.strip())
+        if not m:
+            raise HTTPException(status_code=400, detail="invalid Content-Range")
+        offset, last = int(m.group(1)), int(m.group(2))
+        expected_len = last - offset + 1
+    if offset is None:
+        raise HTTPException(status_code=400, detail="offset or Content-Range is required")
+    if request.headers.get("content-length"):
+        expected_len = int(request.headers["content-length"])
+    if offset > meta["size"] or (expected_len is not None and offset + expected_len > meta["size"]):
+        raise HTTPException(status_code=416, detail="chunk outside the declared size")
+
+    try:
+        writer = await HashingFileWriter(upload_sessions.data_path(session_id), offset=offset).open()
+    except (KeyError, FileNotFoundError):
+        # la sesión se borró / venció entre meta() y abrir el archivo
+        raise HTTPException(status_code=404, detail="unknown upload session")
+    try:
+        written = await stream_to_writer(request.stream(), writer, chunk_bytes=UPLOAD_CHUNK_BYTES,
+                                         limit=meta["size"] - offset)
+        chunk_sha = await writer.close()
+    except ClientDisconnect:
+        # lo escrito queda en disco pero sin marcar: se reenvía ese trozo
+        await writer.abort(remove=False)
+        return {"error": "Client disconnected during upload", "status": "failure"}
+    except ValueError as e:
+        await writer.abort(remove=False)
+        raise HTTPException(status_code=416, detail=str(e))
+    except BaseException:
+        await writer.abort(remove=False)
+        raise
+
+    if expected_len is not None and written != expected_len:
+        raise HTTPException(status_code=400, detail=f"expected {expected_len} bytes, got {written}")
+    claimed = request.headers.get("x-chunk-sha256")
+    if claimed and claimed.lower() != chunk_sha:
+        raise HTTPException(status_code=422, detail="chunk sha256 mismatch, resend this range")
+    status = await _session_call(_record_and_status, session_id, offset, offset + written)
+    return {"session_id": session_id, "offset": offset, "bytes": written,
+            "bytes_received": status["bytes_received"], "complete": status["complete"]}
+
+@app.get("/uploads/{session_id}")
+async def get_upload_session(session_id: str):
+    """Rangos recibidos / faltantes ([inicio, fin) en bytes) para reanudar."""
+    return await _session_call(upload_sessions.status, session_id)
+
+@app.delete("/uploads/{session_id}")
+async def delete_upload_session(session_id: str):
+    await _session_call(upload_sessions.remove, session_id)
+    return {"session_id": session_id, "status": "deleted"}
+
+@app.post("/uploads/{session_id}/finalize")
+async def finalize_upload_session(request: Request, background_tasks: BackgroundTasks, session_id: str):
+    """
+    Verifica que llegaron todos los bytes y el sha256, mueve el video a VIDEO_DIR
+    e inicia el procesamiento (mismo task_id / flujo que /upload-data/). El
+    sensor.txt, si lo hay, va en este mismo POST como multipart (`sensor`).
+    """
+    meta = await _session_call(upload_sessions.meta, session_id)
+    task_id = str(uuid.uuid4())
+
+    sensor_path: Optional[Path] = None
+    if request.headers.get("content-type", "").startswith("multipart/form-data"):
+        def destination(field: str, filename: str, content_type: str) -> Optional[Path]:
+            return sensor_destination(task_id, filename, content_type) if field == "sensor" else None
+        files = await MultipartIngest(request.headers["content-type"], destination,
+                                      chunk_bytes=UPLOAD_CHUNK_BYTES).ingest(request.stream())
+        if "sensor" in files:
+            sensor_path = files["sensor"]["path"]
+
+    video_path = VIDEO_DIR / meta["filename"]
+    try:
+        video = await _session_call(upload_sessions.finalize, session_id, video_path)
+    except (HTTPException, RuntimeError, ValueError) as e:
+        if sensor_path is not None:
+            sensor_path.unlink(missing_ok=True)
+        if isinstance(e, HTTPException):
+            raise  # 404: la sesión se borró / venció mientras llegaba el POST
+        raise HTTPException(status_code=409 if isinstance(e, RuntimeError) else 400, detail=str(e))
+
+    await set_task_status(task_id, "processing")
+    log.info("[TASK %s] subida reanudable %s completa (%d bytes)", task_id, video_path.name, video["size"])
+    await run_in_threadpool(start_task, background_tasks, task_id, video_path, sensor_path, video["sha256"])
+    return {"task_id": task_id, "sha256": video["sha256"], "status": "files uploaded, processing started."}
+
+@app.get("/prediction-cache")
+async def get_prediction_cache_stats():
+    cache = PredictionCache._instance
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+def _strip_sensors(payload: dict) -> dict:
+    # copia superficial: solo se arman dicts nuevos por entrada, "cls" se comparte
+    data = {idx: {k: v for k, v in frame.items() if k != "sensors"} if isinstance(frame, dict) else frame
+            for idx, frame in payload.get("data", {}).items()}
+    return {**payload, "data": data}
+
+def result_payload(result, video_only: bool = False) -> Optional[dict]:
+    """JSON de siempre ({"filename", "length", "data"}) a partir del TaskResult (o dict heredado)."""
+    if isinstance(result, TaskResult):
+        return result.to_payload(sensors=not video_only)
+    if not isinstance(result, dict):
+        return None
+    return _strip_sensors(result) if video_only else result
+
+@app.get("/task-store")
+async def get_task_store_stats():
+    """Resultados residentes en memoria, bytes, aciertos / recargas desde disco y desalojos."""
+    stats = video_info.stats() if isinstance(video_info, BoundedResultMap) else {}
+    if isinstance(processing_status, BoundedStatusMap):
+        stats["status_entries"] = len(processing_status)
+        stats["status_evictions"] = processing_status.evictions
+    return stats
+
+STREAM_POLL_SECONDS = float(os.getenv("STREAM_POLL_SECONDS", "0.5"))
+# bytes del parcial leídos por vuelta (en el threadpool) al seguir una tarea
+STREAM_READ_BYTES = 1024 * 1024
+
+def _unsent_entries(task_id: str, from_frame: int, sent: set, video_only: bool) -> list:
+    """Entradas del resultado final que el parcial no alcanzó a entregar (sin armar el payload completo)."""
+    result = video_info.get(task_id)
+    if isinstance(result, dict):
+        result = TaskResult.from_payload(result)
+    if not isinstance(result, TaskResult):
+        return []
+    mask = result.frame_idx >= from_frame
+    if sent:
+        mask &= ~np.isin(result.frame_idx, np.fromiter(sent, dtype=np.int64, count=len(sent)))
+    positions = np.flatnonzero(mask)
+    if not len(positions):
+        return []
+    return [{"frame": idx, **entry}
+            for idx, entry in result.take(positions).sorted().iter_entries(sensors=not video_only)]
+
+@app.get("/video-stream/{task_id}")
+async def stream_video_results(
+    request: Request,
+    task_id: str,
+    from_frame: int = Query(0, description="Solo frames con índice >= from_frame (reanudar)"),
+    fmt: str = Query("ndjson", alias="format", description="ndjson | sse"),
+    video_only: bool = Query(False, description="True = omite sensores"),
+):
+    """
+    Frames ya clasificados y luego los nuevos a medida que se producen.
+    Cada frame: {"frame": idx, "timestamp", "cls", "sensors"?}; al final
+    {"event": "end", "status": ...}. En SSE el id del evento es el frame, y
+    Last-Event-ID reanuda desde el siguiente.
+    """
+    if fmt not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="format must be ndjson or sse")
+    if await get_task_status(task_id) is None:
+        raise HTTPException(status_code=404, detail="unknown task")
+    last_event_id = request.headers.get("last-event-id")
+    if fmt == "sse" and last_event_id and last_event_id.lstrip("-").isdigit():
+        from_frame = max(from_frame, int(last_event_id) + 1)
+
+    def encode(item: dict, event: str) -> str:
+        payload = json.dumps(item, ensure_ascii=False)
+        if fmt == "ndjson":
+            return payload + "\n"
+        event_id = f"id: {item['frame']}\n" if event == "frame" else ""
+        return f"{event_id}event: {event}\ndata: {payload}\n\n"
+
+    def wanted(item: dict) -> bool:
+        if item["frame"] < from_frame or item["frame"] in sent:
+            return False
+        sent.add(item["frame"])
+        if video_only:
+            item.pop("sensors", None)
+        return True
+
+    sent: set = set()
+    path = partial_path(JSON_OUTPUT_DIR, task_id)
+
+    async def events():
+        offset = 0
+        while True:
+            status = await get_task_status(task_id, "unknown task")
+            while True:
+                items, new_offset = await run_in_threadpool(read_new_lines, path, offset, STREAM_READ_BYTES)
+                for item in items:
+                    if wanted(item):
+                        yield encode(item, "frame")
+                if new_offset == offset:
+                    break
+                offset = new_offset
+
+            if status == "completed":
+                # lo que no alcanzó a leerse del parcial sale del resultado final (solo esas filas)
+                for item in await run_in_threadpool(_unsent_entries, task_id, from_frame, sent, video_only):
+                    if wanted(item):
+                        yield encode(item, "frame")
+                yield encode({"event": "end", "status": status, "frames": len(sent)}, "end")
+                return
+            if status != "processing":
+                yield encode({"event": "end", "status": status, "frames": len(sent)}, "end")
+                return
+            if await request.is_disconnected():
+                return
+            await asyncio.sleep(STREAM_POLL_SECONDS)
+
+    media_type = "application/x-ndjson" if fmt == "ndjson" else "text/event-stream"
+    return StreamingResponse(events(), media_type=media_type,
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @app.get("/status/{task_id}")
 async def get_status(task_id: str):
-    return {"task_id": task_id, "status": processing_status.get(task_id, "unknown task")}
+    return {
+        "task_id": task_id,
+        "status": await get_task_status(task_id, "unknown task"),
+        # frames muestreados / inferidos / totales, fps, transcurrido y ETA (ver src/progress.py)
+        "progress": await run_in_threadpool(processing_progress.get, task_id),
+    }
 
 @app.get("/video-info/{task_id}")
-async def get_video_info(task_id: str, video_only: bool = Query(False, description="Si True, omite sensores")):
-    if processing_status.get(task_id) == "completed":
-        payload = video_info.get(task_id)
-        if not isinstance(payload, dict):
+async def get_video_info(
+    task_id: str,
+    video_only: bool = Query(False, description="Si True, omite sensores"),
+    start: Optional[str] = Query(None, description="Desde este instante, inclusive (HH:MM:SS o ISO 8601)"),
+    end: Optional[str] = Query(None, description="Hasta este instante, inclusive (HH:MM:SS o ISO 8601; una fecha sola abarca todo el día)"),
+    frame_from: Optional[int] = Query(None, ge=0, description="Desde este frame, inclusive"),
+    frame_to: Optional[int] = Query(None, ge=0, description="Hasta este frame, inclusive"),
+    label: Optional[str] = Query(None, description="Solo frames de esta clase (p. ej. smoke)"),
+    min_conf: Optional[float] = Query(None, ge=0.0, le=1.0, description="Confianza mínima"),
+    cursor: Optional[int] = Query(None, ge=0, description="next_cursor de la página anterior"),
+    limit: Optional[int] = Query(None, ge=1, description="Entradas máximas por página"),
+):
+    """
+    Sin filtros devuelve el resultado completo. Con alguno, solo las entradas que
+    cumplen todos (índice por tiempo / frame / clase, ver TaskResult.query) y
+    "next_cursor" para pedir la página siguiente (None = no hay más), más
+    "total" con la cantidad de entradas que cumplen los filtros.
+    """
+    if await get_task_status(task_id) == "completed":
+        result = video_info.get(task_id)
+        if all(v is None for v in (start, end, frame_from, frame_to, label, min_conf, cursor, limit)):
+            # en trozos desde las columnas, como /video-json: sin armar ni recorrer el dict completo
+            if isinstance(result, TaskResult):
+                return StreamingResponse(result.iter_json(sensors=not video_only), media_type="application/json")
+            payload = result_payload(result, video_only=video_only)
+            if payload is None:
+                return {"error": "No data for task_id."}
+            return JSONResponse(payload)
+
+        if isinstance(result, dict):
+            result = TaskResult.from_payload(result)
+        if not isinstance(result, TaskResult):
             return {"error": "No data for task_id."}
-        return _strip_sensors(payload) if video_only else payload
+        try:
+            filters = dict(
+                start=result.parse_time(start) if start else None,
+                end=result.parse_time(end, upper=True) if end else None,
+                frame_from=frame_from, frame_to=frame_to,
+                label=label, min_conf=min_conf,
+            )
+            page, next_cursor = result.query(**filters, cursor=cursor, limit=limit)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        # total: entradas que cumplen los filtros en todas las páginas
+        return {**page.to_payload(sensors=not video_only), "next_cursor": next_cursor,
+                "total": result.count(**filters)}
     else:
         return {"error": "Processing is not yet complete, please check the status."}
 
+@app.get("/video-summary/{task_id}")
+async def get_video_summary(
+    task_id: str,
+    label: Optional[str] = Query(None, description="Clase a segmentar (default SMOKE_LABEL)"),
+    enter_conf: Optional[float] = Query(None, ge=0.0, le=1.0, description="P(clase) para abrir un evento"),
+    exit_conf: Optional[float] = Query(None, ge=0.0, le=1.0, description="P(clase) bajo la cual se cierra"),
+    min_duration: Optional[float] = Query(None, ge=0.0, description="Segundos mínimos por evento"),
+    max_gap: Optional[float] = Query(None, ge=0.0, description="Une eventos separados por <= segundos"),
+):
+    """
+    Intervalos de humo con confianza media / máxima y sensores agregados.
+    Con los parámetros por defecto se sirve el resumen calculado al terminar la tarea.
+    """
+    if await get_task_status(task_id) != "completed":
+        return {"error": "Processing is not yet complete, please check the status."}
+    overrides = {k: v for k, v in (("label", label), ("enter_conf", enter_conf), ("exit_conf", exit_conf),
+                                   ("min_duration", min_duration), ("max_gap", max_gap)) if v is not None}
+    path = summary_path(task_id)
+    if not overrides and path.exists():
+        return FileResponse(path, media_type="application/json")
+
+    result = video_info.get(task_id)
+    if isinstance(result, dict):
+        result = TaskResult.from_payload(result)
+    if not isinstance(result, TaskResult):
+        return {"error": "No data for task_id."}
+    try:
+        return summarize(result, **{**SMOKE_EVENT_PARAMS, **overrides})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.get("/video-json/{task_id}")
 async def get_video_json_file(task_id: str, video_only: bool = Query(False, description="True = omite sensores")):
+    npz_path = (JSON_OUTPUT_DIR / f"{task_id}.npz").resolve()
     json_path = (JSON_OUTPUT_DIR / f"{task_id}.json").resolve()
-    if not json_path.exists():
-        return {"error": f"No existe {json_path}. ¿Terminó el procesamiento?"}
-
-    if not video_only:
-        return FileResponse(json_path, media_type="application/json", filename=f"{task_id}.json")
-
-    with json_path.open("r", encoding="utf-8") as f:
-        payload = json.load(f)
-    data_no_sensors = _strip_sensors(payload)
-    tmp_path = (JSON_OUTPUT_DIR / f"{task_id}_video_only.json").resolve()
-    with tmp_path.open("w", encoding="utf-8") as f:
-        json.dump(data_no_sensors, f, ensure_ascii=False, indent=2)
-    return FileResponse(tmp_path, media_type="application/json", filename=f"{task_id}_video_only.json")
-
+    if not npz_path.exists() and not json_path.exists():
+        return {"error": f"No existe {npz_path}. ¿Terminó el procesamiento?"}
+
+    if not npz_path.exists():
+        # resultado de una versión anterior, ya escrito como JSON
+        if not video_only:
+            return FileResponse(json_path, media_type="application/json", filename=f"{task_id}.json")
+        with json_path.open("r", encoding="utf-8") as f:
+            return JSONResponse(_strip_sensors(json.load(f)), headers={
+                "Content-Disposition": f'attachment; filename="{task_id}_video_only.json"'})
+
+    # el JSON se genera al vuelo desde las columnas; video_only ni lee las de sensores
+    result = TaskResult.load(npz_path, sensors=not video_only)
+    filename = f"{task_id}_video_only.json" if video_only else f"{task_id}.json"
+    return StreamingResponse(result.iter_json(), media_type="application/json",
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
@@ -1,6 +1,5 @@
 import os
 import time
-import json
 import requests
 import streamlit as st  # :contentReference[oaicite:0]{index=0}
 
@@ -25,20 +24,20 @@ st.markdown("""
 st.markdown("---")
 
 
+# frames que se piden a /video-info para el log y la vista previa
+PREVIEW_FRAMES = 500
+
+
 def build_execution_log(info_json: dict, max_lines: int = 200) -> str:
     """Construye un texto tipo 'log' a partir del JSON de salida."""
     data = info_json.get("data", {})
     if not isinstance(data, dict) or not data:
         return "// No hay datos de frames en el resultado."
 
-    # Claves de frames pueden venir como strings desde JSON
-    try:
-        sorted_keys = sorted(data.keys(), key=lambda k: int(k))
-    except Exception:
-        sorted_keys = list(data.keys())
-
+    # el backend ya devuelve los frames ordenados: basta con los primeros max_lines
+    # (para otros tramos: /video-info con start / end / label / limit / cursor)
     lines = []
-    for k in sorted_keys:
+    for k in data:
         entry = data.get(k, {})
         frame_idx = k
         try:
@@ -58,9 +57,12 @@ def build_execution_log(info_json: dict, max_lines: int = 200) -> str:
 
         lines.append(line)
         if len(lines) >= max_lines:
-            lines.append(f"... ({len(data)} frames totales, mostrando solo {max_lines})")
             break
 
+    total = info_json.get("total", len(data))
+    if total > len(lines):
+        lines.append(f"... ({total} frames totales, mostrando solo {len(lines)})")
+
     return "\n".join(lines)
 
 
@@ -100,9 +102,9 @@ def render_task_inspection(task_id: str, auto_download: bool = False):
         st.info("💡 La tarea aún no está completada. Vuelve a intentar en unos segundos.")
         return
 
-    # 2) Obtener JSON del backend
+    # 2) Solo la primera página: el JSON completo se baja con el botón de descarga
     try:
-        info_resp = requests.get(f"{API_BASE}/video-info/{task_id}")
+        info_resp = requests.get(f"{API_BASE}/video-info/{task_id}", params={"limit": PREVIEW_FRAMES})
     except Exception as e:
         st.error(f"❌ Error al obtener video-info: {e}")
         return
@@ -118,37 +120,42 @@ def render_task_inspection(task_id: str, auto_download: bool = False):
         st.error(f"❌ El backend devolvió un error: {info_json['error']}")
         return
 
-    # Preparar JSON para descarga
-    json_str = json.dumps(info_json, ensure_ascii=False, indent=2)
-    
-    # 3) Botón de descarga prominente
+    # 3) Descarga: el JSON completo se pide a /video-json recién al prepararla
     col1, col2, col3 = st.columns([1, 2, 1])
     with col2:
-        st.download_button(
-            label="📥 Descargar Resultados (JSON)",
-            data=json_str,
-            file_name=f"deteccion_humo_{task_id}.json",
-            mime="application/json",
-            key=f"download_json_{task_id}",
-            use_container_width=True,
-            type="primary"
-        )
+        prepared_key = f"full_json_{task_id}"
+        if st.button("📦 Preparar JSON completo", key=f"prepare_json_{task_id}", use_container_width=True):
+            try:
+                full_resp = requests.get(f"{API_BASE}/video-json/{task_id}")
+                full_resp.raise_for_status()
+                st.session_state[prepared_key] = full_resp.content
+            except Exception as e:
+                st.error(f"❌ Error al obtener el JSON completo: {e}")
+        if prepared_key in st.session_state:
+            st.download_button(
+                label="📥 Descargar Resultados (JSON)",
+                data=st.session_state[prepared_key],
+                file_name=f"deteccion_humo_{task_id}.json",
+                mime="application/json",
+                key=f"download_json_{task_id}",
+                use_container_width=True,
+                type="primary"
+            )
     
     st.markdown("---")
     
     # 4) Mostrar estadísticas resumidas
-    data = info_json.get("data", {})
-    if data:
-        total_frames = len(data)
+    total_frames = info_json.get("total", len(info_json.get("data", {})))
+    if total_frames:
         st.metric("Total de Frames Analizados", f"{total_frames:,}")
     
     # 5) Opción para ver detalles
     with st.expander("📊 Ver análisis detallado", expanded=auto_download):
         # Tabs para organizar información
-        tab1, tab2 = st.tabs(["📜 Log de Ejecución", "📄 JSON Completo"])
+        tab1, tab2 = st.tabs(["📜 Log de Ejecución", f"📄 JSON (primeros {PREVIEW_FRAMES} frames)"])
         
         with tab1:
-            logs_text = build_execution_log(info_json, max_lines=500)
+            logs_text = build_execution_log(info_json, max_lines=PREVIEW_FRAMES)
             st.text_area("Log de frames procesados", logs_text, height=400)
         
         with tab2:
@@ -238,10 +245,6 @@ with tab_upload:
 
                 while True:
                     time.sleep(2.0)
-                    poll_steps = min(poll_steps + 1, max_steps)
-                    progress_bar.progress(
-                        poll_steps / max_steps, text="Procesando video…"
-                    )
 
                     status_resp = requests.get(f"{API_BASE}/status/{task_id}")
                     if not status_resp.ok:
@@ -252,6 +255,25 @@ with tab_upload:
 
                     status_data = status_resp.json()
                     status = status_data.get("status", "desconocido")
+
+                    # avance real si el backend lo publica; si no, la barra por polls
+                    progress = status_data.get("progress") or {}
+                    if progress.get("percent") is not None:
+                        eta = progress.get("eta_seconds")
+                        progress_bar.progress(
+                            min(1.0, progress["percent"] / 100),
+                            text=(
+                                f"Procesando video… {progress['percent']:.0f}% | "
+                                f"{progress.get('frames_inferred', 0)} frames | "
+                                f"{progress.get('infer_fps', 0):.1f} fps"
+                                + (f" | ETA {eta:.0f}s" if eta is not None else "")
+                            ),
+                        )
+                    else:
+                        poll_steps = min(poll_steps + 1, max_steps)
+                        progress_bar.progress(
+                            poll_steps / max_steps, text="Procesando video…"
+                        )
                     status_placeholder.info(
                         f"Estado de la tarea **{task_id}**: `{status}`"
                     )
@@ -8,7 +8,7 @@ import numpy as np
 import cv2
 
 from src.camera_inference import CameraInference
-from src.utils import read_sensor_data_to_df, sensor_at
+from src.utils import read_sensor_data_to_df, SensorTrack, SENSOR_FIELDS, frame_times
 
 app = FastAPI()
 BATCH_SIZE = 16
@@ -134,12 +134,11 @@ def process_video_and_sensor(video_path: Path, sensor_path: Path | None, task_id
     video_start = datetime(*map(int, m.groups()))
     cls_inference = CameraInference.get_instance()
 
-    sensor_data = None
-    sensor_times = None
+    sensor_track = None
     if include_sensors and sensor_path is not None:
         sensor_data = read_sensor_data_to_df(sensor_path)
         if "Datetime" in sensor_data.columns and not sensor_data.empty:
-            sensor_times = sensor_data["Datetime"].values.astype("datetime64[ns]")
+            sensor_track = SensorTrack(sensor_data)
 
     response: dict[str, object] = {}
 
@@ -149,11 +148,33 @@ def process_video_and_sensor(video_path: Path, sensor_path: Path | None, task_id
         n_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) if cap.get(cv2.CAP_PROP_FRAME_COUNT) > 0 else None
 
         SAMPLE_EVERY = int(os.getenv("SAMPLE_EVERY", "5"))
+        batch_size = max(1, int(os.getenv("BATCH_SIZE", str(BATCH_SIZE))))
 
         frame_idx = 0
         response["filename"] = Path(video_path).name
         response["length"] = n_frames
         response["data"] = {}
+        pending = []  # (frame_idx, frame) a la espera de inferencia
+
+        missing = {field: -1.0 for field in SENSOR_FIELDS}
+
+        def flush_batch():
+            idxs = [idx for idx, _ in pending]
+            results = cls_inference.predict_batch([frame for _, frame in pending])
+            for idx, (cam_label, cam_conf) in zip(idxs, results):
+                response["data"][idx]["cls"] = {'class': cam_label, 'conf': float(cam_conf)}
+
+            if include_sensors:
+                # una sola búsqueda por lote para todos sus timestamps
+                if sensor_track is not None:
+                    values, valid = sensor_track.align(frame_times(video_start, idxs, fps))
+                else:
+                    values, valid = None, np.zeros(len(idxs), dtype=bool)
+                for i, idx in enumerate(idxs):
+                    response["data"][idx]["sensors"] = (
+                        dict(zip(SENSOR_FIELDS, values[i].tolist())) if valid[i] else dict(missing)
+                    )
+            pending.clear()
 
         while cap.isOpened():
             ok, frame = cap.read()
@@ -167,34 +188,17 @@ def process_video_and_sensor(video_path: Path, sensor_path: Path | None, task_id
             now = video_start + timedelta(seconds=frame_idx / fps)
             timestamp_str = now.strftime("%H:%M:%S")
 
-            s_row = None
-            if include_sensors and sensor_times is not None:
-                s_idx = sensor_at(now, sensor_times)
-                if s_idx is not None:
-                    s_row = sensor_data.iloc[s_idx]
-
-            response["data"][frame_idx] = {"timestamp": timestamp_str}
-
-            cam_label, cam_conf = cls_inference.predict(frame)
-            response["data"][frame_idx]["cls"] = {'class': cam_label, 'conf': float(cam_conf)}
-
-            if include_sensors:
-                if s_row is not None:
-                    readings = {
-                        "Temp": float(s_row.get("Temp", np.nan)),
-                        "Humidity": float(s_row.get("Humidity", np.nan)),
-                        "CO2": float(s_row.get("CO2", np.nan)),
-                        "PM1": float(s_row.get("PM1", np.nan)),
-                        "PM2.5": float(s_row.get("PM2.5", np.nan)),
-                        "PM10": float(s_row.get("PM10", np.nan)),
-                    }
-                else:
-                    readings = {"Temp": -1.0, "Humidity": -1.0, "CO2": -1.0,
-                                "PM1": -1.0, "PM2.5": -1.0, "PM10": -1.0}
-                response["data"][frame_idx]["sensors"] = readings
+            # "cls" y "sensors" se completan al vaciar el lote
+            response["data"][frame_idx] = {"timestamp": timestamp_str, "cls": None}
+            pending.append((frame_idx, frame))
 
+            if len(pending) >= batch_size:
+                flush_batch()
             frame_idx += 1
 
+        if pending:
+            flush_batch()
+
         cap.release()
         processed_data = response
         processing_status[task_id] = "completed"
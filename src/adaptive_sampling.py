@@ -0,0 +1,60 @@
+# src/adaptive_sampling.py
+import bisect
+
+
+class AdaptiveSampler:
+    """
+    Muestreo temporal grueso-a-fino: primero se clasifica cada `coarse_stride`
+    frames; luego, entre dos muestras vecinas cuya clase cambia o cuya confianza
+    cae bajo `uncertain_conf`, se agrega el punto medio, nivel por nivel, hasta
+    que los vecinos quedan a `min_stride` frames.
+
+    Todos los índices caen en la grilla de `min_stride` (la misma de
+    SAMPLE_EVERY), así que el resultado es un subconjunto del muestreo denso y
+    un cambio de clase queda ubicado con la misma precisión. Un evento más corto
+    que `coarse_stride` entre dos muestras seguras y de igual clase no se ve.
+
+    Uso: indices = sampler.start(); mientras haya índices, clasificarlos y
+    llamar indices = sampler.refine(data) con data[idx]["cls"] = {"class", "conf"}.
+    """
+
+    def __init__(self, n_frames: int, coarse_stride: int, min_stride: int,
+                 uncertain_conf: float = 0.8):
+        self.min_stride = max(1, int(min_stride))
+        # grueso como múltiplo del fino para que los puntos medios caigan en la grilla
+        self.coarse_stride = max(self.min_stride, int(coarse_stride) // self.min_stride * self.min_stride)
+        self.n_frames = int(n_frames)
+        self.uncertain_conf = float(uncertain_conf)
+        self.sampled: list = []  # índices ya pedidos, ordenados
+
+    def start(self) -> list:
+        last = (self.n_frames - 1) // self.min_stride * self.min_stride
+        indices = list(range(0, last + 1, self.coarse_stride))
+        if indices and indices[-1] != last:
+            indices.append(last)  # cierra el último intervalo
+        return self._take(indices)
+
+    def _take(self, indices) -> list:
+        for idx in indices:
+            bisect.insort(self.sampled, idx)
+        return indices
+
+    def _needs_refine(self, a: dict, b: dict) -> bool:
+        if a is None or b is None:
+            return False  # frame no legible: no se refina a su alrededor
+        return (a["class"] != b["class"]
+                or a["conf"] < self.uncertain_conf
+                or b["conf"] < self.uncertain_conf)
+
+    def refine(self, data: dict) -> list:
+        """Siguiente nivel: puntos medios de los intervalos a refinar (vacío = terminado)."""
+        indices = []
+        for a, b in zip(self.sampled, self.sampled[1:]):
+            gap = b - a
+            if gap <= self.min_stride:
+                continue
+            cls_a = data[a]["cls"] if a in data else None
+            cls_b = data[b]["cls"] if b in data else None
+            if self._needs_refine(cls_a, cls_b):
+                indices.append(a + max(1, gap // 2 // self.min_stride) * self.min_stride)
+        return self._take(indices)
@@ -0,0 +1,162 @@
+# src/backends.py
+import os
+import copy
+import logging
+import tempfile
+from pathlib import Path
+
+import torch
+
+from src.utils import file_sha256
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+logging.basicConfig(level=getattr(logging, LOG_LEVEL, logging.INFO),
+                    format="%(asctime)s %(levelname)s %(message)s")
+log = logging.getLogger("inference-backends")
+
+AVAILABLE_BACKENDS = ['eager', 'torchscript', 'compile', 'onnxruntime']
+
+_ARTIFACT_EXT = {'torchscript': 'ts', 'onnxruntime': 'onnx'}
+
+
+def artifact_path(model_weights, backend: str, weights_hash: str, input_size: tuple,
+                  precision: str = 'fp32', cache_dir=None) -> Path:
+    """
+    Ruta del artefacto exportado, junto a los pesos (o en cache_dir; build_runner
+    cae a FALLBACK_CACHE_DIR si esa carpeta es de solo lectura). La clave
+    incluye hash de los pesos, tamaño de entrada, precisión y versión de torch,
+    así que un cambio en cualquiera fuerza una nueva exportación.
+    """
+    weights = Path(model_weights)
+    folder = Path(cache_dir) if cache_dir else weights.parent
+    h, w = input_size
+    tag = f"{weights_hash[:12]}.{h}x{w}.{precision}.torch{torch.__version__.split('+')[0]}"
+    return folder / f"{weights.stem}.{tag}.{_ARTIFACT_EXT[backend]}"
+
+
+# si ni la carpeta de los pesos ni INFER_CACHE_DIR son escribibles
+FALLBACK_CACHE_DIR = Path(tempfile.gettempdir()) / "smoke-infer-cache"
+
+
+def _writable(folder: Path) -> bool:
+    try:
+        folder.mkdir(parents=True, exist_ok=True)
+    except OSError:
+        return False
+    return os.access(folder, os.W_OK)
+
+
+def _dummy_input(model: torch.nn.Module, input_size: tuple, batch: int = 2) -> torch.Tensor:
+    param = next(model.parameters())
+    return torch.zeros((batch, 3, *input_size), dtype=param.dtype, device=param.device)
+
+
+def export_torchscript(model: torch.nn.Module, path: Path, input_size: tuple) -> Path:
+    with torch.no_grad():
+        traced = torch.jit.trace(model, _dummy_input(model, input_size), check_trace=False)
+        traced = torch.jit.freeze(traced.eval())
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    torch.jit.save(traced, str(tmp_path))
+    os.replace(tmp_path, path)
+    return path
+
+
+def export_onnx(model: torch.nn.Module, path: Path, input_size: tuple, opset: int = 17) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    kwargs = dict(
+        input_names=['input'],
+        output_names=['logits'],
+        dynamic_axes={'input': {0: 'batch'}, 'logits': {0: 'batch'}},
+        opset_version=opset,
+    )
+    if next(model.parameters()).dtype != torch.float32:
+        model = copy.deepcopy(model).float()
+    dummy = _dummy_input(model, input_size)
+    with torch.no_grad():
+        try:
+            torch.onnx.export(model, dummy, str(tmp_path), dynamo=False, **kwargs)
+        except TypeError:
+            # torch < 2.5 no conoce `dynamo`
+            torch.onnx.export(model, dummy, str(tmp_path), **kwargs)
+    os.replace(tmp_path, path)
+    return path
+
+
+class OnnxRunner:
+    """Ejecuta el modelo exportado con ONNX Runtime; devuelve logits como tensor."""
+
+    def __init__(self, path: Path, device: torch.device, num_threads: int = 0):
+        import onnxruntime as ort
+
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads > 0:
+            opts.intra_op_num_threads = num_threads
+        providers = ['CPUExecutionProvider']
+        if device.type == 'cuda' and 'CUDAExecutionProvider' in ort.get_available_providers():
+            providers.insert(0, 'CUDAExecutionProvider')
+        self.session = ort.InferenceSession(str(path), sess_options=opts, providers=providers)
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, batch: torch.Tensor) -> torch.Tensor:
+        x = batch.detach().float().cpu().contiguous().numpy()
+        return torch.from_numpy(self.session.run(None, {self.input_name: x})[0])
+
+
+def prepare_artifact(model: torch.nn.Module, backend: str, model_weights: str, weights_hash: str,
+                     input_size: tuple, precision: str = 'fp32', cache_dir=None) -> Path:
+    """
+    Ruta del artefacto torchscript / onnxruntime, exportándolo solo si todavía no
+    está en disco (en FALLBACK_CACHE_DIR si la carpeta pedida es de solo lectura).
+    """
+    if backend == 'onnxruntime':
+        precision = 'fp32'  # el export ONNX es siempre fp32
+    path = artifact_path(model_weights, backend, weights_hash, input_size,
+                         precision=precision, cache_dir=cache_dir)
+    fallback = artifact_path(model_weights, backend, weights_hash, input_size,
+                             precision=precision, cache_dir=FALLBACK_CACHE_DIR)
+    if not path.exists() and (fallback.exists() or not _writable(path.parent)):
+        if not fallback.exists():
+            log.warning("Backend %s: %s no es escribible, exporto en %s", backend, path.parent, fallback.parent)
+        path = fallback
+    if path.exists():
+        log.info("Backend %s: usando artefacto en caché %s", backend, path)
+    else:
+        log.info("Backend %s: exportando %s -> %s", backend, model_weights, path)
+        if backend == 'torchscript':
+            export_torchscript(model, path, input_size)
+        else:
+            export_onnx(model, path, input_size)
+    return path
+
+
+def load_artifact(backend: str, path: Path, device: torch.device):
+    """Runner desde un artefacto ya exportado (lo usan también los workers de InferencePool)."""
+    if backend == 'torchscript':
+        runner = torch.jit.load(str(path), map_location=device)
+        runner.eval()
+        return runner
+    return OnnxRunner(path, device, num_threads=torch.get_num_threads())
+
+
+def build_runner(model: torch.nn.Module, backend: str, model_weights: str, weights_hash: str,
+                 input_size: tuple, device: torch.device, precision: str = 'fp32', cache_dir=None):
+    """
+    Devuelve un callable batch (N, 3, H, W) -> logits para el backend pedido.
+    torchscript / onnxruntime exportan una vez y reutilizan el artefacto en disco;
+    compile usa torch.compile (su caché la gestiona inductor).
+    """
+    if backend not in AVAILABLE_BACKENDS:
+        raise ValueError(f"Backend {backend} is not available, try one of: {AVAILABLE_BACKENDS}")
+
+    if backend == 'eager':
+        return model
+
+    if backend == 'compile':
+        return torch.compile(model, mode=os.getenv("TORCH_COMPILE_MODE", "default"))
+
+    path = prepare_artifact(model, backend, model_weights, weights_hash, input_size,
+                            precision=precision, cache_dir=cache_dir)
+    return load_artifact(backend, path, device)
@@ -0,0 +1,156 @@
+# src/batcher.py
+import os
+import time
+import queue
+import threading
+import logging
+from concurrent.futures import Future
+
+import torch
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+logging.basicConfig(level=getattr(logging, LOG_LEVEL, logging.INFO),
+                    format="%(asctime)s %(levelname)s %(message)s")
+log = logging.getLogger("micro-batcher")
+
+
+class _Request:
+    __slots__ = ("batch", "future")
+
+    def __init__(self, batch: torch.Tensor):
+        self.batch = batch
+        self.future = Future()
+
+
+class MicroBatcher:
+    """
+    Servicio de inferencia en proceso que junta los frames de todas las tareas
+    activas: cada llamador preprocesa en su hilo y encola; un hilo único arma
+    lotes de hasta `max_batch` frames o `max_wait_ms`, corre una sola pasada del
+    modelo y devuelve a cada llamador su parte.
+
+    Solo espera si hay otros llamadores en curso que todavía no encolaron: con
+    una sola tarea activa el lote sale de inmediato, sin pagar max_wait_ms.
+
+    Misma interfaz que CameraInference / InferencePool (predict / predict_batch);
+    `predictor` es cualquiera de los dos.
+    """
+
+    _instance: 'MicroBatcher' = None
+
+    def __init__(self, predictor, max_batch: int = 32, max_wait_ms: float = 10.0):
+        self.predictor = predictor
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.input_size = predictor.input_size
+        self.labels = predictor.labels
+
+        self._queue = queue.Queue()
+        self._closed = False
+        self._stopping = False
+        self._carry = None
+        self._active = 0  # llamadores dentro de predict_batch (preprocesando o esperando)
+        self._lock = threading.Lock()  # _active y el par (chequeo de _closed, encolar) / cierre
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+        log.info("MicroBatcher listo | max_batch=%d | max_wait=%.1fms", self.max_batch, max_wait_ms)
+
+    @classmethod
+    def get_instance(cls, predictor=None, max_batch: int = 32, max_wait_ms: float = 10.0) -> 'MicroBatcher':
+        if cls._instance is None:
+            cls._instance = cls(predictor, max_batch=max_batch, max_wait_ms=max_wait_ms)
+        return cls._instance
+
+    def _collect(self):
+        """Bloquea hasta el primer pedido y junta más hasta llenar el lote o vencer la espera."""
+        if self._carry is not None:
+            first, self._carry = self._carry, None
+        elif self._stopping:
+            return None
+        else:
+            first = self._queue.get()
+        if first is None:
+            return None
+
+        requests = [first]
+        size = first.batch.shape[0]
+        deadline = time.monotonic() + self.max_wait
+        # sin otros llamadores activos no hay nada que esperar
+        while size < self.max_batch and len(requests) < self._active:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                req = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if req is None:
+                self._stopping = True
+                break
+            if size + req.batch.shape[0] > self.max_batch:
+                # no entra en este lote: queda para la siguiente vuelta
+                self._carry = req
+                break
+            requests.append(req)
+            size += req.batch.shape[0]
+        return requests
+
+    def _run(self):
+        while True:
+            requests = self._collect()
+            if requests is None:
+                break
+            try:
+                batch = torch.cat([r.batch for r in requests]) if len(requests) > 1 else requests[0].batch
+                probs = self.predictor.predict_probs(batch)
+            except Exception as e:
+                for r in requests:
+                    r.future.set_exception(e)
+                continue
+
+            start = 0
+            for r in requests:
+                n = r.batch.shape[0]
+                r.future.set_result(probs[start:start + n])
+                start += n
+
+    def predict(self, image):
+        return self.predict_batch([image])[0]
+
+    def predict_batch(self, images, rgb: bool = False):
+        if len(images) == 0:
+            return []
+        if self._closed:
+            raise RuntimeError("micro-batcher is closed")
+        with self._lock:
+            self._active += 1
+        try:
+            # clone: prepare_batch devuelve una vista del buffer del hilo llamante
+            req = _Request(self.predictor.prepare_batch(images, rgb=rgb).clone())
+            with self._lock:
+                # close() pudo correr mientras se preprocesaba: ya nadie leería la cola
+                if self._closed:
+                    raise RuntimeError("micro-batcher is closed")
+                self._queue.put(req)
+            return self.predictor.decode(req.future.result())
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join()
+        # pedidos encolados antes del cierre que quedaron detrás del None
+        while True:
+            try:
+                req = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if req is not None:
+                req.future.set_exception(RuntimeError("micro-batcher is closed"))
+        if MicroBatcher._instance is self:
+            MicroBatcher._instance = None
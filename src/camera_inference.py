@@ -1,20 +1,27 @@
 # camera_inference.py (root)
+import os
 import torch
 from torchvision import models, transforms
 import cv2
 
+from src.preprocess import IMAGENET_MEAN, IMAGENET_STD, TensorPreprocessor
+from src.backends import AVAILABLE_BACKENDS, build_runner, file_sha256, load_artifact, prepare_artifact
+from src.quantize import prepare_int8
+
 class CameraInference:
     """
     Solo CLASIFICACIÓN (sin YOLO).
     """
 
     AVAILABLE_MODELS = ['swinv2']
+    PREPROCESS_MODES = ['tensor', 'pil']
     _instance: 'CameraInference' = None
 
     def __init__(self, model_name: str = 'swinv2', model_weights: str = '',
                  num_classes: int = 2, pretrained: bool = True,
                  device: torch.device = None, labels: list = ['no_smoke', 'smoke'],
-                 half: bool = False):
+                 half: bool = False, preprocess: str = 'tensor', backend: str = 'eager',
+                 int8: bool = False):
         if device is None:
             device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
         else:
@@ -22,37 +29,69 @@ class CameraInference:
 
         self.device = device
         self.half = half
+        self.int8 = bool(int8)
 
         if model_name not in self.AVAILABLE_MODELS:
             raise ValueError(f"Model {model_name} is not available, Try: {self.AVAILABLE_MODELS}.")
+        if preprocess not in self.PREPROCESS_MODES:
+            raise ValueError(f"Preprocess {preprocess} is not available, Try: {self.PREPROCESS_MODES}.")
+        if backend not in AVAILABLE_BACKENDS:
+            raise ValueError(f"Backend {backend} is not available, Try: {AVAILABLE_BACKENDS}.")
+        if self.int8 and (self.device.type != 'cpu' or backend == 'onnxruntime'):
+            raise ValueError("INT8 mode is CPU-only and not available with the onnxruntime backend.")
 
-        if model_name == 'swinv2':
-            self.model = models.swin_v2_b(weights=None)
-            self.model.head = torch.nn.Linear(
-                in_features=self.model.head.in_features,
-                out_features=num_classes
-            )
+        self.model_name = model_name
+        self.model = self.build_skeleton(model_name, num_classes)
 
-        self.model.to(self.device)
-        self.model.load_state_dict(torch.load(model_weights, map_location=device))
-        if self.half and self.device.type == "cuda":
-            self.model.half()
+        self.model_weights = model_weights
+        self.num_classes = num_classes
+        self._weights_hash = None
+        self.int8_path = None
+        cache_dir = os.getenv("INFER_CACHE_DIR") or None
+
+        if self.int8:
+            # Linear cuantizadas a INT8 (ver src/quantize.py); con caché no se cargan los pesos fp32
+            self.model, self.int8_path = prepare_int8(self.model, model_weights, self.weights_hash, cache_dir)
+        else:
+            self.model.to(self.device)
+            self.model.load_state_dict(torch.load(model_weights, map_location=device))
+            if self.half and self.device.type == "cuda":
+                self.model.half()
         self.model.eval()
 
+        self.input_size = (256, 256)  # (H, W)
         self.transform = transforms.Compose([
             transforms.ToPILImage(),
-            transforms.Resize((256, 256), transforms.InterpolationMode.BICUBIC),
+            transforms.Resize(self.input_size, transforms.InterpolationMode.BICUBIC),
             transforms.ToTensor(),
-            transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
+            transforms.Normalize(IMAGENET_MEAN, IMAGENET_STD)
         ])
+        # 'tensor': resize/normalize por lote sin PIL (ver src/preprocess.py, PIL_TOLERANCE)
+        self.preprocess = preprocess
+        self.preprocessor = TensorPreprocessor(self.input_size)
 
         self.labels = labels
 
+        # eager | torchscript | compile | onnxruntime (ver src/backends.py)
+        self.backend = backend
+        self.artifact_path = None
+        if backend in ('torchscript', 'onnxruntime'):
+            # la ruta queda a mano para que los workers del pool carguen el mismo artefacto
+            self.artifact_path = prepare_artifact(
+                self.model, backend, model_weights, self.weights_hash,
+                self.input_size, precision=self.precision, cache_dir=cache_dir,
+            )
+            self.runner = load_artifact(backend, self.artifact_path, self.device)
+        else:
+            self.runner = build_runner(self.model, backend, model_weights, '',
+                                       self.input_size, self.device, precision=self.precision)
+
     @classmethod
     def get_instance(cls, model_name: str = 'swinv2', model_weights: str = '',
                      num_classes: int = 2, pretrained: bool = True,
                      device: torch.device = None, labels: list = ['no_smoke', 'smoke'],
-                     half: bool = False) -> 'CameraInference':
+                     half: bool = False, preprocess: str = 'tensor',
+                     backend: str = 'eager', int8: bool = False) -> 'CameraInference':
         if cls._instance is None:
             cls._instance = cls(
                 model_name=model_name,
@@ -61,22 +100,93 @@ class CameraInference:
                 pretrained=pretrained,
                 device=device,
                 labels=labels,
-                half=half
+                half=half,
+                preprocess=preprocess,
+                backend=backend,
+                int8=int8
             )
         return cls._instance
 
+    @staticmethod
+    def build_skeleton(model_name: str = 'swinv2', num_classes: int = 2) -> torch.nn.Module:
+        """Arquitectura sin pesos cargados."""
+        if model_name == 'swinv2':
+            model = models.swin_v2_b(weights=None)
+            model.head = torch.nn.Linear(
+                in_features=model.head.in_features,
+                out_features=num_classes
+            )
+        return model
+
+    @property
+    def precision(self) -> str:
+        if self.int8:
+            return 'int8'
+        return 'fp16' if (self.half and self.device.type == "cuda") else 'fp32'
+
+    @property
+    def weights_hash(self) -> str:
+        """sha256 del archivo de pesos (se calcula una vez)."""
+        if self._weights_hash is None:
+            self._weights_hash = file_sha256(self.model_weights)
+        return self._weights_hash
+
+    def _label(self, pred_idx: int) -> str:
+        return self.labels[pred_idx] if pred_idx < len(self.labels) else str(pred_idx)
+
     def predict(self, image):
-        rgb_frame = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        img_tensor = self.transform(rgb_frame).unsqueeze(0).to(self.device)
+        """
+        image: BGR (cv2)
+        return:
+          label (str), confidence (float)
+        """
+        return self.predict_batch([image])[0]
+
+    def prepare_batch(self, images, rgb: bool = False) -> torch.Tensor:
+        """
+        images: lista de frames BGR (cv2), o RGB si rgb=True
+        return:
+          tensor (N, 3, H, W) normalizado, en CPU
+        """
+        if self.preprocess == 'tensor':
+            return self.preprocessor(images, rgb=rgb)
+        return torch.stack([
+            self.transform(image if rgb else cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+            for image in images
+        ])
+
+    def decode(self, probs):
+        """
+        probs: array (N, num_classes) de probabilidades
+        return:
+          lista de (label (str), confidence (float))
+        """
+        pred_idx = probs.argmax(axis=1)
+        return [
+            (self._label(int(i)), float(probs[row, i]))
+            for row, i in enumerate(pred_idx)
+        ]
+
+    def predict_probs(self, batch: torch.Tensor):
+        """
+        batch: tensor (N, 3, H, W) ya preprocesado (prepare_batch)
+        return:
+          array (N, num_classes) de probabilidades
+        """
+        batch = batch.to(self.device)
         if self.half and self.device.type == "cuda":
-            img_tensor = img_tensor.half()
+            batch = batch.half()
 
         with torch.no_grad():
-            outputs = self.model(img_tensor)
-            probs = torch.nn.functional.softmax(outputs, dim=1)[0].cpu().numpy()
-            pred_idx = int(probs.argmax())
-            confidence = float(probs[pred_idx])
-            label = self.labels[pred_idx]
-
-        return label, confidence
+            outputs = self.runner(batch)
+            return torch.nn.functional.softmax(outputs, dim=1).detach().cpu().numpy()
 
+    def predict_batch(self, images, rgb: bool = False):
+        """
+        images: lista de frames BGR (cv2), o RGB si rgb=True
+        return:
+          lista de (label (str), confidence (float)), en el mismo orden
+        """
+        if len(images) == 0:
+            return []
+        return self.decode(self.predict_probs(self.prepare_batch(images, rgb=rgb)))
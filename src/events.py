@@ -0,0 +1,104 @@
+# src/events.py
+import numpy as np
+
+from src.result_store import TaskResult
+from src.utils import hhmmss
+
+
+def smoke_probability(result: TaskResult, label: str = "smoke") -> np.ndarray:
+    """P(label) por frame: conf si la clase es `label`, 1 - conf si no (clasificador binario)."""
+    if label not in result.labels:
+        return np.zeros(len(result), dtype=np.float64)
+    is_label = result.class_id == result.labels.index(label)
+    conf = result.conf.astype(np.float64)
+    return np.where(is_label, conf, 1.0 - conf)
+
+
+def hysteresis(prob: np.ndarray, enter_conf: float, exit_conf: float) -> np.ndarray:
+    """
+    Estado por frame con histéresis: entra cuando prob >= enter_conf y sale
+    cuando prob < exit_conf; en medio conserva el estado anterior.
+    """
+    if enter_conf < exit_conf:
+        raise ValueError("enter_conf must be >= exit_conf")
+    decided = (prob >= enter_conf) | (prob < exit_conf)
+    # posición de la última decisión en cada frame (-1 = todavía ninguna)
+    last = np.maximum.accumulate(np.where(decided, np.arange(len(prob)), -1)) if len(prob) else np.empty(0, int)
+    return np.where(last >= 0, prob[np.maximum(last, 0)] >= enter_conf, False)
+
+
+def _runs(mask: np.ndarray) -> list:
+    """[(inicio, fin)] posiciones inclusivas de los tramos en True."""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return list(zip(np.flatnonzero(edges == 1).tolist(), (np.flatnonzero(edges == -1) - 1).tolist()))
+
+
+def _seconds(times: np.ndarray, a: int, b: int) -> float:
+    return float((times[b] - times[a]) / np.timedelta64(1, "s"))
+
+
+def smoke_events(result: TaskResult, label: str = "smoke", enter_conf: float = 0.6, exit_conf: float = 0.4,
+                 min_duration: float = 1.0, max_gap: float = 0.0) -> list:
+    """
+    Colapsa la clasificación por frame en intervalos de `label`.
+      - enter_conf / exit_conf: umbrales de histéresis sobre P(label).
+      - max_gap: une intervalos separados por <= max_gap segundos.
+      - min_duration: descarta intervalos más cortos (segundos entre el primer y el último frame).
+    Cada evento trae frames, inicio / fin, confianza media / máxima y, si la
+    tarea tiene sensores, media / máximo por campo de las lecturas válidas.
+    """
+    prob = smoke_probability(result, label)
+    runs = _runs(hysteresis(prob, enter_conf, exit_conf))
+
+    merged = []
+    for a, b in runs:
+        if merged and _seconds(result.times, merged[-1][1], a) <= max_gap:
+            merged[-1] = (merged[-1][0], b)
+        else:
+            merged.append((a, b))
+
+    events = []
+    for a, b in merged:
+        duration = _seconds(result.times, a, b)
+        if duration < min_duration:
+            continue
+        start, end = hhmmss(result.times[[a, b]])
+        event = {
+            "start_frame": int(result.frame_idx[a]),
+            "end_frame": int(result.frame_idx[b]),
+            "start": start,
+            "end": end,
+            "start_time": str(result.times[a].astype("datetime64[s]")),
+            "end_time": str(result.times[b].astype("datetime64[s]")),
+            "duration_seconds": round(duration, 3),
+            "frames": b - a + 1,
+            "conf_mean": round(float(prob[a:b + 1].mean()), 4),
+            "conf_max": round(float(prob[a:b + 1].max()), 4),
+        }
+        if result.has_sensors:
+            readings = result.sensors[a:b + 1][result.sensor_valid[a:b + 1]]
+            event["sensors"] = {
+                field: {"mean": round(float(np.nanmean(col)), 3), "max": round(float(np.nanmax(col)), 3)}
+                for field, col in zip(result.sensor_fields, readings.T)
+                if not np.all(np.isnan(col))
+            } if len(readings) else None
+        events.append(event)
+    return events
+
+
+def summarize(result: TaskResult, label: str = "smoke", enter_conf: float = 0.6, exit_conf: float = 0.4,
+              min_duration: float = 1.0, max_gap: float = 0.0) -> dict:
+    """Resumen compacto de la tarea: eventos de `label` y totales, sin las entradas por frame."""
+    events = smoke_events(result, label, enter_conf, exit_conf, min_duration, max_gap)
+    return {
+        "filename": result.filename,
+        "length": result.length,
+        "frames": len(result),
+        "label": label,
+        "label_frames": int(np.count_nonzero(result.class_id == result.labels.index(label)))
+                        if label in result.labels else 0,
+        "event_seconds": round(sum(e["duration_seconds"] for e in events), 3),
+        "params": {"enter_conf": enter_conf, "exit_conf": exit_conf,
+                   "min_duration": min_duration, "max_gap": max_gap},
+        "events": events,
+    }
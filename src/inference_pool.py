@@ -0,0 +1,200 @@
+# src/inference_pool.py
+import os
+import queue
+import itertools
+import threading
+import logging
+from concurrent.futures import Future
+from pathlib import Path
+
+import numpy as np
+import torch
+import torch.multiprocessing as tmp
+
+from src.backends import build_runner, load_artifact
+from src.quantize import load_int8
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+logging.basicConfig(level=getattr(logging, LOG_LEVEL, logging.INFO),
+                    format="%(asctime)s %(levelname)s %(message)s")
+log = logging.getLogger("inference-pool")
+
+
+def _worker_source(infer) -> dict:
+    """
+    Lo que recibe cada worker: el modelo fp32 en memoria compartida, o la ruta
+    del artefacto ya preparado por `infer` (TorchScript / ONNX exportado, state
+    dict INT8 en caché), que no se puede compartir. Nunca los pesos fp32 de disco.
+    """
+    if infer.artifact_path is not None:
+        return {"backend": infer.backend, "artifact": str(infer.artifact_path)}
+    if infer.int8:
+        return {"backend": infer.backend, "int8": str(infer.int8_path),
+                "model_name": infer.model_name, "num_classes": infer.num_classes}
+    infer.model.share_memory()
+    return {"backend": infer.backend, "model": infer.model}
+
+
+def _load_worker_model(source: dict):
+    cpu = torch.device('cpu')
+    if "artifact" in source:
+        return load_artifact(source["backend"], Path(source["artifact"]), cpu)
+    if "int8" in source:
+        from src.camera_inference import CameraInference
+        model = load_int8(CameraInference.build_skeleton(source["model_name"], source["num_classes"]),
+                          Path(source["int8"]))
+    else:
+        model = source["model"]
+    return build_runner(model, source["backend"], '', '', None, cpu)  # eager / compile
+
+
+def _pool_worker(source: dict, num_threads: int, tasks, results):
+    # hilos intra-op acotados para que N workers no sobre-suscriban los cores
+    torch.set_num_threads(num_threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass
+
+    model = _load_worker_model(source)
+
+    while True:
+        item = tasks.get()
+        if item is None:
+            break
+        req_id, batch = item
+        try:
+            with torch.no_grad():
+                outputs = model(batch)
+                probs = torch.nn.functional.softmax(outputs, dim=1).numpy()
+            results.put((req_id, probs, None))
+        except Exception as e:
+            results.put((req_id, None, f"{type(e).__name__}: {e}"))
+
+
+class InferencePool:
+    """
+    Pool de procesos para inferencia en CPU con la misma interfaz que
+    CameraInference (predict / predict_batch).
+
+    - Los pesos fp32 se cargan una sola vez: model.share_memory() y los workers
+      (spawn) reciben el modelo por handle de memoria compartida, sin torch.load
+      (con backend compile, cada worker compila ese modelo compartido).
+      Lo que no se puede compartir (TorchScript / ONNX exportados, params INT8
+      empaquetados) lo prepara `infer` en disco y cada worker carga solo ese
+      artefacto, sin volver a leer los pesos fp32 ni exportar o cuantizar.
+    - Cada worker usa cpu_count // workers hilos intra-op (o `threads`).
+    - predict_batch preprocesa en el proceso llamante y reparte el lote entre workers.
+    - predict_probs(tensor) permite pasar lotes ya preprocesados (MicroBatcher).
+    """
+
+    _instance: 'InferencePool' = None
+
+    def __init__(self, infer, workers: int = 2, threads: int = 0):
+        if infer.device.type != 'cpu':
+            raise ValueError(f"InferencePool is CPU-only, got device {infer.device}")
+
+        self.infer = infer
+        self.workers = max(1, int(workers))
+        self.threads = int(threads) or max(1, (os.cpu_count() or 1) // self.workers)
+        self.input_size = infer.input_size
+        self.labels = infer.labels
+
+        source = _worker_source(infer)
+        ctx = tmp.get_context('spawn')
+        self._tasks = ctx.Queue()
+        self._results = ctx.Queue()
+        self._procs = [
+            ctx.Process(target=_pool_worker,
+                        args=(source, self.threads, self._tasks, self._results),
+                        name=f"infer-pool-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for p in self._procs:
+            p.start()
+
+        self._ids = itertools.count()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._closed = False
+        self._dispatcher = threading.Thread(target=self._dispatch, name="infer-pool-results", daemon=True)
+        self._dispatcher.start()
+        log.info("InferencePool listo | workers=%d | threads/worker=%d", self.workers, self.threads)
+
+    @classmethod
+    def get_instance(cls, infer=None, workers: int = 2, threads: int = 0) -> 'InferencePool':
+        if cls._instance is None:
+            cls._instance = cls(infer, workers=workers, threads=threads)
+        return cls._instance
+
+    def _fail_pending(self, message: str):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for fut in pending.values():
+            fut.set_exception(RuntimeError(message))
+
+    def _dispatch(self):
+        while not self._closed:
+            try:
+                req_id, probs, error = self._results.get(timeout=1.0)
+            except queue.Empty:
+                dead = [p.name for p in self._procs if not p.is_alive()]
+                if dead and not self._closed:
+                    self._closed = True
+                    log.error("InferencePool: workers caídos %s", dead)
+                    self._fail_pending(f"inference pool workers died: {dead}")
+                continue
+            with self._lock:
+                fut = self._pending.pop(req_id, None)
+            if fut is None:
+                continue
+            if error is not None:
+                fut.set_exception(RuntimeError(error))
+            else:
+                fut.set_result(probs)
+
+    def _submit(self, batch: torch.Tensor) -> Future:
+        if self._closed:
+            raise RuntimeError("inference pool is closed")
+        fut = Future()
+        req_id = next(self._ids)
+        with self._lock:
+            self._pending[req_id] = fut
+        self._tasks.put((req_id, batch))
+        return fut
+
+    def prepare_batch(self, images, rgb: bool = False) -> torch.Tensor:
+        return self.infer.prepare_batch(images, rgb=rgb)
+
+    def decode(self, probs):
+        return self.infer.decode(probs)
+
+    def predict_probs(self, batch: torch.Tensor):
+        # clone: la cola mueve el storage a memoria compartida, y prepare_batch
+        # devuelve una vista de un buffer reutilizable
+        batch = batch.clone()
+        chunks = torch.chunk(batch, min(self.workers, batch.shape[0]))
+        futures = [self._submit(chunk) for chunk in chunks]
+        return np.concatenate([fut.result() for fut in futures])
+
+    def predict(self, image):
+        return self.predict_batch([image])[0]
+
+    def predict_batch(self, images, rgb: bool = False):
+        if len(images) == 0:
+            return []
+        return self.decode(self.predict_probs(self.prepare_batch(images, rgb=rgb)))
+
+    def close(self):
+        if self._closed and not any(p.is_alive() for p in self._procs):
+            return
+        self._closed = True
+        for _ in self._procs:
+            self._tasks.put(None)
+        for p in self._procs:
+            p.join(timeout=10)
+            if p.is_alive():
+                p.terminate()
+        self._fail_pending("inference pool closed")
+        if InferencePool._instance is self:
+            InferencePool._instance = None
@@ -0,0 +1,209 @@
+# src/ingest.py
+import asyncio
+import hashlib
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+try:
+    import python_multipart as multipart
+    from python_multipart.multipart import parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    import multipart
+    from multipart.multipart import parse_options_header
+
+
+class HashingFileWriter:
+    """
+    Escribe a `path` fuera del event loop (hilos de asyncio.to_thread) y calcula
+    sha256 + bytes en la misma pasada. Deja una escritura en vuelo: mientras el
+    disco escribe un trozo, el loop ya recibe el siguiente.
+
+    offset=None crea / trunca el archivo; con offset escribe desde ahí sobre el
+    archivo existente (subidas reanudables) y el sha256 es el de ese trozo.
+    """
+
+    def __init__(self, path: Path, offset: Optional[int] = None):
+        self.path = Path(path)
+        self.offset = offset
+        self.size = 0
+        self._hasher = hashlib.sha256()
+        self._file = None
+        self._pending: Optional[asyncio.Future] = None
+
+    async def open(self) -> 'HashingFileWriter':
+        def _open():
+            if self.offset is None:
+                return self.path.open("wb")
+            f = self.path.open("r+b")
+            f.seek(self.offset)
+            return f
+        self._file = await asyncio.to_thread(_open)
+        return self
+
+    def _write(self, data: bytes):
+        self._file.write(data)
+        self._hasher.update(data)
+
+    async def write(self, data: bytes):
+        if self._pending is not None:
+            await self._pending
+        self.size += len(data)
+        self._pending = asyncio.ensure_future(asyncio.to_thread(self._write, data))
+
+    async def close(self) -> str:
+        """Espera la última escritura, cierra y devuelve el sha256 hex."""
+        try:
+            if self._pending is not None:
+                await self._pending
+        finally:
+            self._pending = None
+            if self._file is not None:
+                await asyncio.to_thread(self._file.close)
+                self._file = None
+        return self._hasher.hexdigest()
+
+    async def abort(self, remove: bool = True):
+        try:
+            await self.close()
+        except Exception:
+            pass
+        if remove:
+            self.path.unlink(missing_ok=True)
+
+
+async def stream_to_writer(stream, writer: HashingFileWriter, chunk_bytes: int = 1024 * 1024,
+                           limit: Optional[int] = None) -> int:
+    """
+    Vuelca un cuerpo crudo (request.stream()) en `writer`, juntando trozos hasta
+    chunk_bytes por escritura. ValueError si pasa de `limit` bytes.
+    return:
+      bytes escritos
+    """
+    buffer = bytearray()
+    flush_at = max(64 * 1024, int(chunk_bytes))
+    async for chunk in stream:
+        buffer += chunk
+        if limit is not None and writer.size + len(buffer) > limit:
+            raise ValueError(f"Body exceeds {limit} bytes")
+        if len(buffer) >= flush_at:
+            await writer.write(bytes(buffer))
+            buffer.clear()
+    if buffer:
+        await writer.write(bytes(buffer))
+    return writer.size
+
+
+class MultipartIngest:
+    """
+    Lee un multipart/form-data directo de request.stream() y escribe cada
+    archivo en su destino final (sin el SpooledTemporaryFile de Starlette, que
+    duplica las escrituras a disco). Resultado por campo:
+    {"filename", "content_type", "path", "size", "sha256"}.
+
+    destination(field, filename, content_type) -> Path o None (None = se descarta
+    la parte); se llama también para partes sin filename (campos de texto, con
+    filename ""), así que decide el destino por nombre de campo. Puede lanzar
+    ValueError para rechazarla. Los trozos recibidos se juntan hasta chunk_bytes
+    antes de cada escritura.
+    """
+
+    def __init__(self, content_type: str, destination: Callable[[str, str, str], Optional[Path]],
+                 chunk_bytes: int = 1024 * 1024):
+        _, params = parse_options_header(content_type)
+        if b"boundary" not in params:
+            raise ValueError("Missing boundary in multipart request")
+        self.destination = destination
+        self.chunk_bytes = max(64 * 1024, int(chunk_bytes))
+        self.files: Dict[str, dict] = {}
+
+        self._events = []  # (tipo, datos) que deja el parser en cada write()
+        self._header_name = b""
+        self._header_value = b""
+        self._headers = {}
+        self._parser = multipart.MultipartParser(params[b"boundary"], {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": lambda: self._events.append(("headers", dict(self._headers))),
+            "on_part_data": lambda data, start, end: self._events.append(("data", data[start:end])),
+            "on_part_end": lambda: self._events.append(("end", None)),
+        })
+
+        self._writer: Optional[HashingFileWriter] = None
+        self._part: Optional[tuple] = None  # (field, filename, content_type)
+        self._buffer = bytearray()
+        self._writers = []
+
+    def _on_part_begin(self):
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_name += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._header_name.lower()] = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    async def _start_part(self, headers: dict):
+        _, options = parse_options_header(headers.get(b"content-disposition", b""))
+        field = options.get(b"name", b"").decode("utf-8", "replace")
+        filename = options.get(b"filename", b"").decode("utf-8", "replace")
+        content_type = headers.get(b"content-type", b"").decode("latin-1")
+        path = self.destination(field, filename, content_type)
+        if path is None:
+            return
+        self._part = (field, filename, content_type)
+        self._writer = await HashingFileWriter(path).open()
+        self._writers.append(self._writer)
+
+    async def _flush(self, force: bool = False):
+        if self._writer is not None and self._buffer and (force or len(self._buffer) >= self.chunk_bytes):
+            await self._writer.write(bytes(self._buffer))
+            self._buffer.clear()
+
+    async def _end_part(self):
+        if self._writer is None:
+            return
+        await self._flush(force=True)
+        sha = await self._writer.close()
+        field, filename, content_type = self._part
+        self.files[field] = {"filename": filename, "content_type": content_type,
+                             "path": self._writer.path, "size": self._writer.size, "sha256": sha}
+        self._writer, self._part = None, None
+
+    async def feed(self, chunk: bytes):
+        self._parser.write(chunk)
+        events, self._events = self._events, []
+        for kind, data in events:
+            if kind == "headers":
+                await self._start_part(data)
+            elif kind == "data":
+                if self._writer is not None:
+                    self._buffer += data
+                    await self._flush()
+            elif kind == "end":
+                await self._end_part()
+
+    async def ingest(self, stream) -> Dict[str, dict]:
+        """Consume el stream completo; si algo falla (o el cliente corta) borra lo escrito."""
+        try:
+            async for chunk in stream:
+                if chunk:
+                    await self.feed(chunk)
+            self._parser.finalize()
+            if self._writer is not None:
+                raise ValueError("Incomplete multipart body")
+            return self.files
+        except BaseException:
+            await self.abort()
+            raise
+
+    async def abort(self):
+        for writer in self._writers:
+            await writer.abort(remove=True)
+        self.files = {}
@@ -0,0 +1,228 @@
+# src/job_queue.py
+import os
+import json
+import time
+import sqlite3
+import logging
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from typing import Optional, Tuple
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+logging.basicConfig(level=getattr(logging, LOG_LEVEL, logging.INFO),
+                    format="%(asctime)s %(levelname)s %(message)s")
+log = logging.getLogger("job-queue")
+
+
+class JobQueue:
+    """
+    Cola de trabajos persistente sobre SQLite, compartida entre el proceso HTTP
+    y los workers (worker.py). Cada fila guarda:
+    - state: new | queued | running | done | failed (ciclo de vida en la cola)
+    - status: el texto que devuelve /status ("processing", "completed", "error: ...")
+    - payload: argumentos de process_video_and_sensor en JSON
+    - progress: último snapshot de avance (JSON) que publica el worker
+    """
+
+    def __init__(self, db_path):
+        self.db_path = str(db_path)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    task_id    TEXT PRIMARY KEY,
+                    state      TEXT NOT NULL DEFAULT 'new',
+                    status     TEXT,
+                    payload    TEXT,
+                    worker     TEXT,
+                    attempts   INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    heartbeat  REAL,
+                    progress   TEXT
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, created_at)")
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "progress" not in columns:  # bases creadas antes de la columna
+                conn.execute("ALTER TABLE jobs ADD COLUMN progress TEXT")
+
+    @contextmanager
+    def _connect(self):
+        # una conexión por operación: segura entre hilos y procesos
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    # --- estado visible en /status ---
+    def set_status(self, task_id: str, status: str):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (task_id, status, created_at, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(task_id) DO UPDATE SET status = excluded.status, updated_at = excluded.updated_at",
+                (task_id, status, now, now),
+            )
+
+    def get_status(self, task_id: str) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT status FROM jobs WHERE task_id = ?", (task_id,)).fetchone()
+        return None if row is None else row[0]
+
+    def set_progress(self, task_id: str, progress: dict):
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET progress = ? WHERE task_id = ?", (json.dumps(progress), task_id))
+
+    def get_progress(self, task_id: str) -> Optional[dict]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT progress FROM jobs WHERE task_id = ?", (task_id,)).fetchone()
+        return None if row is None or row[0] is None else json.loads(row[0])
+
+    def delete(self, task_id: str) -> bool:
+        with self._connect() as conn:
+            cur = conn.execute("DELETE FROM jobs WHERE task_id = ?", (task_id,))
+        return cur.rowcount > 0
+
+    def task_ids(self) -> list:
+        with self._connect() as conn:
+            return [r[0] for r in conn.execute("SELECT task_id FROM jobs ORDER BY created_at")]
+
+    # --- ciclo de vida en la cola ---
+    def enqueue(self, task_id: str, payload: dict):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (task_id, state, status, payload, created_at, updated_at) "
+                "VALUES (?, 'queued', 'processing', ?, ?, ?) "
+                "ON CONFLICT(task_id) DO UPDATE SET state = 'queued', payload = excluded.payload, "
+                "updated_at = excluded.updated_at",
+                (task_id, json.dumps(payload), now, now),
+            )
+
+    def claim(self, worker_id: str) -> Optional[Tuple[str, dict]]:
+        """Reserva atómicamente el trabajo encolado más antiguo (o None)."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT task_id, payload FROM jobs WHERE state = 'queued' "
+                    "ORDER BY created_at LIMIT 1"
+                ).fetchone()
+                if row is not None:
+                    conn.execute(
+                        "UPDATE jobs SET state = 'running', worker = ?, attempts = attempts + 1, "
+                        "heartbeat = ?, updated_at = ? WHERE task_id = ?",
+                        (worker_id, now, now, row[0]),
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def heartbeat(self, task_id: str):
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET heartbeat = ? WHERE task_id = ?", (time.time(), task_id))
+
+    def finish(self, task_id: str, state: str = 'done'):
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET state = ?, updated_at = ? WHERE task_id = ?",
+                         (state, time.time(), task_id))
+
+    def requeue_stale(self, max_age: float, max_attempts: int = 0) -> int:
+        """
+        Devuelve a la cola los trabajos 'running' cuyo worker dejó de latir.
+        Con max_attempts > 0, los que ya se reclamaron max_attempts veces (p. ej.
+        un video que tira abajo al worker por OOM) quedan en 'failed' con
+        status "error: too many attempts" en vez de volver a la cola.
+        """
+        now = time.time()
+        cutoff = now - max_age
+        stale = "state = 'running' AND (heartbeat IS NULL OR heartbeat < ?)"
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                failed = 0
+                if max_attempts > 0:
+                    failed = conn.execute(
+                        "UPDATE jobs SET state = 'failed', status = 'error: too many attempts', worker = NULL, "
+                        f"updated_at = ? WHERE {stale} AND attempts >= ?",
+                        (now, cutoff, max_attempts),
+                    ).rowcount
+                requeued = conn.execute(
+                    "UPDATE jobs SET state = 'queued', status = 'processing', worker = NULL, progress = NULL "
+                    f"WHERE {stale}",
+                    (cutoff,),
+                ).rowcount
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        if failed:
+            log.error("%d trabajos descartados tras %d intentos sin heartbeat", failed, max_attempts)
+        if requeued:
+            log.warning("Reencolados %d trabajos sin heartbeat (> %.0fs)", requeued, max_age)
+        return requeued
+
+
+class StatusMap(MutableMapping):
+    """
+    Vista tipo dict de la columna `status` de JobQueue, para que
+    `processing_status[task_id] = ...` funcione igual en el proceso HTTP y en los workers.
+    """
+
+    def __init__(self, queue: JobQueue):
+        self.queue = queue
+
+    def __getitem__(self, task_id: str) -> str:
+        status = self.queue.get_status(task_id)
+        if status is None:
+            raise KeyError(task_id)
+        return status
+
+    def __setitem__(self, task_id: str, status: str):
+        self.queue.set_status(task_id, status)
+
+    def __delitem__(self, task_id: str):
+        if not self.queue.delete(task_id):
+            raise KeyError(task_id)
+
+    def __iter__(self):
+        return iter(self.queue.task_ids())
+
+    def __len__(self) -> int:
+        return len(self.queue.task_ids())
+
+
+class ProgressMap(MutableMapping):
+    """Vista tipo dict de la columna `progress` de JobQueue (ver StatusMap)."""
+
+    def __init__(self, queue: JobQueue):
+        self.queue = queue
+
+    def __getitem__(self, task_id: str) -> dict:
+        progress = self.queue.get_progress(task_id)
+        if progress is None:
+            raise KeyError(task_id)
+        return progress
+
+    def __setitem__(self, task_id: str, progress: dict):
+        self.queue.set_progress(task_id, progress)
+
+    def __delitem__(self, task_id: str):
+        if self.queue.get_progress(task_id) is None:
+            raise KeyError(task_id)
+        self.queue.set_progress(task_id, None)
+
+    def __iter__(self):
+        return (t for t in self.queue.task_ids() if self.queue.get_progress(t) is not None)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
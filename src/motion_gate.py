@@ -0,0 +1,51 @@
+# src/motion_gate.py
+import cv2
+import numpy as np
+
+# tope de frames reutilizados seguidos: también acota los pendientes del lote
+MAX_CARRY_LIMIT = 300
+
+
+class ChangeGate:
+    """
+    Compuerta barata para cámaras fijas: compara una miniatura en gris del frame
+    contra la del último frame que sí pasó por el modelo (no contra el anterior,
+    así un cambio lento no se escapa de a poco).
+
+    - score: diferencia absoluta media en [0, 1].
+    - Bajo `threshold` el frame no se infiere y se reutiliza la última clasificación.
+    - Cada `max_carry` frames reutilizados seguidos se fuerza una inferencia.
+      0 (o más que MAX_CARRY_LIMIT) = MAX_CARRY_LIMIT: sin tope, con una cámara
+      quieta los frames reutilizados se acumularían todo el video sin vaciar el lote.
+    """
+
+    def __init__(self, threshold: float = 0.02, max_carry: int = 30, size: tuple = (64, 36)):
+        self.threshold = float(threshold)
+        max_carry = int(max_carry)
+        self.max_carry = MAX_CARRY_LIMIT if max_carry <= 0 else min(max_carry, MAX_CARRY_LIMIT)
+        self.size = size  # (W, H) para cv2.resize
+        self._reference = None
+        self._carried = 0
+        self.inferred = 0
+        self.skipped = 0
+
+    def _thumb(self, frame: np.ndarray, rgb: bool = False) -> np.ndarray:
+        gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY if rgb else cv2.COLOR_BGR2GRAY)
+        return cv2.resize(gray, self.size, interpolation=cv2.INTER_AREA)
+
+    def score(self, thumb: np.ndarray) -> float:
+        if self._reference is None:
+            return 1.0
+        return float(cv2.absdiff(thumb, self._reference).mean()) / 255.0
+
+    def should_infer(self, frame: np.ndarray, rgb: bool = False) -> bool:
+        thumb = self._thumb(frame, rgb=rgb)
+        forced = self._carried >= self.max_carry
+        if forced or self.score(thumb) >= self.threshold:
+            self._reference = thumb
+            self._carried = 0
+            self.inferred += 1
+            return True
+        self._carried += 1
+        self.skipped += 1
+        return False
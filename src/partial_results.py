@@ -0,0 +1,54 @@
+# src/partial_results.py
+import json
+from pathlib import Path
+
+
+def partial_path(json_dir, task_id: str) -> Path:
+    return Path(json_dir) / f"{Path(task_id).name}.partial.ndjson"
+
+
+class PartialResultWriter:
+    """
+    Resultados parciales de una tarea en curso: una línea NDJSON por frame
+    ({"frame": idx, "timestamp", "cls", "sensors"?}) agregada a medida que se
+    clasifica cada lote. Vive en JSON_OUTPUT_DIR, así que /video-stream la lee
+    aunque la inferencia corra en otro proceso (worker.py).
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._file = self.path.open("w", encoding="utf-8")
+
+    def write(self, items):
+        """items: iterable de (frame_idx, entry); se escriben líneas completas y se hace flush."""
+        lines = [json.dumps({"frame": idx, **entry}, ensure_ascii=False) + "\n" for idx, entry in items]
+        self._file.write("".join(lines))
+        self._file.flush()
+
+    def close(self, remove: bool = True):
+        if not self._file.closed:
+            self._file.close()
+        if remove:
+            self.path.unlink(missing_ok=True)
+
+
+def read_new_lines(path: Path, offset: int, max_bytes: int = -1):
+    """
+    Lee las líneas completas escritas desde `offset` (la última puede estar a medias),
+    hasta ~max_bytes por llamada (-1 = todo lo que haya).
+    return:
+      (lista de dicts, nuevo offset); ([], offset) si el archivo no existe
+    """
+    try:
+        with Path(path).open("rb") as f:
+            f.seek(offset)
+            chunk = f.read(max_bytes)
+            if 0 < max_bytes <= len(chunk) and b"\n" not in chunk:
+                chunk += f.readline()  # una línea más larga que max_bytes
+    except FileNotFoundError:
+        return [], offset
+    end = chunk.rfind(b"\n")
+    if end < 0:
+        return [], offset
+    lines = chunk[:end].decode("utf-8").splitlines()
+    return [json.loads(line) for line in lines if line], offset + end + 1
@@ -0,0 +1,153 @@
+# src/prediction_cache.py
+import os
+import threading
+import logging
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+logging.basicConfig(level=getattr(logging, LOG_LEVEL, logging.INFO),
+                    format="%(asctime)s %(levelname)s %(message)s")
+log = logging.getLogger("prediction-cache")
+
+# bits en 1 por byte, para la distancia de Hamming sobre hashes de 64 bits
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def phash(frame: np.ndarray, rgb: bool = False) -> int:
+    """pHash de 64 bits: DCT de la miniatura 32x32 en gris, 8x8 frecuencias bajas vs su mediana."""
+    gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY if rgb else cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8].flatten()
+    bits = low > np.median(low[1:])  # sin el término DC
+    return int(np.packbits(bits).view('>u8')[0])
+
+
+def hamming(hashes: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    """hashes (M,), keys (N,) uint64 -> distancias (M, N)."""
+    xor = np.ascontiguousarray(hashes[:, None] ^ keys[None, :])
+    return _POPCOUNT[xor.view(np.uint8)].reshape(len(hashes), len(keys), 8).sum(axis=2)
+
+
+class PredictionCache:
+    """
+    Caché LRU delante del predictor, indexada por el pHash del frame: frames
+    casi idénticos (misma escena, bytes distintos) reutilizan la clasificación,
+    dentro de un video y entre videos/tareas.
+
+    - size: entradas máximas (se descarta la menos usada).
+    - max_distance: distancia de Hamming máxima (de 64 bits) para contar como acierto.
+    - stats(): hits / misses / tamaño.
+
+    Misma interfaz que CameraInference / MicroBatcher (predict / predict_batch).
+    """
+
+    _instance: 'PredictionCache' = None
+
+    def __init__(self, predictor, size: int = 4096, max_distance: int = 2):
+        self.predictor = predictor
+        self.size = max(1, int(size))
+        self.max_distance = max(0, int(max_distance))
+        self.input_size = predictor.input_size
+        self.labels = predictor.labels
+
+        self._entries = OrderedDict()  # hash -> (label, conf)
+        self._keys = None  # np.uint64 de las claves, se recalcula tras cambios
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        log.info("PredictionCache lista | size=%d | max_distance=%d", self.size, self.max_distance)
+
+    @classmethod
+    def get_instance(cls, predictor=None, size: int = 4096, max_distance: int = 2) -> 'PredictionCache':
+        if cls._instance is None:
+            cls._instance = cls(predictor, size=size, max_distance=max_distance)
+        return cls._instance
+
+    def _lookup(self, hashes: list) -> list:
+        """Con el lock tomado: clave de la entrada más cercana (o None) por hash."""
+        found = [h if h in self._entries else None for h in hashes]
+        if self.max_distance == 0 or not self._entries:
+            return found
+        missing = [i for i, key in enumerate(found) if key is None]
+        if not missing:
+            return found
+        if self._keys is None:
+            self._keys = np.fromiter(self._entries.keys(), dtype=np.uint64, count=len(self._entries))
+        dist = hamming(np.array([hashes[i] for i in missing], dtype=np.uint64), self._keys)
+        best = dist.argmin(axis=1)
+        for row, i in enumerate(missing):
+            if dist[row, best[row]] <= self.max_distance:
+                found[i] = int(self._keys[best[row]])
+        return found
+
+    def _store(self, key: int, result):
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return
+        self._entries[key] = result
+        if len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+        self._keys = None
+
+    def predict(self, image):
+        return self.predict_batch([image])[0]
+
+    def predict_batch(self, images, rgb: bool = False):
+        if len(images) == 0:
+            return []
+        hashes = [phash(img, rgb=rgb) for img in images]
+        results = [None] * len(images)
+        with self._lock:
+            for i, key in enumerate(self._lookup(hashes)):
+                if key is not None:
+                    self._entries.move_to_end(key)
+                    results[i] = self._entries[key]
+        miss_idx = [i for i, r in enumerate(results) if r is None]
+
+        # dentro del lote, un frame parecido a otro que ya se va a inferir lo reutiliza
+        unique, alias = [], {}
+        for i in miss_idx:
+            if unique:
+                dist = hamming(np.array([hashes[i]], dtype=np.uint64),
+                               np.array([hashes[j] for j in unique], dtype=np.uint64))[0]
+                k = int(dist.argmin())
+                if dist[k] <= self.max_distance:
+                    alias[i] = k
+                    continue
+            alias[i] = len(unique)
+            unique.append(i)
+
+        if unique:
+            computed = self.predictor.predict_batch([images[i] for i in unique], rgb=rgb)
+            for i in miss_idx:
+                results[i] = computed[alias[i]]
+            with self._lock:
+                for i, result in zip(unique, computed):
+                    self._store(hashes[i], result)
+
+        with self._lock:
+            self.hits += len(images) - len(unique)
+            self.misses += len(unique)
+        return results
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.size,
+                "max_distance": self.max_distance,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total) if total else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys = None
+            self.hits = 0
+            self.misses = 0
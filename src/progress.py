@@ -0,0 +1,98 @@
+# src/progress.py
+import time
+from collections import deque
+from typing import Optional
+
+
+class TaskProgress:
+    """
+    Contadores de avance de una tarea para /status: frames muestreados (los
+    que entrega el lector, 1 de cada SAMPLE_EVERY; no los que decodifica
+    para llegar a ellos, o los que trae la caché de resultados) e inferidos
+    (solo los que pasan por el modelo: no los reutilizados por la compuerta
+    de cambio), posición en el video, fps de muestreo / inferencia (ventana
+    deslizante de `window` segundos), tiempo transcurrido y ETA (sobre los
+    muestreados que faltan). La posición y el porcentaje van en frames del
+    video y avanzan con cada entrada ya escrita (on_emitted).
+
+    `publish` recibe el snapshot (dict); se llama como mucho cada
+    `publish_every` segundos para que /status sea barato también con SQLite.
+    """
+
+    def __init__(self, publish, frames_total: Optional[int] = None,
+                 expected_samples: Optional[int] = None,
+                 window: float = 5.0, publish_every: float = 1.0):
+        self.publish = publish
+        self.frames_total = frames_total
+        self.expected_samples = expected_samples
+        self.window = window
+        self.publish_every = publish_every
+
+        self.started = time.monotonic()
+        self.sampled = 0
+        self.inferred = 0
+        self.position = 0
+        # (t, contador); arrancan en (inicio, 0) para que la primera ventana ya tenga tasa
+        self._sample_marks = deque([(self.started, 0)])
+        self._infer_marks = deque([(self.started, 0)])
+        self._last_publish = 0.0
+
+    def set_total(self, frames_total: Optional[int], expected_samples: Optional[int] = None):
+        self.frames_total = frames_total
+        self.expected_samples = expected_samples
+
+    def _rate(self, marks: deque, now: float, count: int) -> float:
+        marks.append((now, count))
+        while len(marks) > 2 and now - marks[0][0] > self.window:
+            marks.popleft()
+        t0, c0 = marks[0]
+        return (count - c0) / (now - t0) if now > t0 else 0.0
+
+    def on_sampled(self, n: int = 1):
+        self.sampled += n
+        self._maybe_publish()
+
+    def on_inferred(self, n: int):
+        self.inferred += n
+        self._maybe_publish()
+
+    def on_emitted(self, last_frame_idx: int):
+        self.position = max(self.position, int(last_frame_idx))
+        self._maybe_publish()
+
+    def snapshot(self, done: bool = False) -> dict:
+        now = time.monotonic()
+        elapsed = now - self.started
+        sample_fps = self._rate(self._sample_marks, now, self.sampled)
+        infer_fps = self._rate(self._infer_marks, now, self.inferred)
+
+        eta = None
+        if done:
+            eta = 0.0
+        elif self.expected_samples and sample_fps > 0:
+            eta = max(0, self.expected_samples - self.sampled) / sample_fps
+        percent = None
+        if done:
+            percent = 100.0
+        elif self.frames_total:
+            percent = min(100.0, 100.0 * self.position / self.frames_total)
+        return {
+            "frames_total": self.frames_total,
+            "frames_sampled": self.sampled,
+            "frames_inferred": self.inferred,
+            "position": self.position,
+            "percent": None if percent is None else round(percent, 1),
+            "sample_fps": round(sample_fps, 2),
+            "infer_fps": round(infer_fps, 2),
+            "elapsed_seconds": round(elapsed, 1),
+            "eta_seconds": None if eta is None else round(eta, 1),
+        }
+
+    def _maybe_publish(self):
+        now = time.monotonic()
+        if now - self._last_publish >= self.publish_every:
+            self._last_publish = now
+            self.publish(self.snapshot())
+
+    def finish(self):
+        self.publish(self.snapshot(done=True))
@@ -0,0 +1,167 @@
+# src/quantize.py
+"""
+Modo INT8 para CPU: cuantización dinámica post-entrenamiento de las capas
+nn.Linear de Swin V2 (MLP de cada bloque, patch merging y head, la mayor parte
+de los pesos). qkv/proj de la atención quedan en fp32: shifted_window_attention
+lee su .weight/.bias directamente y no admite Linear cuantizadas.
+
+El modelo cuantizado se guarda junto a los pesos originales (o en
+INFER_CACHE_DIR) y, si existe, se carga directamente sin pasar por los pesos
+fp32; los workers de InferencePool cargan ese mismo archivo. La calibración
+sobre frames de muestra mide acuerdo de predicciones, tamaño y latencia
+contra fp32:
+
+    python -m src.quantize --weights models/swinv2_day_night_full.pt --video muestra.mp4
+"""
+import io
+import os
+import json
+import time
+import logging
+import argparse
+from pathlib import Path
+
+import torch
+
+from src.backends import FALLBACK_CACHE_DIR, _writable
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+logging.basicConfig(level=getattr(logging, LOG_LEVEL, logging.INFO),
+                    format="%(asctime)s %(levelname)s %(message)s")
+log = logging.getLogger("quantize")
+
+
+# Linear que la atención usa vía F.linear(x, m.weight, m.bias), no como módulo
+_FUNCTIONAL_LINEARS = ('attn.qkv', 'attn.proj')
+
+
+def quantizable_linears(model: torch.nn.Module) -> set:
+    return {
+        name for name, module in model.named_modules()
+        if isinstance(module, torch.nn.Linear) and not name.endswith(_FUNCTIONAL_LINEARS)
+    }
+
+
+def quantize_int8(model: torch.nn.Module) -> torch.nn.Module:
+    model = model.cpu().float().eval()
+    return torch.ao.quantization.quantize_dynamic(model, quantizable_linears(model), dtype=torch.qint8)
+
+
+def int8_cache_path(model_weights, weights_hash: str, cache_dir=None) -> Path:
+    """La clave incluye la versión de torch: el formato de los params empaquetados puede cambiar."""
+    weights = Path(model_weights)
+    folder = Path(cache_dir) if cache_dir else weights.parent
+    return folder / f"{weights.stem}.{weights_hash[:12]}.torch{torch.__version__.split('+')[0]}.int8.pt"
+
+
+def save_int8(model_int8: torch.nn.Module, path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    torch.save(model_int8.state_dict(), tmp_path)
+    os.replace(tmp_path, path)
+
+
+def load_int8(skeleton: torch.nn.Module, path: Path) -> torch.nn.Module:
+    """skeleton: modelo fp32 con la arquitectura correcta (sus pesos no importan)."""
+    model_int8 = quantize_int8(skeleton)
+    model_int8.load_state_dict(torch.load(path, map_location='cpu'))
+    return model_int8.eval()
+
+
+def prepare_int8(skeleton: torch.nn.Module, model_weights, weights_hash: str, cache_dir=None):
+    """
+    Modelo INT8 desde la caché; si no existe, cuantiza los pesos fp32 una vez y la escribe
+    (en FALLBACK_CACHE_DIR si la carpeta de los pesos / cache_dir es de solo lectura).
+    return:
+      (modelo INT8, ruta del state dict cuantizado)
+    """
+    path = int8_cache_path(model_weights, weights_hash, cache_dir)
+    fallback = int8_cache_path(model_weights, weights_hash, FALLBACK_CACHE_DIR)
+    if not path.exists() and (fallback.exists() or not _writable(path.parent)):
+        path = fallback
+    if path.exists():
+        log.info("INT8: usando modelo cuantizado en caché %s", path)
+        return load_int8(skeleton, path), path
+
+    log.info("INT8: cuantizando %s -> %s", model_weights, path)
+    skeleton.load_state_dict(torch.load(model_weights, map_location='cpu'))
+    model_int8 = quantize_int8(skeleton).eval()
+    save_int8(model_int8, path)
+    return model_int8, path
+
+
+def state_dict_mb(model: torch.nn.Module) -> float:
+    buf = io.BytesIO()
+    torch.save(model.state_dict(), buf)
+    return buf.tell() / (1024 * 1024)
+
+
+def _latency_ms(model: torch.nn.Module, batch: torch.Tensor, repeats: int = 3) -> float:
+    with torch.no_grad():
+        model(batch[:1])  # warm-up
+        t0 = time.perf_counter()
+        for _ in range(repeats):
+            model(batch)
+    return (time.perf_counter() - t0) * 1000.0 / (repeats * batch.shape[0])
+
+
+def calibration_report(model_fp32: torch.nn.Module, model_int8: torch.nn.Module,
+                       batch: torch.Tensor) -> dict:
+    """
+    batch: frames de muestra ya preprocesados (N, 3, H, W)
+    return:
+      tamaño (MB), latencia por frame (ms), acuerdo top-1 y |Δ prob| máxima vs fp32
+    """
+    with torch.no_grad():
+        p32 = torch.nn.functional.softmax(model_fp32(batch), dim=1)
+        p8 = torch.nn.functional.softmax(model_int8(batch), dim=1)
+    return {
+        "frames": int(batch.shape[0]),
+        "size_mb_fp32": round(state_dict_mb(model_fp32), 1),
+        "size_mb_int8": round(state_dict_mb(model_int8), 1),
+        "latency_ms_fp32": round(_latency_ms(model_fp32, batch), 1),
+        "latency_ms_int8": round(_latency_ms(model_int8, batch), 1),
+        "top1_agreement": float((p32.argmax(1) == p8.argmax(1)).float().mean()),
+        "max_prob_diff": float((p32 - p8).abs().max()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cuantiza Swin V2 a INT8 y reporta tamaño/latencia vs fp32")
+    parser.add_argument("--weights", default=str(Path(__file__).resolve().parent.parent / "models/swinv2_day_night_full.pt"))
+    parser.add_argument("--video", required=True, help="video de muestra para la calibración")
+    parser.add_argument("--frames", type=int, default=16)
+    parser.add_argument("--cache-dir", default=os.getenv("INFER_CACHE_DIR") or None)
+    args = parser.parse_args()
+
+    import cv2
+    from src.camera_inference import CameraInference
+    from src.video_reader import iter_sampled_frames
+
+    infer = CameraInference(model_weights=args.weights, device='cpu')
+    cap = cv2.VideoCapture(args.video)
+    n_total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or args.frames
+    stride = max(1, n_total // args.frames)
+    frames = []
+    for _, frame in iter_sampled_frames(cap, stride):
+        frames.append(frame)
+        if len(frames) >= args.frames:
+            break
+    cap.release()
+    if not frames:
+        raise SystemExit(f"no frames read from {args.video}")
+
+    batch = infer.prepare_batch(frames).clone()
+    model_int8 = quantize_int8(infer.model)
+    path = int8_cache_path(args.weights, infer.weights_hash, args.cache_dir)
+    save_int8(model_int8, path)
+
+    report = calibration_report(infer.model, model_int8, batch)
+    with path.with_suffix(".json").open("w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    log.info("INT8 guardado -> %s", path)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
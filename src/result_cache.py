@@ -0,0 +1,73 @@
+# src/result_cache.py
+import os
+import json
+import hashlib
+import logging
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from src.result_store import TaskResult
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+logging.basicConfig(level=getattr(logging, LOG_LEVEL, logging.INFO),
+                    format="%(asctime)s %(levelname)s %(message)s")
+log = logging.getLogger("result-cache")
+
+
+class FrameResultCache:
+    """
+    Caché en disco de las clasificaciones por frame de un video.
+
+    Clave: (sha256 del contenido del video, modelo, ajustes de muestreo), así
+    que volver a subir los mismos bytes (con o sin sensores, con otro nombre)
+    reutiliza la inferencia y solo se recalcula la unión con los sensores.
+    Un .npz por clave: frame_idx, label, conf, carried, fps, length.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(video_hash: str, model_tag: str, settings: dict) -> str:
+        raw = json.dumps([video_hash, model_tag, settings], sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.npz"
+
+    def get(self, key: str) -> Optional[dict]:
+        path = self.path(key)
+        if not path.exists():
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as z:
+                length = int(z["length"])
+                return {
+                    "fps": float(z["fps"]),
+                    "length": length if length >= 0 else None,
+                    "frame_idx": z["frame_idx"],
+                    "label": z["label"],
+                    "conf": z["conf"],
+                    "carried": z["carried"],
+                }
+        except Exception as e:
+            log.warning("Caché ilegible %s: %s", path, e)
+            return None
+
+    def put(self, key: str, fps: float, result: TaskResult):
+        """result: TaskResult de la tarea (de él solo se guarda la parte del video)"""
+        path = self.path(key)
+        tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npz")
+        np.savez(
+            tmp_path,
+            fps=np.float64(fps),
+            length=np.int64(-1 if result.length is None else result.length),
+            frame_idx=result.frame_idx,
+            label=np.array(result.labels, dtype=np.str_)[result.class_id],
+            conf=result.conf.astype(np.float64),
+            carried=result.carried,
+        )
+        os.replace(tmp_path, path)
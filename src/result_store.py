@@ -0,0 +1,379 @@
+# src/result_store.py
+import os
+import re
+import json
+from datetime import date, datetime, time
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from src.utils import SENSOR_FIELDS, hhmmss
+
+
+class TaskResult:
+    """
+    Resultado de una tarea en columnas tipadas (un valor por frame muestreado):
+    frame_idx, time (datetime64[us]), class_id + labels, conf (float32),
+    carried, y si hubo sensores: sensors (N, campos) + sensor_valid.
+
+    Se guarda una sola vez como .npz sin comprimir; el JSON de siempre
+    ({"filename", "length", "data": {idx: {...}}}) se arma solo cuando un
+    cliente lo pide (to_payload / iter_json).
+    """
+
+    def __init__(self, filename: str, length: Optional[int], frame_idx, times, class_id, labels,
+                 conf, carried, sensors=None, sensor_valid=None, sensor_fields=SENSOR_FIELDS):
+        self.filename = filename
+        self.length = length
+        self.frame_idx = np.asarray(frame_idx, dtype=np.int64)
+        self.times = np.asarray(times, dtype="datetime64[us]")
+        self.class_id = np.asarray(class_id, dtype=np.int16)
+        self.labels = list(labels)
+        self.conf = np.asarray(conf, dtype=np.float32)
+        self.carried = np.asarray(carried, dtype=bool)
+        self.sensor_fields = list(sensor_fields)
+        self.has_sensors = sensors is not None
+        if self.has_sensors:
+            self.sensors = np.asarray(sensors, dtype=np.float64).reshape(len(self.frame_idx), len(self.sensor_fields))
+            self.sensor_valid = np.asarray(sensor_valid, dtype=bool)
+        self._by_label = None  # índice por clase, se arma en la primera consulta
+        self.on_grow = None  # callback(result) cuando crece nbytes (el índice); lo usa BoundedResultMap
+
+    def __len__(self) -> int:
+        return len(self.frame_idx)
+
+    @property
+    def nbytes(self) -> int:
+        """Memoria de las columnas (más el índice por clase si ya se armó)."""
+        arrays = [self.frame_idx, self.times, self.class_id, self.conf, self.carried]
+        if self.has_sensors:
+            arrays += [self.sensors, self.sensor_valid]
+        if self._by_label is not None:
+            arrays += list(self._by_label.values())
+        return sum(a.nbytes for a in arrays)
+
+    def take(self, positions) -> 'TaskResult':
+        """Filas en `positions` (array de posiciones) como un TaskResult nuevo."""
+        return TaskResult(self.filename, self.length, self.frame_idx[positions], self.times[positions],
+                          self.class_id[positions], self.labels, self.conf[positions], self.carried[positions],
+                          self.sensors[positions] if self.has_sensors else None,
+                          self.sensor_valid[positions] if self.has_sensors else None,
+                          self.sensor_fields)
+
+    def sorted(self) -> 'TaskResult':
+        """Ordenado por frame (el muestreo adaptativo clasifica fuera de orden)."""
+        order = np.argsort(self.frame_idx, kind="stable")
+        if np.all(order[:-1] < order[1:]):
+            return self
+        return self.take(order)
+
+    # --- consultas ---
+    def _label_index(self) -> dict:
+        """clase -> posiciones (ordenadas) de sus frames; se arma una vez por resultado."""
+        if self._by_label is None:
+            order = np.argsort(self.class_id, kind="stable")
+            bounds = np.searchsorted(self.class_id[order], np.arange(len(self.labels) + 1))
+            self._by_label = {label: order[bounds[c]:bounds[c + 1]] for c, label in enumerate(self.labels)}
+            if self.on_grow is not None:
+                self.on_grow(self)
+        return self._by_label
+
+    def parse_time(self, value: str, upper: bool = False) -> np.datetime64:
+        """
+        'HH:MM:SS' (hora del video, como en "timestamp") o fecha ISO 8601 -> datetime64[us].
+        Una hora anterior al inicio del video se toma del día siguiente. upper=True
+        (límite final) abarca todo ese segundo, igual que el "timestamp" mostrado,
+        o todo el día si es solo una fecha (YYYY-MM-DD).
+        """
+        try:
+            day_only = np.datetime64(date.fromisoformat(value), "D")
+        except ValueError:
+            day_only = None
+        if day_only is not None:
+            start = day_only.astype("datetime64[us]")
+            return start + np.timedelta64(1, "D") - np.timedelta64(1, "us") if upper else start
+
+        try:
+            dt = datetime.fromisoformat(value).replace(tzinfo=None)
+            t, day = dt.time(), np.datetime64(dt.date(), "D")
+        except ValueError:
+            try:
+                t, day = time.fromisoformat(value), None
+            except ValueError:
+                raise ValueError(f"Invalid time {value!r}: expected HH:MM:SS or ISO 8601")
+
+        time_only = day is None
+        if time_only:
+            day = self.times[0].astype("datetime64[D]") if len(self) else np.datetime64(0, "D")
+        parsed = day + np.timedelta64(
+            (t.hour * 3600 + t.minute * 60 + t.second) * 1_000_000 + t.microsecond, "us")
+        if time_only and len(self) and parsed < self.times[0].astype("datetime64[s]"):
+            parsed += np.timedelta64(1, "D")
+        if upper and t.microsecond == 0:
+            parsed += np.timedelta64(999_999, "us")
+        return parsed
+
+    def _span(self, start, end, frame_from, frame_to, cursor=None):
+        """[lo, hi) de posiciones dentro de los rangos de tiempo / frame (búsqueda binaria)."""
+        lo, hi = 0, len(self)
+        if frame_from is not None:
+            lo = max(lo, int(np.searchsorted(self.frame_idx, frame_from, "left")))
+        if cursor is not None:
+            lo = max(lo, int(np.searchsorted(self.frame_idx, cursor, "left")))
+        if frame_to is not None:
+            hi = min(hi, int(np.searchsorted(self.frame_idx, frame_to, "right")))
+        if start is not None:
+            lo = max(lo, int(np.searchsorted(self.times, start, "left")))
+        if end is not None:
+            hi = min(hi, int(np.searchsorted(self.times, end, "right")))
+        return lo, max(lo, hi)
+
+    def _label_positions(self, label, lo: int, hi: int):
+        """Posiciones de `label` dentro de [lo, hi), o None sin filtro de clase."""
+        if label is None:
+            return None
+        positions = self._label_index().get(label, np.empty(0, dtype=np.int64))
+        return positions[np.searchsorted(positions, lo):np.searchsorted(positions, hi)]
+
+    def count(self, start=None, end=None, frame_from: Optional[int] = None, frame_to: Optional[int] = None,
+              label: Optional[str] = None, min_conf: Optional[float] = None) -> int:
+        """Total de entradas que cumplen los filtros de query (sin cursor ni limit)."""
+        lo, hi = self._span(start, end, frame_from, frame_to)
+        positions = self._label_positions(label, lo, hi)
+        if min_conf is None:
+            return int(len(positions) if positions is not None else hi - lo)
+        conf = self.conf[positions] if positions is not None else self.conf[lo:hi]
+        return int(np.count_nonzero(conf >= min_conf))
+
+    def query(self, start=None, end=None, frame_from: Optional[int] = None, frame_to: Optional[int] = None,
+              label: Optional[str] = None, min_conf: Optional[float] = None,
+              cursor: Optional[int] = None, limit: Optional[int] = None):
+        """
+        Entradas que cumplen todos los filtros, en orden de frame.
+          - start / end: datetime64, inclusive; frame_from / frame_to: índices, inclusive.
+          - cursor: primer frame a devolver (el next_cursor de la página anterior).
+        Búsqueda binaria sobre frame_idx / times (ordenados) y sobre las posiciones
+        de la clase, así que cuesta O(log n + k); con min_conf, k incluye los
+        descartados por confianza.
+        return:
+          (TaskResult con la página, next_cursor o None si no hay más)
+        """
+        lo, hi = self._span(start, end, frame_from, frame_to, cursor)
+        positions = self._label_positions(label, lo, hi)
+
+        # limit + 1 para saber si hay otra página
+        wanted = None if limit is None else limit + 1
+        n = len(positions) if positions is not None else hi - lo
+        chunk = n if min_conf is None and wanted is None else max(wanted or 0, 1024)
+        picked, found = [], 0
+        for s in range(0, n, max(chunk, 1)):
+            block = positions[s:s + chunk] if positions is not None else np.arange(lo + s, min(lo + s + chunk, hi))
+            if min_conf is not None:
+                block = block[self.conf[block] >= min_conf]
+            picked.append(block)
+            found += len(block)
+            if wanted is not None and found >= wanted:
+                break
+        picked = np.concatenate(picked) if picked else np.empty(0, dtype=np.int64)
+
+        next_cursor = None
+        if limit is not None and len(picked) > limit:
+            next_cursor = int(self.frame_idx[picked[limit]])
+            picked = picked[:limit]
+        return self.take(picked), next_cursor
+
+    # --- disco ---
+    def save(self, path: Path):
+        path = Path(path)
+        tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npz")
+        arrays = dict(
+            meta=np.array(json.dumps({
+                "filename": self.filename,
+                "length": self.length,
+                "labels": self.labels,
+                "sensor_fields": self.sensor_fields,
+                "has_sensors": self.has_sensors,
+            })),
+            frame_idx=self.frame_idx,
+            time=self.times,
+            class_id=self.class_id,
+            conf=self.conf,
+            carried=self.carried,
+        )
+        if self.has_sensors:
+            arrays.update(sensors=self.sensors, sensor_valid=self.sensor_valid)
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path, sensors: bool = True) -> 'TaskResult':
+        """sensors=False no lee las columnas de sensores (proyección video_only)."""
+        with np.load(path, allow_pickle=False) as z:
+            meta = json.loads(str(z["meta"]))
+            has_sensors = meta["has_sensors"] and sensors
+            return cls(
+                meta["filename"], meta["length"], z["frame_idx"], z["time"], z["class_id"],
+                meta["labels"], z["conf"], z["carried"],
+                z["sensors"] if has_sensors else None,
+                z["sensor_valid"] if has_sensors else None,
+                meta["sensor_fields"],
+            )
+
+    @classmethod
+    def from_payload(cls, payload: dict) -> 'TaskResult':
+        """
+        JSON heredado ({task_id}.json) a columnas. Esos JSON solo traen HH:MM:SS:
+        la fecha sale del nombre del video (YYYYMMDDhhmmss) y se suma un día
+        cada vez que la hora retrocede.
+        """
+        items = sorted(((int(k), e) for k, e in payload.get("data", {}).items()), key=lambda item: item[0])
+        m = re.search(r"(\d{4})(\d{2})(\d{2})\d{6}", str(payload.get("filename", "")))
+        day = np.datetime64(f"{m.group(1)}-{m.group(2)}-{m.group(3)}", "D") if m else np.datetime64(0, "D")
+
+        times, last = [], None
+        for _, e in items:
+            ts = str(e.get("timestamp", "00:00:00"))
+            if len(ts) > 8:
+                t = np.datetime64(datetime.fromisoformat(ts), "us")
+            else:
+                h, mi, sec = (int(x) for x in ts.split(":"))
+                t = day + np.timedelta64(h * 3600 + mi * 60 + sec, "s")
+                if last is not None and t < last:
+                    day += np.timedelta64(1, "D")
+                    t += np.timedelta64(1, "D")
+            times.append(t)
+            last = t
+
+        labels, label_ids = [], {}
+        class_id = []
+        for _, e in items:
+            label = e["cls"]["class"]
+            if label not in label_ids:
+                label_ids[label] = len(labels)
+                labels.append(label)
+            class_id.append(label_ids[label])
+
+        has_sensors = any("sensors" in e for _, e in items)
+        sensors = valid = None
+        if has_sensors:
+            missing = dict.fromkeys(SENSOR_FIELDS, -1.0)
+            readings = [e.get("sensors", missing) for _, e in items]
+            valid = [r != missing for r in readings]
+            sensors = [[r.get(f, np.nan) for f in SENSOR_FIELDS] for r in readings]
+
+        return cls(
+            payload.get("filename"), payload.get("length"),
+            [idx for idx, _ in items], np.array(times, dtype="datetime64[us]"), class_id, labels,
+            [e["cls"]["conf"] for _, e in items],
+            [bool(e.get("carried", False)) for _, e in items],
+            sensors, valid,
+        )
+
+    # --- forma JSON, bajo demanda ---
+    def iter_entries(self, sensors: bool = True):
+        """
+        yield: (frame_idx, entry) con la misma forma que response["data"].
+        sensors=False es la proyección video_only: las columnas de sensores ni se leen.
+        """
+        sensors = sensors and self.has_sensors
+        timestamps = hhmmss(self.times)
+        classes = [self.labels[i] for i in self.class_id.tolist()]
+        conf = self.conf.tolist()
+        carried = self.carried.tolist()
+        if sensors:
+            readings = self.sensors.tolist()
+            valid = self.sensor_valid.tolist()
+        missing = dict.fromkeys(self.sensor_fields, -1.0)
+
+        for i, idx in enumerate(self.frame_idx.tolist()):
+            entry = {
+                "timestamp": timestamps[i],
+                "cls": {"class": classes[i], "conf": conf[i]}
+            }
+            if carried[i]:
+                entry["carried"] = True
+            if sensors:
+                entry["sensors"] = dict(zip(self.sensor_fields, readings[i])) if valid[i] else dict(missing)
+            yield idx, entry
+
+    def to_payload(self, sensors: bool = True) -> dict:
+        return {"filename": self.filename, "length": self.length, "data": dict(self.iter_entries(sensors))}
+
+    def iter_json(self, sensors: bool = True, batch: int = 1000):
+        """El mismo JSON que to_payload, en trozos, sin armar el dict completo."""
+        yield '{"filename": %s, "length": %s, "data": {' % (json.dumps(self.filename, ensure_ascii=False),
+                                                          json.dumps(self.length))
+        parts = []
+        for n, (idx, entry) in enumerate(self.iter_entries(sensors)):
+            parts.append(f'{"" if n == 0 else ", "}"{idx}": {json.dumps(entry, ensure_ascii=False)}')
+            if len(parts) >= batch:
+                yield "".join(parts)
+                parts = []
+        parts.append("}}")
+        yield "".join(parts)
+
+
+class ResultBuilder:
+    """
+    Acumula el resultado lote a lote durante el procesamiento; cada lote es un
+    TaskResult (con el que se escriben los parciales) y build() los concatena.
+    """
+
+    def __init__(self, labels=(), include_sensors: bool = True, sensor_fields=SENSOR_FIELDS):
+        self.labels = list(labels)
+        self._label_ids = {label: i for i, label in enumerate(self.labels)}
+        self.include_sensors = include_sensors
+        self.sensor_fields = list(sensor_fields)
+        self.parts = []
+
+    def _class_id(self, label: str) -> int:
+        if label not in self._label_ids:
+            self._label_ids[label] = len(self.labels)
+            self.labels.append(label)
+        return self._label_ids[label]
+
+    def add(self, filename: str, idxs, times, results, carried, readings=None, has_reading=None) -> TaskResult:
+        """results: lista de (label, conf); readings (N, campos) / has_reading (N,) si hay sensores"""
+        n = len(idxs)
+        if self.include_sensors and readings is None:
+            readings = np.full((n, len(self.sensor_fields)), np.nan)
+            has_reading = np.zeros(n, dtype=bool)
+        part = TaskResult(
+            filename, None, idxs, times,
+            [self._class_id(label) for label, _ in results],
+            self.labels,
+            [conf for _, conf in results],
+            carried,
+            readings if self.include_sensors else None,
+            has_reading if self.include_sensors else None,
+            self.sensor_fields,
+        )
+        self.parts.append(part)
+        return part
+
+    def cls_map(self) -> dict:
+        """frame_idx -> {"cls": {"class", "conf"}} de lo clasificado hasta ahora (muestreo adaptativo)."""
+        return {
+            idx: {"cls": {"class": self.labels[c], "conf": p}}
+            for part in self.parts
+            for idx, c, p in zip(part.frame_idx.tolist(), part.class_id.tolist(), part.conf.tolist())
+        }
+
+    def build(self, filename: str, length: Optional[int]) -> TaskResult:
+        def column(name, dtype, shape=(0,)):
+            cols = [getattr(part, name) for part in self.parts]
+            return np.concatenate(cols) if cols else np.empty(shape, dtype=dtype)
+
+        return TaskResult(
+            filename, length,
+            column("frame_idx", np.int64),
+            column("times", "datetime64[us]"),
+            column("class_id", np.int16),
+            self.labels,
+            column("conf", np.float32),
+            column("carried", bool),
+            column("sensors", np.float64, (0, len(self.sensor_fields))) if self.include_sensors else None,
+            column("sensor_valid", bool) if self.include_sensors else None,
+            self.sensor_fields,
+        ).sorted()
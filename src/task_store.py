@@ -0,0 +1,253 @@
+# src/task_store.py
+import re
+import json
+import time
+import threading
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from pathlib import Path
+from typing import Callable, Optional, Union
+
+from src.result_store import TaskResult
+
+# task_id = uuid4; deja fuera los archivos "amigables" ({nice_ts}_{stem}.npz / .json)
+TASK_ID_RE = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}")
+
+
+class DiskResultMap(MutableMapping):
+    """
+    Vista tipo dict de los resultados ya escritos en JSON_OUTPUT_DIR/{task_id}.npz
+    (TaskResult; los {task_id}.json de versiones anteriores se leen como dict).
+    Se usa cuando la inferencia corre en otros procesos (JOB_BACKEND=sqlite):
+    process_video_and_sensor persiste el resultado, así que asignar es un no-op
+    y leer carga el archivo.
+    """
+
+    def __init__(self, json_dir):
+        self.json_dir = Path(json_dir)
+
+    def _path(self, task_id: str) -> Optional[Path]:
+        """Solo task_ids: {fecha}_{video}.npz (hard link) y otros archivos no son tareas."""
+        if not isinstance(task_id, str) or not TASK_ID_RE.fullmatch(task_id):
+            return None
+        path = self.json_dir / f"{task_id}.npz"
+        legacy = self.json_dir / f"{task_id}.json"
+        return legacy if not path.exists() and legacy.exists() else path
+
+    def __getitem__(self, task_id: str) -> Union[TaskResult, dict]:
+        path = self._path(task_id)
+        if path is None or not path.exists():
+            raise KeyError(task_id)
+        if path.suffix == ".npz":
+            return TaskResult.load(path)
+        with path.open("r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def __setitem__(self, task_id: str, payload: dict):
+        pass
+
+    def __delitem__(self, task_id: str):
+        path = self._path(task_id)
+        if path is None or not path.exists():
+            raise KeyError(task_id)
+        path.unlink()
+
+    def __contains__(self, task_id) -> bool:
+        path = self._path(task_id)
+        return path is not None and path.exists()
+
+    def __iter__(self):
+        stems = {p.stem for pattern in ("*.npz", "*.json") for p in self.json_dir.glob(pattern)}
+        return (stem for stem in sorted(stems) if TASK_ID_RE.fullmatch(stem))
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+# bytes aproximados por entrada de un resultado heredado en dict (JSON parseado)
+_DICT_ENTRY_BYTES = 900
+
+
+def result_nbytes(result) -> int:
+    if isinstance(result, TaskResult):
+        return result.nbytes
+    if isinstance(result, dict):
+        return len(result.get("data", ())) * _DICT_ENTRY_BYTES
+    return 0
+
+
+class BoundedResultMap(MutableMapping):
+    """
+    Resultados de tareas en memoria con presupuesto: LRU por bytes residentes
+    (max_bytes) y expiración por tiempo sin uso (ttl segundos, 0 = sin TTL).
+    Lo desalojado se vuelve a cargar bajo demanda desde `disk` (DiskResultMap),
+    donde process_video_and_sensor ya escribió el .npz antes de asignar.
+
+    cache_writes=False: asignar no guarda en memoria (workers de JOB_BACKEND=sqlite,
+    que nunca leen); las lecturas de la API igual quedan en caché.
+    """
+
+    def __init__(self, disk: DiskResultMap, max_bytes: int = 512 * 2**20, ttl: float = 3600.0,
+                 cache_writes: bool = True):
+        self.disk = disk
+        self.max_bytes = max(0, int(max_bytes))
+        self.ttl = max(0.0, float(ttl))
+        self.cache_writes = cache_writes
+
+        self._entries = OrderedDict()  # task_id -> (result, nbytes, último uso)
+        self._lock = threading.Lock()
+        self.resident_bytes = 0
+        self.hits = 0
+        self.reloads = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _drop(self, task_id: str):
+        _, nbytes, _ = self._entries.pop(task_id)
+        self.resident_bytes -= nbytes
+
+    def _evict(self, now: float):
+        """Con el lock tomado: saca lo vencido y luego lo menos usado hasta entrar en max_bytes."""
+        if self.ttl:
+            for task_id, (_, _, used) in list(self._entries.items()):
+                if now - used <= self.ttl:
+                    break  # OrderedDict en orden de uso: el resto es más reciente
+                self._drop(task_id)
+                self.expirations += 1
+        while self._entries and self.resident_bytes > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _cache(self, task_id: str, result, now: float):
+        with self._lock:
+            if task_id in self._entries:
+                self._drop(task_id)
+            nbytes = result_nbytes(result)
+            self._entries[task_id] = (result, nbytes, now)
+            self.resident_bytes += nbytes
+            self._evict(now)
+        if isinstance(result, TaskResult):
+            # el índice por clase se arma recién en la primera consulta: recontar entonces
+            result.on_grow = lambda grown, task_id=task_id: self._regrow(task_id, grown)
+
+    def _regrow(self, task_id: str, result: TaskResult):
+        with self._lock:
+            entry = self._entries.get(task_id)
+            if entry is None or entry[0] is not result:
+                return
+            nbytes = result.nbytes
+            self.resident_bytes += nbytes - entry[1]
+            self._entries[task_id] = (result, nbytes, entry[2])
+            self._evict(time.monotonic())
+
+    def __getitem__(self, task_id: str):
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            entry = self._entries.get(task_id)
+            if entry is not None:
+                self._entries[task_id] = (entry[0], entry[1], now)
+                self._entries.move_to_end(task_id)
+                self.hits += 1
+                return entry[0]
+        result = self.disk[task_id]  # KeyError si tampoco está en disco
+        with self._lock:
+            self.reloads += 1
+        self._cache(task_id, result, now)
+        return result
+
+    def __setitem__(self, task_id: str, result):
+        if self.cache_writes:
+            self._cache(task_id, result, time.monotonic())
+
+    def __delitem__(self, task_id: str):
+        with self._lock:
+            cached = task_id in self._entries
+            if cached:
+                self._drop(task_id)
+        if task_id in self.disk:
+            del self.disk[task_id]
+        elif not cached:
+            raise KeyError(task_id)
+
+    def __contains__(self, task_id) -> bool:
+        with self._lock:
+            if task_id in self._entries:
+                return True
+        return task_id in self.disk
+
+    def __iter__(self):
+        with self._lock:
+            cached = list(self._entries)
+        return iter(sorted(set(cached) | set(self.disk)))
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._evict(time.monotonic())
+            return {
+                "entries": len(self._entries),
+                "resident_bytes": self.resident_bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "reloads": self.reloads,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class BoundedStatusMap(MutableMapping):
+    """
+    dict con tope de entradas para processing_status / processing_progress en
+    modo inline: al pasar max_entries se descarta la tarea actualizada hace más tiempo.
+      - pinned(valor): entradas que nunca se descartan (tareas en curso).
+      - fallback(task_id): valor para una tarea ya descartada (p. ej. "completed"
+        si su resultado sigue en disco); None = desconocida.
+    """
+
+    def __init__(self, max_entries: int = 10000, pinned: Optional[Callable] = None,
+                 fallback: Optional[Callable] = None):
+        self.max_entries = max(1, int(max_entries))
+        self.pinned = pinned
+        self.fallback = fallback
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def __getitem__(self, task_id: str):
+        with self._lock:
+            if task_id in self._entries:
+                return self._entries[task_id]
+        value = self.fallback(task_id) if self.fallback is not None else None
+        if value is None:
+            raise KeyError(task_id)
+        return value
+
+    def __setitem__(self, task_id: str, value):
+        with self._lock:
+            self._entries[task_id] = value
+            self._entries.move_to_end(task_id)
+            if len(self._entries) <= self.max_entries:
+                return
+            for old_id, old in list(self._entries.items()):
+                if len(self._entries) <= self.max_entries:
+                    break
+                if self.pinned is not None and self.pinned(old):
+                    continue
+                del self._entries[old_id]
+                self.evictions += 1
+
+    def __delitem__(self, task_id: str):
+        with self._lock:
+            del self._entries[task_id]
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._entries))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
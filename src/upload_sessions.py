@@ -0,0 +1,201 @@
+# src/upload_sessions.py
+import os
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Optional
+
+from src.task_store import TASK_ID_RE
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+logging.basicConfig(level=getattr(logging, LOG_LEVEL, logging.INFO),
+                    format="%(asctime)s %(levelname)s %(message)s")
+log = logging.getLogger("upload-sessions")
+
+
+def merge_ranges(ranges) -> list:
+    """[(inicio, fin)] (fin exclusivo) -> tramos ordenados y unidos."""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def missing_ranges(received: list, size: int) -> list:
+    missing, pos = [], 0
+    for start, end in received:
+        if start > pos:
+            missing.append([pos, start])
+        pos = max(pos, end)
+    if pos < size:
+        missing.append([pos, size])
+    return missing
+
+
+class UploadSessions:
+    """
+    Subidas reanudables en disco, una carpeta por sesión en `root`:
+      - meta.json: filename, size, sha256 esperado (opcional), creación.
+      - data.part: el archivo final, preasignado a `size`; cada PUT escribe en su offset.
+      - ranges.log: una línea "inicio fin" por trozo ya escrito. Solo se agrega
+        (O_APPEND), así que varios PUT en paralelo, incluso desde distintos
+        procesos, no necesitan lock.
+    Los rangos ya unidos quedan en memoria junto con el offset leído del log:
+    received() solo lee y une las líneas nuevas, no el log entero en cada PUT.
+    Lo recibido sobrevive a desconexiones y reinicios; finalize() verifica que
+    no falte nada y el sha256 antes de entregar el archivo.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._ranges = {}  # session_id -> (bytes leídos de ranges.log, rangos unidos)
+        self._lock = threading.Lock()
+
+    def _dir(self, session_id: str) -> Path:
+        if not TASK_ID_RE.fullmatch(session_id or ""):
+            raise KeyError(session_id)
+        return self.root / session_id
+
+    def data_path(self, session_id: str) -> Path:
+        return self._dir(session_id) / "data.part"
+
+    def create(self, filename: str, size: int, sha256: Optional[str] = None) -> dict:
+        if size < 0:
+            raise ValueError("size must be >= 0")
+        if sha256 is not None and (len(sha256) != 64 or any(c not in "0123456789abcdef" for c in sha256.lower())):
+            raise ValueError("sha256 must be 64 hex characters")
+        if Path(filename).name in {"", ".", ".."}:
+            raise ValueError("invalid filename")
+        session_id = str(uuid.uuid4())
+        path = self._dir(session_id)
+        path.mkdir()
+        with (path / "data.part").open("wb") as f:
+            f.truncate(size)  # disperso: no ocupa disco hasta que llegan los datos
+        (path / "ranges.log").touch()
+        meta = {
+            "session_id": session_id,
+            "filename": Path(filename).name,
+            "size": int(size),
+            "sha256": sha256.lower() if sha256 else None,
+            "created": time.time(),
+        }
+        (path / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+        log.info("Sesión de subida %s | %s | %d bytes", session_id, meta["filename"], size)
+        return meta
+
+    def meta(self, session_id: str) -> dict:
+        path = self._dir(session_id) / "meta.json"
+        if not path.exists():
+            raise KeyError(session_id)
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def record(self, session_id: str, start: int, end: int):
+        """Marca [start, end) como recibido (llamar después de escribir los datos)."""
+        line = f"{int(start)} {int(end)}\n".encode()
+        fd = os.open(self._dir(session_id) / "ranges.log", os.O_WRONLY | os.O_APPEND)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+
+    def received(self, session_id: str) -> list:
+        path = self._dir(session_id) / "ranges.log"
+        with self._lock:
+            consumed, merged = self._ranges.get(session_id, (0, []))
+            with path.open("rb") as f:
+                f.seek(consumed)
+                tail = f.read()
+            # solo líneas completas; una escritura a medias se lee en la próxima llamada
+            tail = tail[:tail.rfind(b"\n") + 1]
+            if tail:
+                new = [list(map(int, line.split())) for line in tail.decode().splitlines() if line.count(" ") == 1]
+                merged = merge_ranges(merged + new)
+                consumed += len(tail)
+            self._ranges[session_id] = (consumed, merged)
+            return [list(r) for r in merged]
+
+    def status(self, session_id: str) -> dict:
+        meta = self.meta(session_id)
+        received = self.received(session_id)
+        missing = missing_ranges(received, meta["size"])
+        return {
+            **meta,
+            "received": received,
+            "missing": missing,
+            "bytes_received": sum(end - start for start, end in received),
+            "complete": not missing,
+        }
+
+    def finalize(self, session_id: str, dest: Path) -> dict:
+        """
+        Verifica que esté todo y el sha256 (si se declaró al crear), mueve el
+        archivo a `dest` y borra la sesión. Bloqueante (lee el archivo entero):
+        llamar en un hilo.
+        return:
+          {"path", "size", "sha256"}
+        """
+        path = self._dir(session_id)
+        lock = path / "finalize.lock"
+        try:
+            os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            raise RuntimeError("Upload session is already being finalized")
+        try:
+            status = self.status(session_id)
+            if not status["complete"]:
+                raise ValueError(f"Upload incomplete: missing {status['missing'][:10]}")
+
+            hasher = hashlib.sha256()
+            with self.data_path(session_id).open("rb") as f:
+                for block in iter(lambda: f.read(8 * 1024 * 1024), b""):
+                    hasher.update(block)
+            sha = hasher.hexdigest()
+            if status["sha256"] and sha != status["sha256"]:
+                raise ValueError(f"sha256 mismatch: expected {status['sha256']}, got {sha}")
+
+            shutil.move(str(self.data_path(session_id)), str(dest))
+        except BaseException:
+            lock.unlink(missing_ok=True)
+            raise
+        shutil.rmtree(path, ignore_errors=True)
+        self._forget(session_id)
+        log.info("Sesión de subida %s finalizada -> %s", session_id, dest)
+        return {"path": Path(dest), "size": status["size"], "sha256": sha}
+
+    def _forget(self, session_id: str):
+        with self._lock:
+            self._ranges.pop(session_id, None)
+
+    def remove(self, session_id: str):
+        path = self._dir(session_id)
+        if not path.exists():
+            raise KeyError(session_id)
+        shutil.rmtree(path, ignore_errors=True)
+        self._forget(session_id)
+
+    def purge_stale(self, max_age: float) -> int:
+        """Borra sesiones sin actividad (último trozo recibido) hace más de max_age segundos."""
+        now, removed = time.time(), 0
+        for path in self.root.iterdir():
+            if not TASK_ID_RE.fullmatch(path.name):
+                continue
+            try:
+                last = max(p.stat().st_mtime for p in path.iterdir())
+            except (OSError, ValueError):
+                continue
+            if now - last > max_age:
+                shutil.rmtree(path, ignore_errors=True)
+                self._forget(path.name)
+                removed += 1
+        if removed:
+            log.info("Sesiones de subida vencidas borradas: %d", removed)
+        return removed
@@ -1,50 +1,262 @@
 import pandas as pd
 import re
+import os
+import hashlib
+import logging
+from pathlib import Path
 from datetime import datetime, timedelta
 import numpy as np
 
-def read_sensor_data_to_df(filepath):
-    data = []
-    with open(filepath, 'r', encoding='utf-8') as file:
-        for line in file:
-            line = line.strip()
-            if not line:
+SENSOR_PARSER_VERSION = 1
+SENSOR_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+# formato habitual de una línea; las que no calzan van por el parser genérico
+_SENSOR_LINE = re.compile(
+    r'^Datetime:[ \t]*(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d(?:\.\d+)?)'
+    r' - Temp:[ \t]*(\S+) °C - Humidity:[ \t]*(\S+)% - CO2:[ \t]*(\S+) ppm'
+    r' - PM1:[ \t]*(\S+) - PM2\.5:[ \t]*(\S+) - PM10:[ \t]*(\S+)[ \t\r]*$',
+    re.M,
+)
+_NONEMPTY_LINE = re.compile(r'^[ \t\r]*\S', re.M)
+_SENSOR_COLUMNS = ["Datetime", "Temp", "Humidity", "CO2", "PM1", "PM2.5", "PM10"]
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+logging.basicConfig(level=getattr(logging, LOG_LEVEL, logging.INFO),
+                    format="%(asctime)s %(levelname)s %(message)s")
+log = logging.getLogger("sensor-utils")
+
+
+def file_sha256(path, chunk_size: int = 8 * 1024 * 1024) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(chunk_size):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _parse_sensor_line(line):
+    """Generic 'Key: value - Key: value' parser (units stripped by position)."""
+    entry = {}
+    for part in re.split(r' - ', line):
+        kv_match = re.match(r'([^:]+):\s*(.+)', part)
+        if kv_match:
+            entry[kv_match.group(1).strip()] = kv_match.group(2).strip()
+
+    for field, unit_len in (('Temp', 3), ('Humidity', 1), ('CO2', 4)):
+        if field in entry:
+            entry[field] = entry[field][:-unit_len]
+    return entry
+
+
+def _to_datetime(values):
+    times = pd.to_datetime(pd.Series(values), format=SENSOR_DATETIME_FORMAT, errors='coerce')
+    missing = times.isna().to_numpy()
+    if missing.any():
+        # otros formatos (p.ej. sin milisegundos): parser genérico solo para esas filas
+        retry = pd.to_datetime(pd.Series(values)[missing], errors='coerce')
+        times = times.where(~missing, retry)
+    return times.to_numpy(dtype="datetime64[ns]")
+
+
+def _all_lines_match(text, n_rows):
+    if n_rows == text.count('\n') + (not text.endswith('\n')):
+        return True
+    return n_rows == len(_NONEMPTY_LINE.findall(text))  # puede haber líneas vacías
+
+
+def _parse_sensor_chunk(text):
+    rows = _SENSOR_LINE.findall(text)
+    if rows and _all_lines_match(text, len(rows)):
+        cols = list(zip(*rows))
+        try:
+            data = {"Datetime": _to_datetime(cols[0])}
+            for i, name in enumerate(_SENSOR_COLUMNS[1:], start=1):
+                data[name] = np.fromiter(map(float, cols[i]), dtype=np.float64, count=len(rows))
+            return pd.DataFrame(data)
+        except ValueError:
+            pass  # algún valor no numérico: parser genérico
+
+    df = pd.DataFrame([_parse_sensor_line(line.strip()) for line in text.splitlines() if line.strip()])
+    for name in df.columns:
+        if name == "Datetime":
+            df[name] = _to_datetime(df[name].to_numpy())
+        elif name in _SENSOR_COLUMNS:
+            df[name] = pd.to_numeric(df[name], errors='coerce')
+    return df
+
+
+def _iter_text_chunks(filepath, chunk_bytes):
+    """Text blocks of ~chunk_bytes cut at line boundaries."""
+    with open(filepath, 'rb') as f:
+        tail = b''
+        while block := f.read(chunk_bytes):
+            block = tail + block
+            cut = block.rfind(b'\n')
+            if cut < 0:
+                tail = block
                 continue
-            parts = re.split(r' - ', line)
-            entry = {}
-            for part in parts:
-                kv_match = re.match(r'([^:]+):\s*(.+)', part)
-                if kv_match:
-                    key = kv_match.group(1).strip()
-                    value = kv_match.group(2).strip()
-                    entry[key] = value
-
-            if 'Temp' in entry:
-                entry['Temp'] = float(entry['Temp'][:-3])
-            if 'Humidity' in entry:
-                entry['Humidity'] = float(entry['Humidity'][:-1])
-            if 'CO2' in entry:
-                entry['CO2'] = float(entry['CO2'][:-4])
-            for pm_field in ['PM1', 'PM2.5', 'PM10']:
-                if pm_field in entry:
-                    entry[pm_field] = float(entry[pm_field])
-
-            if 'Datetime' in entry:
-                raw_dt = entry['Datetime']
-                try:
-                    raw_time = datetime.strptime(raw_dt, "%Y-%m-%d %H:%M:%S.%f")
-                    entry['Datetime'] = raw_time.isoformat()
-                except Exception as e:
-                    print(f"Datetime parse error: {e}")
-
-            data.append(entry)
-    df = pd.DataFrame(data)
+            tail = block[cut + 1:]
+            yield block[:cut + 1].decode('utf-8')
+        if tail:
+            yield tail.decode('utf-8')
+
+
+def _save_sensor_cache(df, path):
+    """Best effort: a failed cache write (read-only dir, full disk) is logged, never raised."""
+    tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npz")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        arrays = {}
+        for i, name in enumerate(df.columns):
+            col = df[name].to_numpy()
+            arrays[f"c{i}"] = col if col.dtype.kind in "fiMb" else col.astype(str)
+        np.savez(tmp_path, columns=np.array(df.columns, dtype=str), **arrays)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        log.warning("Sensor cache write error (%s): %s", path, e)
+        try:
+            tmp_path.unlink(missing_ok=True)
+        except OSError:
+            pass
+
+
+def _load_sensor_cache(path):
+    with np.load(path, allow_pickle=False) as z:
+        return pd.DataFrame({name: z[f"c{i}"] for i, name in enumerate(z["columns"].tolist())})
+
+
+def read_sensor_data_to_df(filepath, cache_dir=None, chunk_bytes: int = 64 * 1024 * 1024):
+    """
+    Sensor log -> DataFrame with Datetime as datetime64[ns] and float readings.
+    The file is read in blocks of chunk_bytes; each block is parsed with one
+    regex pass (generic per-line parser for non-standard blocks).
+    cache_dir: keeps the parsed columns as .npz keyed by the file's sha256.
+    """
+    cache_path = None
+    if cache_dir:
+        key = file_sha256(filepath)
+        cache_path = Path(cache_dir) / f"{key[:32]}.v{SENSOR_PARSER_VERSION}.npz"
+        if cache_path.exists():
+            try:
+                return _load_sensor_cache(cache_path)
+            except Exception as e:
+                log.warning("Sensor cache read error (%s): %s", cache_path, e)
+
+    frames = [_parse_sensor_chunk(text) for text in _iter_text_chunks(filepath, chunk_bytes)]
+    frames = [f for f in frames if not f.empty]
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    if cache_path is not None:
+        _save_sensor_cache(df, cache_path)
     return df
 
+
 def sensor_at(ts: datetime, sensor_times):
-    """Return the *latest* sensor row ≤ ts or None if ts is earlier."""
+    """
+    Index of the *latest* sensor row <= ts, or None if ts is earlier.
+    Kept for single lookups; align many timestamps at once with SensorTrack.
+    """
     idx = sensor_times.searchsorted(np.datetime64(ts), side="right") - 1
     if idx < 0:
         return None
     return idx
 
+
+SENSOR_FIELDS = ["Temp", "Humidity", "CO2", "PM1", "PM2.5", "PM10"]
+SENSOR_ALIGN_MODES = ('latest', 'nearest', 'linear')
+
+
+def frame_times(video_start: datetime, frame_idx, fps: float):
+    """datetime64[us] timestamps for an array of frame indices."""
+    offsets = np.round(np.asarray(frame_idx, dtype=np.float64) / fps * 1e6).astype(np.int64)
+    return np.datetime64(video_start, 'us') + offsets.astype('timedelta64[us]')
+
+
+def hhmmss(times):
+    """datetime64 array -> ['HH:MM:SS', ...]"""
+    return [s[11:19] for s in np.datetime_as_string(times, unit='s')]
+
+
+class SensorTrack:
+    """
+    Sensor readings as NumPy columns, aligned to many timestamps at once
+    (one searchsorted per call instead of one per frame).
+
+    mode:
+      - 'latest': latest reading <= ts (same as sensor_at).
+      - 'nearest': closest reading before or after ts.
+      - 'linear': linear interpolation between the surrounding readings
+                  (nearest reading outside the logged span).
+    max_staleness: seconds; timestamps farther than this from the reading(s)
+    used get no data. None = no limit.
+    """
+
+    def __init__(self, df: pd.DataFrame, mode: str = 'latest', max_staleness=None,
+                 fields=SENSOR_FIELDS):
+        if mode not in SENSOR_ALIGN_MODES:
+            raise ValueError(f"Sensor align mode {mode} is not available, try one of: {SENSOR_ALIGN_MODES}")
+        self.mode = mode
+        self.max_staleness = None if max_staleness is None else np.timedelta64(int(max_staleness * 1e9), 'ns')
+        self.fields = list(fields)
+
+        times = df["Datetime"].values.astype("datetime64[ns]")
+        values = np.column_stack([
+            pd.to_numeric(df[f], errors='coerce').to_numpy(dtype=np.float64) if f in df.columns
+            else np.full(len(df), np.nan)
+            for f in self.fields
+        ]) if len(df) else np.empty((0, len(self.fields)))
+        keep = ~np.isnat(times)  # unparseable timestamps
+        times, values = times[keep], values[keep]
+        order = np.argsort(times, kind='stable')
+        self.times = times[order]
+        self.values = values[order]
+
+    def __len__(self):
+        return len(self.times)
+
+    def _fresh(self, gap, valid):
+        if self.max_staleness is not None:
+            valid &= gap <= self.max_staleness
+        return valid
+
+    def align(self, ts):
+        """
+        ts: datetime64 array (M,)
+        return:
+          values (M, len(fields)) float64, valid (M,) bool
+        """
+        ts = np.asarray(ts).astype("datetime64[ns]")
+        n = len(self.times)
+        out = np.full((len(ts), len(self.fields)), np.nan)
+        if n == 0:
+            return out, np.zeros(len(ts), dtype=bool)
+
+        left = self.times.searchsorted(ts, side='right') - 1  # latest <= ts
+        if self.mode == 'latest':
+            valid = left >= 0
+            li = np.clip(left, 0, n - 1)
+            valid = self._fresh(ts - self.times[li], valid)
+            out[valid] = self.values[li[valid]]
+            return out, valid
+
+        li = np.clip(left, 0, n - 1)
+        ri = np.clip(left + 1, 0, n - 1)
+        gap_l = np.abs(ts - self.times[li])
+        gap_r = np.abs(self.times[ri] - ts)
+        nearest = np.where(gap_r < gap_l, ri, li)
+        valid = self._fresh(np.minimum(gap_l, gap_r), np.ones(len(ts), dtype=bool))
+
+        if self.mode == 'nearest':
+            out[valid] = self.values[nearest[valid]]
+            return out, valid
+
+        # linear: only between the two readings around ts
+        inside = (left >= 0) & (left + 1 < n)
+        span = (self.times[ri] - self.times[li]).astype(np.float64)
+        w = np.where(inside & (span > 0),
+                     (ts - self.times[li]).astype(np.float64) / np.where(span > 0, span, 1.0), 0.0)
+        interp = self.values[li] * (1.0 - w)[:, None] + self.values[ri] * w[:, None]
+        interp = np.where((w == 0)[:, None], self.values[li], interp)  # exact hit: no NaN from the other side
+        interp[~inside] = self.values[nearest[~inside]]
+        out[valid] = interp[valid]
+        return out, valid
@@ -0,0 +1,237 @@
+# src/video_reader.py
+import os
+import queue
+import threading
+from collections import deque
+import subprocess
+import logging
+
+import cv2
+import numpy as np
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+logging.basicConfig(level=getattr(logging, LOG_LEVEL, logging.INFO),
+                    format="%(asctime)s %(levelname)s %(message)s")
+log = logging.getLogger("video-reader")
+
+
+SKIP_MODES = ('read', 'grab', 'seek')
+
+
+def iter_sampled_frames(cap, sample_every: int = 1, mode: str = 'grab',
+                        seek_min_stride: int = 60):
+    """
+    Recorre un cv2.VideoCapture y entrega solo los frames muestreados.
+    mode:
+      - 'read': decodifica y convierte a BGR todos los frames (comportamiento original).
+      - 'grab': los frames descartados solo se avanzan con grab(), sin retrieve/BGR.
+      - 'seek': salta con CAP_PROP_POS_FRAMES directo al siguiente frame muestreado
+                (keyframe + decode hasta el objetivo). Solo conviene con strides
+                grandes; por debajo de seek_min_stride se usa 'grab'.
+    Los índices entregados son los mismos en todos los modos.
+    yield:
+      (frame_idx (int), frame BGR)
+    """
+    if mode not in SKIP_MODES:
+        raise ValueError(f"Skip mode {mode} is not available, try one of: {SKIP_MODES}")
+    sample_every = max(1, int(sample_every))
+
+    if mode == 'seek' and sample_every >= seek_min_stride:
+        frame_idx = 0
+        while True:
+            if frame_idx > 0 and not cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx):
+                break
+            ok, frame = cap.read()
+            if not ok:
+                break
+            yield frame_idx, frame
+            frame_idx += sample_every
+        return
+
+    frame_idx = 0
+    while True:
+        if mode == 'read' or frame_idx % sample_every == 0:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            if frame_idx % sample_every == 0:
+                yield frame_idx, frame
+        elif not cap.grab():
+            break
+        frame_idx += 1
+
+
+def iter_frames_at(cap, indices, seek_min_stride: int = 60):
+    """
+    Acceso aleatorio a una lista de frames (en cualquier orden; se leen
+    ordenados). Entre objetivos cercanos avanza con grab(); si el salto es de
+    seek_min_stride frames o más, o hacia atrás, reposiciona con CAP_PROP_POS_FRAMES.
+    Un frame que no se puede posicionar / leer se omite (con un warning) y se
+    sigue con el siguiente, reposicionando.
+    yield:
+      (frame_idx (int), frame BGR)
+    """
+    pos = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+    for target in sorted(set(int(i) for i in indices)):
+        if pos is None or target < pos or target - pos >= seek_min_stride:
+            if not cap.set(cv2.CAP_PROP_POS_FRAMES, target):
+                log.warning("Frame %d: no se pudo posicionar el video, se omite", target)
+                pos = None
+                continue
+            pos = target
+        while pos < target and cap.grab():
+            pos += 1
+        ok, frame = cap.read() if pos == target else (False, None)
+        if not ok:
+            log.warning("Frame %d: no se pudo leer, se omite", target)
+            pos = None  # posición incierta: el próximo objetivo reposiciona
+            continue
+        pos += 1
+        yield target, frame
+
+
+def _drain_lines(pipe, lines: deque):
+    """Lee `pipe` hasta EOF; conserva solo las últimas líneas (deque acotada)."""
+    try:
+        for line in iter(pipe.readline, b""):
+            lines.append(line.decode('utf-8', errors='replace').rstrip())
+    finally:
+        pipe.close()
+
+
+class FFmpegFrameReader:
+    """
+    Lector alternativo vía ffmpeg (rawvideo por pipe): el muestreo, el escalado
+    y la conversión a RGB los hace el decodificador, así que los frames llegan
+    ya al tamaño de entrada del modelo (sin cvtColor ni PIL en el bucle).
+    stderr se vacía en un hilo aparte: si ffmpeg escribe muchos errores no se
+    bloquea con el pipe lleno; las últimas líneas van en el RuntimeError.
+    yield:
+      (frame_idx (int), frame RGB uint8 (H, W, 3))
+    """
+
+    def __init__(self, video_path, sample_every: int = 1, size: tuple = (256, 256),
+                 threads: int = 0, ffmpeg_bin: str = 'ffmpeg'):
+        self.video_path = str(video_path)
+        self.sample_every = max(1, int(sample_every))
+        self.height, self.width = size
+        self.threads = int(threads)
+        self.ffmpeg_bin = ffmpeg_bin
+
+    def _command(self) -> list:
+        vf = (f"select=not(mod(n\\,{self.sample_every})),"
+              f"scale={self.width}:{self.height}:flags=bicubic")
+        return [
+            self.ffmpeg_bin, '-nostdin', '-loglevel', 'error',
+            '-threads', str(self.threads),
+            '-i', self.video_path,
+            '-an', '-sn',
+            '-vf', vf, '-vsync', '0',
+            '-pix_fmt', 'rgb24', '-f', 'rawvideo', 'pipe:1',
+        ]
+
+    def __iter__(self):
+        frame_bytes = self.width * self.height * 3
+        proc = subprocess.Popen(self._command(), stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE, bufsize=frame_bytes * 4)
+        stderr_tail = deque(maxlen=20)
+        drain = threading.Thread(target=_drain_lines, args=(proc.stderr, stderr_tail),
+                                 name="ffmpeg-stderr", daemon=True)
+        drain.start()
+        finished = False
+        try:
+            k = 0
+            while True:
+                buf = proc.stdout.read(frame_bytes)
+                if len(buf) < frame_bytes:
+                    finished = True
+                    break
+                frame = np.frombuffer(buf, dtype=np.uint8).reshape(self.height, self.width, 3)
+                yield k * self.sample_every, frame
+                k += 1
+        finally:
+            proc.stdout.close()
+            if proc.poll() is None:
+                proc.kill()
+            proc.wait()
+            drain.join(timeout=5)
+        if finished and proc.returncode != 0:
+            stderr = "\n".join(stderr_tail).strip()
+            raise RuntimeError(f"ffmpeg failed ({proc.returncode}): {stderr}")
+
+
+class FramePrefetcher:
+    """
+    Productor/consumidor: un hilo decodificador llena una cola acotada con los
+    frames muestreados mientras el hilo llamante corre la inferencia.
+
+    - depth <= 0 desactiva el hilo (iteración síncrona, como antes).
+    - Un error en el decodificador se relanza en el consumidor.
+    - close() (o salir del `with`) detiene el hilo aunque la cola esté llena.
+    """
+
+    _DONE = object()
+
+    def __init__(self, frames, depth: int = 8):
+        self._frames = frames
+        self._depth = int(depth)
+        self._queue = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._error = None
+
+        if self._depth > 0:
+            self._queue = queue.Queue(maxsize=self._depth)
+            self._thread = threading.Thread(target=self._run, name="frame-decoder", daemon=True)
+            self._thread.start()
+
+    def _put(self, item) -> bool:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self):
+        frames = iter(self._frames)
+        try:
+            for item in frames:
+                if not self._put(item):
+                    break
+        except BaseException as e:
+            self._error = e
+            log.warning("Decodificador detenido por error: %s", e)
+        finally:
+            close = getattr(frames, "close", None)
+            if close is not None:
+                close()
+            self._put(self._DONE)
+
+    def __iter__(self):
+        if self._thread is None:
+            yield from self._frames
+            return
+
+        while True:
+            item = self._queue.get()
+            if item is self._DONE:
+                break
+            yield item
+
+        if self._error is not None:
+            raise self._error
+
+    def close(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def __enter__(self) -> 'FramePrefetcher':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,6 @@
+# tests/conftest.py
+import sys
+from pathlib import Path
+
+# los tests importan `src.*` desde la raíz del repo, igual que api.py / worker.py
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
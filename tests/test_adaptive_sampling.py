@@ -0,0 +1,45 @@
+# tests/test_adaptive_sampling.py
+from src.adaptive_sampling import AdaptiveSampler
+
+
+def _run(sampler, classify):
+    data, indices, levels = {}, sampler.start(), 0
+    while indices:
+        for idx in indices:
+            data[idx] = {"cls": classify(idx)}
+        indices = sampler.refine(data)
+        levels += 1
+    return data, levels
+
+
+def test_coarse_grid_snaps_to_min_stride():
+    sampler = AdaptiveSampler(n_frames=103, coarse_stride=32, min_stride=5)
+    assert sampler.coarse_stride == 30
+    assert sampler.start() == [0, 30, 60, 90, 100]
+
+
+def test_confident_constant_video_stays_coarse():
+    sampler = AdaptiveSampler(n_frames=1000, coarse_stride=100, min_stride=5)
+    data, levels = _run(sampler, lambda idx: {"class": "no_smoke", "conf": 0.99})
+    assert sorted(data) == list(range(0, 1000, 100)) + [995]
+    assert levels == 1
+
+
+def test_class_change_is_located_at_min_stride():
+    onset = 437
+    sampler = AdaptiveSampler(n_frames=1000, coarse_stride=100, min_stride=5)
+    data, _ = _run(sampler, lambda idx: {"class": "smoke" if idx >= onset else "no_smoke", "conf": 0.99})
+
+    assert all(idx % 5 == 0 for idx in data)
+    last_clear = max(idx for idx in data if idx < onset)
+    first_smoke = min(idx for idx in data if idx >= onset)
+    assert (last_clear, first_smoke) == (435, 440)
+    assert len(data) < 1000 // 5 // 4  # muy por debajo del muestreo denso
+
+
+def test_uncertain_samples_are_refined_and_unreadable_are_not():
+    sampler = AdaptiveSampler(n_frames=201, coarse_stride=100, min_stride=5, uncertain_conf=0.8)
+    sampler.start()
+    data = {0: {"cls": {"class": "a", "conf": 0.99}},
+            100: {"cls": {"class": "a", "conf": 0.5}}}  # 200 no se pudo leer
+    assert sampler.refine(data) == [50]
@@ -0,0 +1,114 @@
+# tests/test_batcher.py
+import threading
+import time
+
+import numpy as np
+import pytest
+import torch
+
+from src.batcher import MicroBatcher
+
+
+class FakePredictor:
+    """predict_probs devuelve, por frame, [valor del frame, 0]; registra el tamaño de cada pasada."""
+
+    input_size = (2, 2)
+    labels = ["no_smoke", "smoke"]
+
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.batch_sizes = []
+
+    def prepare_batch(self, images, rgb=False):
+        return torch.tensor([float(img[0, 0, 0]) for img in images]).view(-1, 1)
+
+    def predict_probs(self, batch):
+        self.batch_sizes.append(batch.shape[0])
+        time.sleep(self.delay)
+        if self.fail:
+            raise ValueError("model failed")
+        return np.column_stack([batch[:, 0].numpy(), np.zeros(batch.shape[0])])
+
+    def decode(self, probs):
+        return [("frame", float(p)) for p in probs[:, 0]]
+
+
+def _frames(*values):
+    return [np.full((2, 2, 3), v, dtype=np.uint8) for v in values]
+
+
+def _run_threads(targets, timeout=10):
+    threads = [threading.Thread(target=t) for t in targets]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout)
+    assert not any(t.is_alive() for t in threads), "a caller hung"
+
+
+def test_single_caller_does_not_wait():
+    batcher = MicroBatcher(FakePredictor(), max_batch=32, max_wait_ms=1000)
+    try:
+        t0 = time.perf_counter()
+        assert batcher.predict_batch(_frames(3, 4)) == [("frame", 3.0), ("frame", 4.0)]
+        assert time.perf_counter() - t0 < 0.5
+    finally:
+        batcher.close()
+
+
+def test_concurrent_callers_share_passes_and_get_their_own_rows():
+    predictor = FakePredictor(delay=0.05)
+    batcher = MicroBatcher(predictor, max_batch=8, max_wait_ms=200)
+    results = {}
+
+    def caller(k):
+        return lambda: results.__setitem__(k, batcher.predict_batch(_frames(2 * k, 2 * k + 1)))
+
+    try:
+        _run_threads([caller(k) for k in range(12)])
+    finally:
+        batcher.close()
+    assert results == {k: [("frame", 2.0 * k), ("frame", 2.0 * k + 1)] for k in range(12)}
+    assert sum(predictor.batch_sizes) == 24
+    assert max(predictor.batch_sizes) > 2 and max(predictor.batch_sizes) <= 8
+
+
+def test_model_error_reaches_every_caller_in_the_batch():
+    batcher = MicroBatcher(FakePredictor(fail=True))
+    try:
+        with pytest.raises(ValueError, match="model failed"):
+            batcher.predict_batch(_frames(1))
+    finally:
+        batcher.close()
+
+
+def test_close_rejects_new_requests():
+    batcher = MicroBatcher(FakePredictor())
+    batcher.close()
+    batcher.close()  # idempotente
+    with pytest.raises(RuntimeError, match="closed"):
+        batcher.predict_batch(_frames(1))
+
+
+def test_close_while_preprocessing_does_not_hang():
+    predictor = FakePredictor()
+    batcher = MicroBatcher(predictor)
+    prepare = predictor.prepare_batch
+
+    def prepare_then_close(images, rgb=False):
+        batch = prepare(images, rgb)
+        batcher.close()  # cierra entre el chequeo inicial y el encolado
+        return batch
+
+    predictor.prepare_batch = prepare_then_close
+    errors = []
+
+    def caller():
+        try:
+            batcher.predict_batch(_frames(1))
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    _run_threads([caller], timeout=5)
+    assert errors == ["micro-batcher is closed"]
@@ -0,0 +1,59 @@
+# tests/test_events.py
+import numpy as np
+import pytest
+
+from src.events import hysteresis, smoke_events, smoke_probability, summarize
+from src.result_store import TaskResult
+
+T0 = np.datetime64("2024-01-01T12:00:00", "us")
+
+
+def _result(p_smoke, sensors=None, valid=None):
+    """Un frame por segundo; p_smoke = P(smoke) por frame."""
+    p = np.asarray(p_smoke, dtype=np.float64)
+    n = len(p)
+    is_smoke = p >= 0.5
+    return TaskResult("v.mp4", n, np.arange(n), T0 + np.arange(n) * np.timedelta64(1, "s"),
+                      is_smoke.astype(int), ["no_smoke", "smoke"], np.where(is_smoke, p, 1 - p),
+                      np.zeros(n, dtype=bool), sensors, valid)
+
+
+def test_smoke_probability():
+    prob = smoke_probability(_result([0.9, 0.2, 0.55]))
+    np.testing.assert_allclose(prob, [0.9, 0.2, 0.55], atol=1e-6)
+    assert not smoke_probability(_result([0.9]), label="fire").any()
+
+
+def test_hysteresis_holds_state_between_thresholds():
+    prob = np.array([0.5, 0.7, 0.5, 0.45, 0.3, 0.5, 0.6, 0.1])
+    assert hysteresis(prob, 0.6, 0.4).tolist() == [False, True, True, True, False, False, True, False]
+    assert hysteresis(np.empty(0), 0.6, 0.4).tolist() == []
+    with pytest.raises(ValueError):
+        hysteresis(prob, 0.4, 0.6)
+
+
+def test_events_min_duration_and_max_gap():
+    p = [0.9, 0.9, 0.9, 0.1, 0.9, 0.9, 0.1, 0.1, 0.1, 0.9]
+    events = smoke_events(_result(p), min_duration=1.0)
+    assert [(e["start_frame"], e["end_frame"]) for e in events] == [(0, 2), (4, 5)]
+    assert events[0]["duration_seconds"] == 2.0 and events[0]["frames"] == 3
+    assert events[0]["start"] == "12:00:00" and events[0]["end"] == "12:00:02"
+
+    merged = smoke_events(_result(p), min_duration=1.0, max_gap=2.0)
+    assert [(e["start_frame"], e["end_frame"]) for e in merged] == [(0, 5)]
+    assert merged[0]["frames"] == 6
+
+
+def test_event_sensor_stats_use_valid_readings_only():
+    sensors = np.zeros((4, 6))
+    sensors[:, 0] = [10.0, 20.0, 30.0, 1000.0]
+    valid = np.array([True, True, True, False])
+    event, = smoke_events(_result([0.9] * 4, sensors, valid), min_duration=0)
+    assert event["sensors"]["Temp"] == {"mean": 20.0, "max": 30.0}
+
+
+def test_summarize():
+    summary = summarize(_result([0.9, 0.9, 0.1, 0.9]), min_duration=0.5)
+    assert summary["label_frames"] == 3
+    assert summary["event_seconds"] == 1.0
+    assert len(summary["events"]) == 1
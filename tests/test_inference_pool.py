@@ -0,0 +1,48 @@
+# tests/test_inference_pool.py
+import numpy as np
+import torch
+
+from src.backends import export_torchscript
+from src.inference_pool import InferencePool
+
+
+class TinyInfer:
+    """Lo que InferencePool usa de CameraInference, con un modelo chico."""
+
+    device = torch.device('cpu')
+    input_size = (4, 4)
+    labels = ["no_smoke", "smoke"]
+    int8 = False
+    int8_path = None
+
+    def __init__(self, backend='eager', artifact_path=None):
+        torch.manual_seed(0)
+        self.model = torch.nn.Sequential(torch.nn.Flatten(), torch.nn.Linear(3 * 4 * 4, 2)).eval()
+        self.backend = backend
+        self.artifact_path = artifact_path
+
+    def local_probs(self, batch):
+        with torch.no_grad():
+            return torch.nn.functional.softmax(self.model(batch), dim=1).numpy()
+
+
+def _check(infer, reference):
+    batch = torch.randn(5, 3, 4, 4)
+    pool = InferencePool(infer, workers=2, threads=1)
+    try:
+        np.testing.assert_allclose(pool.predict_probs(batch), reference.local_probs(batch), atol=1e-6)
+    finally:
+        pool.close()
+
+
+def test_eager_workers_share_the_model():
+    infer = TinyInfer()
+    _check(infer, infer)
+
+
+def test_workers_load_the_exported_artifact(tmp_path):
+    infer = TinyInfer()
+    path = export_torchscript(infer.model, tmp_path / "tiny.ts", infer.input_size)
+    infer.backend, infer.artifact_path = 'torchscript', path
+    infer.model = None  # el worker no debe necesitar el modelo original
+    _check(infer, TinyInfer())
@@ -0,0 +1,86 @@
+import asyncio
+import hashlib
+
+import pytest
+
+from src.ingest import HashingFileWriter, MultipartIngest, stream_to_writer
+
+BOUNDARY = "----smoketest"
+
+
+def _body(parts):
+    """parts: (campo, filename o None, contenido)."""
+    out = b""
+    for field, filename, content in parts:
+        disposition = f'form-data; name="{field}"'
+        if filename is not None:
+            disposition += f'; filename="{filename}"'
+        out += (f"--{BOUNDARY}\r\nContent-Disposition: {disposition}\r\n"
+                f"Content-Type: application/octet-stream\r\n\r\n").encode() + content + b"\r\n"
+    return out + f"--{BOUNDARY}--\r\n".encode()
+
+
+async def _chunks(data, size):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def _ingest(tmp_path, body, chunk_size, destination=None):
+    destination = destination or (lambda field, filename, ct: tmp_path / field)
+    ingest = MultipartIngest(f"multipart/form-data; boundary={BOUNDARY}", destination, chunk_bytes=1)
+    return ingest, asyncio.run(ingest.ingest(_chunks(body, chunk_size)))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 4096, 1 << 20])
+def test_parts_split_across_chunks(tmp_path, chunk_size):
+    video = bytes(range(256)) * 1000 + b"--" + BOUNDARY.encode()[:5]  # parece boundary pero no lo es
+    sensor = b"2024-01-01 12:00:00 1 2 3\n" * 10
+    _, files = _ingest(tmp_path, _body([("file", "cam.mp4", video), ("sensor", None, sensor)]), chunk_size)
+
+    assert set(files) == {"file", "sensor"}
+    assert files["file"]["filename"] == "cam.mp4" and files["sensor"]["filename"] == ""
+    for field, content in (("file", video), ("sensor", sensor)):
+        assert (tmp_path / field).read_bytes() == content
+        assert files[field]["size"] == len(content)
+        assert files[field]["sha256"] == hashlib.sha256(content).hexdigest()
+
+
+def test_destination_none_skips_part(tmp_path):
+    body = _body([("note", None, b"hola"), ("file", "cam.mp4", b"video")])
+    _, files = _ingest(tmp_path, body, 3,
+                       lambda field, filename, ct: tmp_path / field if filename else None)
+    assert list(files) == ["file"]
+    assert not (tmp_path / "note").exists()
+
+
+def test_truncated_body_removes_written_files(tmp_path):
+    body = _body([("file", "cam.mp4", b"x" * 1000)])[:-200]
+    with pytest.raises(ValueError):
+        _ingest(tmp_path, body, 64)
+    assert not (tmp_path / "file").exists()
+
+
+def test_missing_boundary():
+    with pytest.raises(ValueError):
+        MultipartIngest("multipart/form-data", lambda *a: None)
+
+
+def test_stream_to_writer_limit_and_offset(tmp_path):
+    path = tmp_path / "out.bin"
+
+    async def run():
+        writer = await HashingFileWriter(path).open()
+        await stream_to_writer(_chunks(b"a" * 100, 9), writer)
+        await writer.close()
+        patch = await HashingFileWriter(path, offset=10).open()
+        await stream_to_writer(_chunks(b"b" * 5, 2), patch)
+        sha = await patch.close()
+        assert sha == hashlib.sha256(b"b" * 5).hexdigest()
+        over = await HashingFileWriter(tmp_path / "over.bin").open()
+        with pytest.raises(ValueError):
+            await stream_to_writer(_chunks(b"c" * 100, 10), over, limit=50)
+        await over.abort()
+
+    asyncio.run(run())
+    assert path.read_bytes() == b"a" * 10 + b"b" * 5 + b"a" * 85
+    assert not (tmp_path / "over.bin").exists()
@@ -0,0 +1,114 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from src.job_queue import JobQueue, ProgressMap, StatusMap
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(tmp_path / "jobs.sqlite3")
+
+
+def _age(queue, task_id, seconds):
+    """Simula un worker que dejó de latir hace `seconds`."""
+    conn = sqlite3.connect(queue.db_path, isolation_level=None)
+    conn.execute("UPDATE jobs SET heartbeat = ? WHERE task_id = ?", (time.time() - seconds, task_id))
+    conn.close()
+
+
+def _state(queue, task_id):
+    conn = sqlite3.connect(queue.db_path)
+    row = conn.execute("SELECT state, attempts, worker FROM jobs WHERE task_id = ?", (task_id,)).fetchone()
+    conn.close()
+    return row
+
+
+def test_claim_is_fifo_and_exclusive(queue):
+    for i in range(3):
+        queue.enqueue(f"t{i}", {"i": i})
+        time.sleep(0.002)
+    assert queue.claim("w1") == ("t0", {"i": 0})
+    assert queue.claim("w2") == ("t1", {"i": 1})
+    assert _state(queue, "t0") == ("running", 1, "w1")
+
+
+def test_concurrent_claims_take_each_job_once(queue):
+    for i in range(40):
+        queue.enqueue(f"t{i}", {})
+    claimed, lock = [], threading.Lock()
+
+    def worker(name):
+        while (job := queue.claim(name)) is not None:
+            with lock:
+                claimed.append(job[0])
+
+    threads = [threading.Thread(target=worker, args=(f"w{i}",)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(claimed) == sorted(f"t{i}" for i in range(40))
+
+
+def test_requeue_stale_only_touches_dead_workers(queue):
+    queue.enqueue("dead", {})
+    queue.enqueue("alive", {})
+    queue.claim("w1"), queue.claim("w2")
+    queue.set_progress("dead", {"frames_sampled": 10})
+    _age(queue, "dead", 600)
+
+    assert queue.requeue_stale(max_age=120) == 1
+    assert _state(queue, "dead") == ("queued", 1, None)
+    assert queue.get_progress("dead") is None and queue.get_status("dead") == "processing"
+    assert _state(queue, "alive")[0] == "running"
+
+    assert queue.claim("w3") == ("dead", {})
+    assert _state(queue, "dead") == ("running", 2, "w3")
+
+
+def test_requeue_stale_gives_up_after_max_attempts(queue):
+    queue.enqueue("crashy", {})
+    for attempt in range(1, 4):
+        assert queue.claim("w") == ("crashy", {})
+        _age(queue, "crashy", 600)
+        requeued = queue.requeue_stale(max_age=120, max_attempts=3)
+        assert requeued == (1 if attempt < 3 else 0)
+
+    assert _state(queue, "crashy")[:2] == ("failed", 3)
+    assert queue.get_status("crashy") == "error: too many attempts"
+    assert queue.claim("w") is None
+
+
+def test_requeue_stale_without_limit(queue):
+    queue.enqueue("crashy", {})
+    for _ in range(5):
+        queue.claim("w")
+        _age(queue, "crashy", 600)
+        assert queue.requeue_stale(max_age=120, max_attempts=0) == 1
+    assert _state(queue, "crashy")[:2] == ("queued", 5)
+
+
+def test_finished_jobs_are_not_requeued(queue):
+    queue.enqueue("t", {})
+    queue.claim("w")
+    queue.finish("t")
+    _age(queue, "t", 600)
+    assert queue.requeue_stale(max_age=120, max_attempts=1) == 0
+    assert _state(queue, "t")[0] == "done"
+
+
+def test_status_and_progress_maps(queue):
+    status, progress = StatusMap(queue), ProgressMap(queue)
+    status["a"] = "processing"
+    progress["a"] = {"frames_sampled": 3}
+    status["b"] = "completed"
+    assert dict(status) == {"a": "processing", "b": "completed"}
+    assert dict(progress) == {"a": {"frames_sampled": 3}}
+    del progress["a"]
+    assert "a" not in progress and "a" in status
+    del status["a"]
+    with pytest.raises(KeyError):
+        status["a"]
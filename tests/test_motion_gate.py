@@ -0,0 +1,38 @@
+# tests/test_motion_gate.py
+import numpy as np
+
+from src.motion_gate import ChangeGate, MAX_CARRY_LIMIT
+
+
+def _frame(value):
+    return np.full((72, 128, 3), value, dtype=np.uint8)
+
+
+def test_first_frame_and_changes_are_inferred():
+    gate = ChangeGate(threshold=0.02, max_carry=0)
+    assert gate.should_infer(_frame(100))
+    assert not gate.should_infer(_frame(101))
+    assert gate.should_infer(_frame(200))
+    assert (gate.inferred, gate.skipped) == (2, 1)
+
+
+def test_slow_drift_is_measured_against_last_inferred_frame():
+    gate = ChangeGate(threshold=0.02, max_carry=0)
+    decisions = [gate.should_infer(_frame(100 + step)) for step in range(8)]
+    # cada paso es 1/255 del anterior, pero contra la referencia se acumula: 6/255 es el primero >= 0.02
+    assert decisions == [True, False, False, False, False, False, True, False]
+
+
+def test_max_carry_forces_a_recheck():
+    gate = ChangeGate(threshold=0.5, max_carry=3)
+    decisions = [gate.should_infer(_frame(100)) for _ in range(9)]
+    assert decisions == [True, False, False, False, True, False, False, False, True]
+
+
+def test_max_carry_zero_is_clamped_not_unbounded():
+    assert ChangeGate(max_carry=0).max_carry == MAX_CARRY_LIMIT
+    assert ChangeGate(max_carry=10 * MAX_CARRY_LIMIT).max_carry == MAX_CARRY_LIMIT
+
+    gate = ChangeGate(threshold=0.5, max_carry=0)
+    decisions = [gate.should_infer(_frame(100)) for _ in range(2 * MAX_CARRY_LIMIT + 3)]
+    assert [i for i, d in enumerate(decisions) if d] == [0, MAX_CARRY_LIMIT + 1, 2 * MAX_CARRY_LIMIT + 2]
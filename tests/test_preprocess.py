@@ -0,0 +1,50 @@
+# tests/test_preprocess.py
+import numpy as np
+import pytest
+import torch
+from torchvision import transforms
+
+from src.preprocess import IMAGENET_MEAN, IMAGENET_STD, PIL_TOLERANCE, TensorPreprocessor
+
+SIZE = (256, 256)
+
+
+def _pil_chain(rgb):
+    return transforms.Compose([
+        transforms.ToPILImage(),
+        transforms.Resize(SIZE, transforms.InterpolationMode.BICUBIC),
+        transforms.ToTensor(),
+        transforms.Normalize(IMAGENET_MEAN, IMAGENET_STD),
+    ])(rgb)
+
+
+def _frames(shape, n=3):
+    rng = np.random.default_rng(0)
+    # ruido suavizado: más parecido a un frame real que ruido puro
+    small = rng.integers(0, 256, (n, shape[0] // 8, shape[1] // 8, 3), dtype=np.uint8)
+    return [np.ascontiguousarray(np.repeat(np.repeat(f, 8, 0), 8, 1)) for f in small]
+
+
+@pytest.mark.parametrize("shape", [(240, 320), (256, 256), (720, 1280)])
+def test_matches_pil_chain_within_tolerance(shape):
+    bgr = _frames(shape)
+    out = TensorPreprocessor(SIZE)(bgr)
+    expected = torch.stack([_pil_chain(np.ascontiguousarray(f[..., ::-1])) for f in bgr])
+    assert out.shape == (3, 3, *SIZE)
+    assert (out - expected).abs().max().item() <= PIL_TOLERANCE
+
+
+def test_rgb_flag_and_buffer_reuse():
+    pre = TensorPreprocessor(SIZE, max_batch=4)
+    bgr = _frames((240, 320), n=2)
+    from_bgr = pre(bgr).clone()
+    from_rgb = pre([np.ascontiguousarray(f[..., ::-1]) for f in bgr], rgb=True)
+    torch.testing.assert_close(from_rgb, from_bgr)
+    # la salida es una vista del buffer reutilizado
+    assert pre(bgr[:1]).data_ptr() == from_rgb.data_ptr()
+
+
+def test_batch_larger_than_max_batch():
+    pre = TensorPreprocessor(SIZE, max_batch=2)
+    out = pre(_frames((240, 320), n=5))
+    assert out.shape == (5, 3, *SIZE)
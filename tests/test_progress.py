@@ -0,0 +1,37 @@
+# tests/test_progress.py
+import time
+
+from src.progress import TaskProgress
+
+
+def _progress(**kwargs):
+    published = []
+    return TaskProgress(published.append, publish_every=0, **kwargs), published
+
+
+def test_counts_sampled_inferred_and_position_separately():
+    progress, published = _progress(frames_total=100, expected_samples=10)
+    progress.on_sampled(4)
+    progress.on_inferred(1)  # 3 reutilizados por la compuerta: muestreados, no inferidos
+    progress.on_emitted(30)
+    snap = published[-1]
+    assert (snap["frames_sampled"], snap["frames_inferred"], snap["position"]) == (4, 1, 30)
+    assert snap["percent"] == 30.0
+
+
+def test_rates_and_eta_follow_sampled_frames():
+    progress, _ = _progress(frames_total=100, expected_samples=10)
+    time.sleep(0.05)
+    progress.on_sampled(5)
+    progress.on_inferred(1)
+    snap = progress.snapshot()
+    assert snap["sample_fps"] > 0 and snap["infer_fps"] > 0
+    assert snap["sample_fps"] > snap["infer_fps"]
+    # faltan 5 muestreos al ritmo de muestreo
+    assert abs(snap["eta_seconds"] - 5 / snap["sample_fps"]) < 0.1
+
+
+def test_finish_reports_done():
+    progress, published = _progress()
+    progress.finish()
+    assert published[-1]["percent"] == 100.0 and published[-1]["eta_seconds"] == 0.0
@@ -0,0 +1,49 @@
+# tests/test_quantize.py
+import torch
+
+from src.quantize import int8_cache_path, load_int8, prepare_int8, quantizable_linears
+
+
+def _model():
+    torch.manual_seed(0)
+    return torch.nn.Sequential(torch.nn.Linear(16, 32), torch.nn.ReLU(), torch.nn.Linear(32, 2))
+
+
+def test_prepare_int8_writes_then_reuses_cache(tmp_path, monkeypatch):
+    weights = tmp_path / "tiny.pt"
+    torch.save(_model().state_dict(), weights)
+    x = torch.randn(4, 16)
+
+    model_int8, path = prepare_int8(_model(), weights, "ab" * 32)
+    assert path == int8_cache_path(weights, "ab" * 32) and path.exists()
+    expected = model_int8(x)
+
+    # con la caché escrita los pesos fp32 ya no se leen
+    weights.unlink()
+    again, same_path = prepare_int8(torch.nn.Sequential(torch.nn.Linear(16, 32), torch.nn.ReLU(),
+                                                        torch.nn.Linear(32, 2)), weights, "ab" * 32)
+    assert same_path == path
+    torch.testing.assert_close(again(x), expected)
+
+
+def test_load_int8_ignores_skeleton_weights(tmp_path):
+    from src.quantize import quantize_int8, save_int8
+
+    reference = quantize_int8(_model())
+    save_int8(reference, tmp_path / "m.int8.pt")
+    skeleton = torch.nn.Sequential(torch.nn.Linear(16, 32), torch.nn.ReLU(), torch.nn.Linear(32, 2))
+    loaded = load_int8(skeleton, tmp_path / "m.int8.pt")
+    x = torch.randn(3, 16)
+    torch.testing.assert_close(loaded(x), reference(x))
+
+
+def test_attention_projections_stay_fp32():
+    class Block(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.attn = torch.nn.Module()
+            self.attn.qkv = torch.nn.Linear(4, 12)
+            self.attn.proj = torch.nn.Linear(4, 4)
+            self.mlp = torch.nn.Linear(4, 4)
+
+    assert quantizable_linears(Block()) == {"mlp"}
@@ -0,0 +1,88 @@
+# tests/test_result_query.py
+import numpy as np
+import pytest
+
+from src.result_store import TaskResult
+
+T0 = np.datetime64("2024-01-01T12:00:00", "us")
+
+
+def _result(n=20, sensors=True):
+    # un frame muestreado cada 5, un segundo entre muestras, clase alternando en tramos de 3
+    idx = np.arange(n) * 5
+    class_id = (np.arange(n) // 3) % 2
+    conf = np.linspace(0.5, 0.99, n)
+    readings = np.arange(n * 6, dtype=np.float64).reshape(n, 6) if sensors else None
+    valid = (np.arange(n) % 4 != 0) if sensors else None
+    return TaskResult("20240101120000_cam.mp4", n * 5, idx, T0 + idx // 5 * np.timedelta64(1, "s"),
+                      class_id, ["no_smoke", "smoke"], conf, np.zeros(n, dtype=bool), readings, valid)
+
+
+def _brute(r, start=None, end=None, frame_from=None, frame_to=None, label=None, min_conf=None):
+    keep = np.ones(len(r), dtype=bool)
+    if start is not None:
+        keep &= r.times >= start
+    if end is not None:
+        keep &= r.times <= end
+    if frame_from is not None:
+        keep &= r.frame_idx >= frame_from
+    if frame_to is not None:
+        keep &= r.frame_idx <= frame_to
+    if label is not None:
+        keep &= r.class_id == r.labels.index(label)
+    if min_conf is not None:
+        keep &= r.conf >= min_conf
+    return r.frame_idx[keep].tolist()
+
+
+FILTERS = [
+    {},
+    {"label": "smoke"},
+    {"frame_from": 12, "frame_to": 61},
+    {"start": T0 + np.timedelta64(4, "s"), "end": T0 + np.timedelta64(9, "s")},
+    {"label": "no_smoke", "min_conf": 0.7},
+    {"label": "smoke", "frame_from": 30, "min_conf": 0.6},
+]
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_query_and_count_match_brute_force(filters):
+    r = _result()
+    page, next_cursor = r.query(**filters)
+    assert page.frame_idx.tolist() == _brute(r, **filters)
+    assert next_cursor is None
+    assert r.count(**filters) == len(page)
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_pagination_walks_every_match_once(filters):
+    r = _result()
+    seen, cursor = [], None
+    while True:
+        page, cursor = r.query(cursor=cursor, limit=4, **filters)
+        assert len(page) <= 4
+        seen += page.frame_idx.tolist()
+        if cursor is None:
+            break
+    assert seen == _brute(r, **filters)
+
+
+def test_parse_time():
+    r = _result()
+    assert r.parse_time("12:00:03") == T0 + np.timedelta64(3, "s")
+    assert r.parse_time("12:00:03", upper=True) == T0 + np.timedelta64(3_999_999, "us")
+    assert r.parse_time("2024-01-01T12:00:03") == T0 + np.timedelta64(3, "s")
+    # antes del inicio del video: del día siguiente
+    assert r.parse_time("11:00:00") == T0 + np.timedelta64(23, "h")
+    with pytest.raises(ValueError):
+        r.parse_time("noon")
+
+
+def test_date_only_end_covers_the_whole_day():
+    r = _result()
+    assert r.parse_time("2024-01-01") == T0.astype("datetime64[D]")
+    end = r.parse_time("2024-01-01", upper=True)
+    assert end == np.datetime64("2024-01-01T23:59:59.999999", "us")
+    page, _ = r.query(start=r.parse_time("2024-01-01"), end=end)
+    assert len(page) == len(r)
+    assert r.count(end=r.parse_time("2023-12-31", upper=True)) == 0
@@ -0,0 +1,61 @@
+# tests/test_result_store.py
+import numpy as np
+
+from src.result_store import TaskResult, ResultBuilder
+
+T0 = np.datetime64("2024-01-01T12:00:00", "us")
+
+
+def _result(n=20, sensors=True):
+    # un frame muestreado cada 5, un segundo entre muestras, clase alternando en tramos de 3
+    idx = np.arange(n) * 5
+    class_id = (np.arange(n) // 3) % 2
+    conf = np.linspace(0.5, 0.99, n)
+    readings = np.arange(n * 6, dtype=np.float64).reshape(n, 6) if sensors else None
+    valid = (np.arange(n) % 4 != 0) if sensors else None
+    return TaskResult("20240101120000_cam.mp4", n * 5, idx, T0 + idx // 5 * np.timedelta64(1, "s"),
+                      class_id, ["no_smoke", "smoke"], conf, np.zeros(n, dtype=bool), readings, valid)
+
+
+def test_sorted_reorders_by_frame():
+    r = _result(6).take(np.array([3, 0, 5, 1, 4, 2]))
+    assert r.sorted().frame_idx.tolist() == [0, 5, 10, 15, 20, 25]
+
+
+def test_save_load_roundtrip(tmp_path):
+    r = _result()
+    r.save(tmp_path / "r.npz")
+    loaded = TaskResult.load(tmp_path / "r.npz")
+    assert loaded.to_payload() == r.to_payload()
+    assert not TaskResult.load(tmp_path / "r.npz", sensors=False).has_sensors
+
+
+def test_payload_shape_and_iter_json():
+    import json
+
+    r = _result(4)
+    payload = r.to_payload()
+    assert list(payload["data"]) == [0, 5, 10, 15]
+    assert payload["data"][0]["timestamp"] == "12:00:00"
+    assert payload["data"][0]["sensors"] == dict.fromkeys(r.sensor_fields, -1.0)  # lectura no válida
+    assert payload["data"][5]["sensors"]["Temp"] == 6.0
+    assert json.loads("".join(r.iter_json(batch=2))) == json.loads(json.dumps(payload))
+
+
+def test_from_payload_roundtrip():
+    r = _result(6)
+    again = TaskResult.from_payload(r.to_payload())
+    assert again.frame_idx.tolist() == r.frame_idx.tolist()
+    assert again.times.tolist() == r.times.tolist()
+    assert again.to_payload() == r.to_payload()
+
+
+def test_builder_concatenates_sorted():
+    builder = ResultBuilder(["no_smoke", "smoke"], include_sensors=False)
+    builder.add("v.mp4", [10, 15], [T0, T0], [("smoke", 0.9), ("no_smoke", 0.8)], [False, True])
+    builder.add("v.mp4", [0, 5], [T0, T0], [("fire", 0.7), ("smoke", 0.6)], [False, False])
+    r = builder.build("v.mp4", 20)
+    assert r.frame_idx.tolist() == [0, 5, 10, 15]
+    assert r.labels == ["no_smoke", "smoke", "fire"]
+    assert [r.labels[c] for c in r.class_id] == ["fire", "smoke", "smoke", "no_smoke"]
+    assert r.carried.tolist() == [False, False, False, True]
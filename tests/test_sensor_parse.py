@@ -0,0 +1,119 @@
+import re
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.utils import SensorTrack, read_sensor_data_to_df
+
+
+def baseline_read_sensor_data_to_df(filepath):
+    """Parser original (línea por línea), como referencia."""
+    data = []
+    with open(filepath, 'r', encoding='utf-8') as file:
+        for line in file:
+            line = line.strip()
+            if not line:
+                continue
+            entry = {}
+            for part in re.split(r' - ', line):
+                kv_match = re.match(r'([^:]+):\s*(.+)', part)
+                if kv_match:
+                    entry[kv_match.group(1).strip()] = kv_match.group(2).strip()
+            if 'Temp' in entry:
+                entry['Temp'] = float(entry['Temp'][:-3])
+            if 'Humidity' in entry:
+                entry['Humidity'] = float(entry['Humidity'][:-1])
+            if 'CO2' in entry:
+                entry['CO2'] = float(entry['CO2'][:-4])
+            for pm_field in ['PM1', 'PM2.5', 'PM10']:
+                if pm_field in entry:
+                    entry[pm_field] = float(entry[pm_field])
+            if 'Datetime' in entry:
+                entry['Datetime'] = datetime.strptime(entry['Datetime'], "%Y-%m-%d %H:%M:%S.%f").isoformat()
+            data.append(entry)
+    return pd.DataFrame(data)
+
+
+def _line(i):
+    return (f"Datetime: 2024-01-01 12:{i // 60 % 60:02d}:{i % 60:02d}.{i * 7 % 1000:03d}"
+            f" - Temp: {20 + i * 0.1:.1f} °C - Humidity: {40 + i % 30}% - CO2: {400 + i} ppm"
+            f" - PM1: {i % 5} - PM2.5: {i % 7}.5 - PM10: {i % 11}")
+
+
+def _assert_matches_baseline(df, path):
+    expected = baseline_read_sensor_data_to_df(path)
+    assert list(df.columns) == list(expected.columns)
+    assert df["Datetime"].dtype == "datetime64[ns]"
+    np.testing.assert_array_equal(df["Datetime"].to_numpy(),
+                                  pd.to_datetime(expected["Datetime"], format="ISO8601").to_numpy(dtype="datetime64[ns]"))
+    for name in expected.columns[1:]:
+        np.testing.assert_array_equal(df[name].to_numpy(dtype=np.float64), expected[name].to_numpy(dtype=np.float64))
+
+
+@pytest.mark.parametrize("chunk_bytes", [64, 1000, 64 * 1024 * 1024])
+def test_matches_baseline_parser(tmp_path, chunk_bytes):
+    lines = [_line(i) for i in range(300)]
+    lines[10] = ""            # línea vacía
+    lines[20] += "  "         # espacios al final
+    lines[30] = lines[30].replace("Temp: ", "Temp:  ")
+    path = tmp_path / "sensor.txt"
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    _assert_matches_baseline(read_sensor_data_to_df(path, chunk_bytes=chunk_bytes), path)
+
+
+def test_nonstandard_lines_match_baseline(tmp_path):
+    """Líneas incompletas o con campos en otro orden van por el parser genérico."""
+    path = tmp_path / "sensor.txt"
+    path.write_text(_line(0) + "\n"
+                    "Datetime: 2024-01-01 12:00:01.000 - Temp: 21.5 °C - Humidity: 41% - CO2: 401 ppm\n"
+                    "Temp: 22.0 °C - Datetime: 2024-01-01 12:00:02.500 - PM10: 4\n"
+                    + _line(3), encoding="utf-8")
+
+    df = read_sensor_data_to_df(path, chunk_bytes=80)
+    expected = baseline_read_sensor_data_to_df(path)
+    assert set(df.columns) == set(expected.columns)
+    _assert_matches_baseline(df[list(expected.columns)], path)
+
+
+def test_generic_parser_tolerates_bad_values(tmp_path):
+    path = tmp_path / "sensor.txt"
+    path.write_text(_line(0) + "\n"
+                    "Datetime: 2024-01-01 12:00:01 - Temp: 21.5 °C - Humidity: 41% - CO2: 401 ppm\n"
+                    "Datetime: bad - Temp: x °C\n", encoding="utf-8")
+
+    df = read_sensor_data_to_df(path)
+    assert df["Datetime"].iloc[1] == pd.Timestamp("2024-01-01 12:00:01")
+    assert pd.isna(df["Datetime"].iloc[2]) and pd.isna(df["Temp"].iloc[2])
+    assert len(SensorTrack(df).times) == 2  # la fila sin timestamp no se usa
+
+
+def test_cache_roundtrip(tmp_path, monkeypatch):
+    path = tmp_path / "sensor.txt"
+    path.write_text("\n".join(_line(i) for i in range(50)) + "\n", encoding="utf-8")
+    cache_dir = tmp_path / "cache"
+
+    first = read_sensor_data_to_df(path, cache_dir=cache_dir)
+    assert len(list(cache_dir.glob("*.npz"))) == 1
+
+    import src.utils as utils
+    monkeypatch.setattr(utils, "_parse_sensor_chunk", lambda text: pytest.fail("cache miss"))
+    cached = read_sensor_data_to_df(path, cache_dir=cache_dir)
+    pd.testing.assert_frame_equal(cached, first)
+
+    path.write_text(_line(99) + "\n", encoding="utf-8")  # otro contenido, otra clave
+    with pytest.raises(pytest.fail.Exception):
+        read_sensor_data_to_df(path, cache_dir=cache_dir)
+
+
+def test_cache_write_error_is_not_fatal(tmp_path):
+    path = tmp_path / "sensor.txt"
+    path.write_text(_line(0) + "\n", encoding="utf-8")
+    blocker = tmp_path / "not_a_dir"
+    blocker.write_text("")
+
+    df = read_sensor_data_to_df(path, cache_dir=blocker / "cache")
+    assert len(df) == 1
+    assert not list(tmp_path.glob("**/*.npz"))
@@ -0,0 +1,90 @@
+# tests/test_sensor_track.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.utils import SensorTrack, SENSOR_FIELDS, frame_times, sensor_at
+
+T0 = np.datetime64("2024-01-01T12:00:00", "us")
+
+
+def _df():
+    # lecturas a los 0, 10 y 20 s; fuera de orden y con una fecha ilegible
+    return pd.DataFrame({
+        "Datetime": pd.to_datetime(["2024-01-01 12:00:20", "2024-01-01 12:00:00",
+                                    None, "2024-01-01 12:00:10"]),
+        "Temp": [20.0, 0.0, 99.0, 10.0],
+        "CO2": ["400", "200", "999", "x"],
+    })
+
+
+def _at(*seconds):
+    return T0 + (np.array(seconds, dtype=np.float64) * 1e6).astype("timedelta64[us]")
+
+
+def _temp(values):
+    return values[:, SENSOR_FIELDS.index("Temp")]
+
+
+def test_latest_takes_last_reading_at_or_before():
+    values, valid = SensorTrack(_df()).align(_at(-1, 0, 5, 10, 25))
+    assert valid.tolist() == [False, True, True, True, True]
+    assert np.isnan(values[0]).all()
+    assert _temp(values)[1:].tolist() == [0.0, 0.0, 10.0, 20.0]
+
+
+def test_sensor_at_agrees_with_latest_mode():
+    track = SensorTrack(_df())
+    for ts in _at(-1, 0, 5, 10, 25):
+        idx = sensor_at(ts.item(), track.times)
+        _, valid = track.align(np.array([ts]))
+        assert (idx is not None) == valid[0]
+    assert sensor_at(_at(12)[0].item(), track.times) == 1
+
+
+def test_nearest_picks_closest_side():
+    values, valid = SensorTrack(_df(), mode="nearest").align(_at(-1, 4, 6, 25))
+    assert valid.all()
+    assert _temp(values).tolist() == [0.0, 0.0, 10.0, 20.0]
+
+
+def test_linear_interpolates_inside_and_clamps_outside():
+    values, valid = SensorTrack(_df(), mode="linear").align(_at(-5, 2.5, 10, 15, 30))
+    assert valid.all()
+    np.testing.assert_allclose(_temp(values), [0.0, 2.5, 10.0, 15.0, 20.0])
+
+
+def test_missing_and_non_numeric_columns_are_nan():
+    values, _ = SensorTrack(_df()).align(_at(0, 10))
+    co2 = values[:, SENSOR_FIELDS.index("CO2")]
+    assert co2[0] == 200.0 and np.isnan(co2[1])
+    assert np.isnan(values[:, SENSOR_FIELDS.index("Humidity")]).all()
+
+
+@pytest.mark.parametrize("mode", ["latest", "nearest", "linear"])
+def test_max_staleness(mode):
+    track = SensorTrack(_df(), mode=mode, max_staleness=3)
+    values, valid = track.align(_at(2, 5, 8, 24))
+    expected = {"latest": [True, False, False, False],
+                "nearest": [True, False, True, False],
+                "linear": [True, False, True, False]}[mode]
+    assert valid.tolist() == expected
+    assert np.isnan(values[~valid]).all()
+
+
+def test_empty_track_has_no_data():
+    track = SensorTrack(pd.DataFrame({"Datetime": pd.to_datetime([])}))
+    values, valid = track.align(_at(0, 1))
+    assert len(track) == 0
+    assert not valid.any() and np.isnan(values).all()
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        SensorTrack(_df(), mode="cubic")
+
+
+def test_frame_times():
+    from datetime import datetime
+    times = frame_times(datetime(2024, 1, 1, 12), np.array([0, 15, 30]), 30.0)
+    assert times.tolist() == _at(0, 0.5, 1).tolist()
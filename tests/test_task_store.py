@@ -0,0 +1,53 @@
+# tests/test_task_store.py
+import numpy as np
+import pytest
+
+from src.result_store import TaskResult
+from src.task_store import BoundedResultMap, DiskResultMap
+
+T0 = np.datetime64("2024-01-01T12:00:00", "us")
+TASK_ID = "0b7e6f3c-1a2b-4c3d-8e9f-0123456789ab"
+
+
+def _result(n=20, sensors=True):
+    # un frame muestreado cada 5, un segundo entre muestras, clase alternando en tramos de 3
+    idx = np.arange(n) * 5
+    class_id = (np.arange(n) // 3) % 2
+    conf = np.linspace(0.5, 0.99, n)
+    readings = np.arange(n * 6, dtype=np.float64).reshape(n, 6) if sensors else None
+    valid = (np.arange(n) % 4 != 0) if sensors else None
+    return TaskResult("20240101120000_cam.mp4", n * 5, idx, T0 + idx // 5 * np.timedelta64(1, "s"),
+                      class_id, ["no_smoke", "smoke"], conf, np.zeros(n, dtype=bool), readings, valid)
+
+
+def test_bounded_map_counts_label_index_growth(tmp_path):
+    r = _result(1000, sensors=False)
+    r.save(tmp_path / f"{TASK_ID}.npz")
+    results = BoundedResultMap(DiskResultMap(tmp_path), max_bytes=10**9, ttl=0)
+
+    cached = results[TASK_ID]
+    before = results.resident_bytes
+    assert before == cached.nbytes
+    cached.query(label="smoke")
+    assert results.resident_bytes == cached.nbytes > before
+
+
+def test_bounded_map_evicts_and_reloads(tmp_path):
+    r = _result(100, sensors=False)
+    r.save(tmp_path / f"{TASK_ID}.npz")
+    results = BoundedResultMap(DiskResultMap(tmp_path), max_bytes=r.nbytes, ttl=0)
+
+    results[TASK_ID].query(label="smoke")  # el índice la pasa del presupuesto
+    assert results.stats()["entries"] == 0 and results.resident_bytes == 0
+    assert len(results[TASK_ID]) == 100
+    assert results.reloads == 2
+
+
+def test_disk_map_only_serves_task_ids(tmp_path):
+    _result(3).save(tmp_path / f"{TASK_ID}.npz")
+    _result(3).save(tmp_path / "20240101_cam.npz")
+    disk = DiskResultMap(tmp_path)
+    assert list(disk) == [TASK_ID]
+    assert "20240101_cam" not in disk
+    with pytest.raises(KeyError):
+        disk["20240101_cam"]
@@ -0,0 +1,103 @@
+# tests/test_upload_sessions.py
+import hashlib
+
+import pytest
+
+from src.upload_sessions import UploadSessions, merge_ranges, missing_ranges
+
+
+def test_merge_ranges():
+    assert merge_ranges([]) == []
+    assert merge_ranges([(10, 20), (0, 5), (5, 8), (15, 30), (40, 50)]) == [[0, 8], [10, 30], [40, 50]]
+
+
+def test_missing_ranges():
+    assert missing_ranges([], 10) == [[0, 10]]
+    assert missing_ranges([[2, 4], [6, 10]], 12) == [[0, 2], [4, 6], [10, 12]]
+    assert missing_ranges([[0, 12]], 12) == []
+
+
+def _put(sessions, sid, data, start, end):
+    with sessions.data_path(sid).open("r+b") as f:
+        f.seek(start)
+        f.write(data[start:end])
+    sessions.record(sid, start, end)
+
+
+def test_status_tracks_chunks_in_any_order(tmp_path):
+    sessions = UploadSessions(tmp_path)
+    data = bytes(range(256)) * 4
+    sid = sessions.create("cam.mp4", len(data))["session_id"]
+
+    _put(sessions, sid, data, 512, 1024)
+    _put(sessions, sid, data, 0, 100)
+    status = sessions.status(sid)
+    assert status["received"] == [[0, 100], [512, 1024]]
+    assert status["missing"] == [[100, 512]]
+    assert status["bytes_received"] == 612 and not status["complete"]
+
+    # una línea a medias en el log se ignora hasta que se completa
+    with (tmp_path / sid / "ranges.log").open("ab") as f:
+        f.write(b"100 ")
+    assert sessions.received(sid) == [[0, 100], [512, 1024]]
+    with (tmp_path / sid / "ranges.log").open("ab") as f:
+        f.write(b"512\n")
+    assert sessions.status(sid)["complete"]
+
+    # otra instancia (p. ej. tras un reinicio) reconstruye lo recibido desde el log
+    assert UploadSessions(tmp_path).received(sid) == [[0, 1024]]
+
+
+def test_finalize(tmp_path):
+    sessions = UploadSessions(tmp_path / "sessions")
+    data = b"smoke" * 1000
+    sid = sessions.create("../cam.mp4", len(data), sha256=hashlib.sha256(data).hexdigest())["session_id"]
+    assert sessions.meta(sid)["filename"] == "cam.mp4"
+
+    _put(sessions, sid, data, 0, 2000)
+    with pytest.raises(ValueError, match="incomplete"):
+        sessions.finalize(sid, tmp_path / "out.mp4")
+    _put(sessions, sid, data, 2000, len(data))
+
+    done = sessions.finalize(sid, tmp_path / "out.mp4")
+    assert done["sha256"] == hashlib.sha256(data).hexdigest()
+    assert (tmp_path / "out.mp4").read_bytes() == data
+    with pytest.raises(KeyError):
+        sessions.status(sid)
+
+
+def test_finalize_sha_mismatch_keeps_session(tmp_path):
+    sessions = UploadSessions(tmp_path / "sessions")
+    sid = sessions.create("cam.mp4", 4, sha256="0" * 64)["session_id"]
+    _put(sessions, sid, b"abcd", 0, 4)
+    with pytest.raises(ValueError, match="sha256 mismatch"):
+        sessions.finalize(sid, tmp_path / "out.mp4")
+    assert sessions.status(sid)["complete"]
+    assert not (tmp_path / "out.mp4").exists()
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"filename": "..", "size": 1},
+    {"filename": "", "size": 1},
+    {"filename": "cam.mp4", "size": -1},
+    {"filename": "cam.mp4", "size": 1, "sha256": "xyz"},
+])
+def test_create_rejects_bad_input(tmp_path, kwargs):
+    with pytest.raises(ValueError):
+        UploadSessions(tmp_path).create(**kwargs)
+
+
+def test_unknown_or_malformed_session_ids(tmp_path):
+    sessions = UploadSessions(tmp_path)
+    with pytest.raises(KeyError):
+        sessions.meta("../etc")
+    with pytest.raises(KeyError):
+        sessions.remove("0b7e6f3c-1a2b-4c3d-8e9f-0123456789ab")
+
+
+def test_purge_stale(tmp_path):
+    sessions = UploadSessions(tmp_path)
+    sid = sessions.create("cam.mp4", 10)["session_id"]
+    assert sessions.purge_stale(3600) == 0
+    assert sessions.purge_stale(-1) == 1
+    assert not (tmp_path / sid).exists()
@@ -0,0 +1,181 @@
+# tests/test_video_reader.py
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from src.video_reader import FramePrefetcher, iter_frames_at, iter_sampled_frames
+
+
+class FakeCapture:
+    """cv2.VideoCapture mínimo: frame i = imagen llena con i; `bad` no se pueden decodificar."""
+
+    def __init__(self, n_frames, bad=(), bad_seek=()):
+        self.n_frames = n_frames
+        self.bad = set(bad)
+        self.bad_seek = set(bad_seek)
+        self.pos = 0
+
+    def get(self, prop):
+        assert prop == cv2.CAP_PROP_POS_FRAMES
+        return float(self.pos)
+
+    def set(self, prop, value):
+        assert prop == cv2.CAP_PROP_POS_FRAMES
+        if value in self.bad_seek or value >= self.n_frames:
+            return False
+        self.pos = int(value)
+        return True
+
+    def grab(self):
+        if self.pos >= self.n_frames or self.pos in self.bad:
+            return False
+        self.pos += 1
+        return True
+
+    def read(self):
+        if self.pos >= self.n_frames or self.pos in self.bad:
+            return False, None
+        frame = np.full((4, 4, 3), self.pos % 256, dtype=np.uint8)
+        self.pos += 1
+        return True, frame
+
+
+def _read_at(cap, indices, seek_min_stride=60):
+    return {idx: int(frame[0, 0, 0]) for idx, frame in iter_frames_at(cap, indices, seek_min_stride)}
+
+
+def test_frames_at_any_order():
+    got = _read_at(FakeCapture(300), [250, 10, 12, 10, 100])
+    assert got == {10: 10, 12: 12, 100: 100, 250: 250}
+
+
+def test_unreadable_target_is_skipped_and_logged(caplog):
+    got = _read_at(FakeCapture(300, bad={12}), [10, 12, 14, 200, 210])
+    assert got == {10: 10, 14: 14, 200: 200, 210: 210}  # tras el fallo reposiciona, no corta el resto
+    assert "Frame 12" in caplog.text and "Frame 14" not in caplog.text
+
+
+def test_failing_grab_skips_only_that_target(caplog):
+    # 13 no avanza con grab: 14 no se alcanza, 15 en adelante sí
+    got = _read_at(FakeCapture(300, bad={13}), [10, 14, 15, 100])
+    assert got == {10: 10, 15: 15, 100: 100}
+    assert "Frame 14" in caplog.text
+
+
+def test_failing_seek_is_skipped():
+    got = _read_at(FakeCapture(300, bad_seek={150}), [5, 150, 250], seek_min_stride=30)
+    assert sorted(got) == [5, 250]
+
+
+def test_targets_past_the_end_are_skipped():
+    got = _read_at(FakeCapture(50), [10, 49, 50, 80])
+    assert sorted(got) == [10, 49]
+
+
+def _counting(n, fail_at=None, log=None):
+    """Generador de (idx, frame) que registra cuántos produjo y si se cerró."""
+    try:
+        for i in range(n):
+            if i == fail_at:
+                raise IOError("decoder failed")
+            if log is not None:
+                log.append(i)
+            yield i, np.full((2, 2, 3), i % 256, dtype=np.uint8)
+    finally:
+        if log is not None:
+            log.append("closed")
+
+
+def test_prefetcher_keeps_order():
+    with FramePrefetcher(_counting(100), depth=4) as frames:
+        assert [idx for idx, _ in frames] == list(range(100))
+
+
+def test_prefetcher_depth_zero_is_synchronous():
+    produced = []
+    frames = FramePrefetcher(_counting(5, log=produced), depth=0)
+    assert produced == []  # sin hilo: nada se decodifica antes de iterar
+    assert [idx for idx, _ in frames] == list(range(5))
+
+
+def test_prefetcher_reraises_decoder_error_after_buffered_frames():
+    seen = []
+    with pytest.raises(IOError, match="decoder failed"):
+        with FramePrefetcher(_counting(10, fail_at=6), depth=3) as frames:
+            for idx, _ in frames:
+                seen.append(idx)
+    assert seen == list(range(6))
+
+
+def test_prefetcher_close_stops_a_blocked_producer():
+    produced = []
+    prefetcher = FramePrefetcher(_counting(10_000, log=produced), depth=2)
+    first = next(iter(prefetcher))
+    time.sleep(0.2)  # el productor se llena y queda esperando lugar en la cola
+    assert first[0] == 0 and len(produced) <= 5
+    prefetcher.close()
+    assert produced[-1] == "closed" and len(produced) < 10
+
+
+@pytest.fixture(scope="module")
+def video_path(tmp_path_factory):
+    """MJPG: todos los frames son clave, así que seek cae exacto. Frame i = gris 4 * i."""
+    path = tmp_path_factory.mktemp("video") / "cam_20240101120000.avi"
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 30, (64, 48))
+    for i in range(61):
+        writer.write(np.full((48, 64, 3), 4 * i, dtype=np.uint8))
+    writer.release()
+    return path
+
+
+def _sampled(path, sample_every, mode, seek_min_stride=60):
+    cap = cv2.VideoCapture(str(path))
+    try:
+        return [(idx, frame) for idx, frame in iter_sampled_frames(cap, sample_every, mode, seek_min_stride)]
+    finally:
+        cap.release()
+
+
+@pytest.mark.parametrize("sample_every", [1, 7, 10, 60, 100])
+def test_skip_modes_yield_the_same_frames(video_path, sample_every):
+    reference = _sampled(video_path, sample_every, "read")
+    assert [idx for idx, _ in reference] == list(range(0, 61, sample_every))
+    for mode in ("grab", "seek"):
+        got = _sampled(video_path, sample_every, mode, seek_min_stride=1)
+        assert [idx for idx, _ in got] == [idx for idx, _ in reference], mode
+        for (idx, a), (_, b) in zip(got, reference):
+            assert np.array_equal(a, b), (mode, idx)
+
+
+def test_seek_below_min_stride_falls_back_to_grab(video_path):
+    cap = cv2.VideoCapture(str(video_path))
+    calls = []
+    original_set = cap.set
+
+    class Spy:
+        def __getattr__(self, name):
+            return getattr(cap, name)
+
+        def set(self, prop, value):
+            calls.append(value)
+            return original_set(prop, value)
+
+    got = [idx for idx, _ in iter_sampled_frames(Spy(), 10, "seek", seek_min_stride=60)]
+    cap.release()
+    assert got == list(range(0, 61, 10)) and calls == []
+
+
+def test_frames_at_matches_sequential_read(video_path):
+    reference = dict(_sampled(video_path, 1, "read"))
+    cap = cv2.VideoCapture(str(video_path))
+    got = dict(iter_frames_at(cap, [59, 3, 4, 40, 0], seek_min_stride=10))
+    cap.release()
+    assert sorted(got) == [0, 3, 4, 40, 59]
+    assert all(np.array_equal(frame, reference[idx]) for idx, frame in got.items())
+
+
+def test_unknown_skip_mode():
+    with pytest.raises(ValueError):
+        list(iter_sampled_frames(FakeCapture(3), 1, "jump"))
@@ -0,0 +1,97 @@
+"""
+Workers de inferencia para JOB_BACKEND=sqlite.
+
+Cada proceso reclama trabajos de la cola persistente (JOB_DB_PATH), carga su
+propio modelo y ejecuta process_video_and_sensor. Uso:
+
+    JOB_BACKEND=sqlite uvicorn api:app --workers 4 ...
+    JOB_BACKEND=sqlite python worker.py --workers 2
+"""
+import os
+
+os.environ.setdefault("JOB_BACKEND", "sqlite")
+
+import argparse
+import multiprocessing as mp
+import socket
+import threading
+import time
+from pathlib import Path
+
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1.0"))
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "15"))
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "120"))
+# reclamos máximos de un trabajo cuyo worker muere (0 = sin límite)
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+
+def _heartbeat(queue, task_id: str, stop: threading.Event):
+    while not stop.wait(JOB_HEARTBEAT_SECONDS):
+        queue.heartbeat(task_id)
+
+
+def run_worker(worker_id: str):
+    import api
+
+    queue = api.job_queue
+    if queue is None:
+        raise RuntimeError("worker.py requiere JOB_BACKEND=sqlite")
+
+    api.init_classifier()
+    api.log.info("[WORKER %s] listo | db=%s", worker_id, api.JOB_DB_PATH)
+
+    while True:
+        queue.requeue_stale(JOB_STALE_SECONDS, JOB_MAX_ATTEMPTS)
+        job = queue.claim(worker_id)
+        if job is None:
+            time.sleep(JOB_POLL_SECONDS)
+            continue
+
+        task_id, payload = job
+        api.log.info("[WORKER %s] TASK %s reclamada", worker_id, task_id)
+        stop = threading.Event()
+        beat = threading.Thread(target=_heartbeat, args=(queue, task_id, stop), daemon=True)
+        beat.start()
+        try:
+            sensor_path = payload.get("sensor_path")
+            api.process_video_and_sensor(
+                Path(payload["video_path"]),
+                Path(sensor_path) if sensor_path else None,
+                task_id,
+                include_sensors=payload.get("include_sensors", True),
+                video_hash=payload.get("video_hash"),
+            )
+        finally:
+            stop.set()
+            beat.join()
+        status = api.processing_status.get(task_id, "")
+        queue.finish(task_id, "done" if status == "completed" else "failed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Workers de inferencia (cola SQLite)")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WORKERS", "1")))
+    args = parser.parse_args()
+
+    host = socket.gethostname()
+    if args.workers <= 1:
+        run_worker(f"{host}:{os.getpid()}")
+        return
+
+    ctx = mp.get_context("spawn")
+    procs = [ctx.Process(target=run_worker, args=(f"{host}:w{i}",), name=f"worker-{i}")
+             for i in range(args.workers)]
+    for p in procs:
+        p.start()
+    try:
+        for p in procs:
+            p.join()
+    except KeyboardInterrupt:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            p.join()
+
+
+if __name__ == "__main__":
+    main()